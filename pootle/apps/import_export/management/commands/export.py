@@ -21,6 +21,8 @@ from pootle_store.models import Store
 class Command(PootleCommand):
     help = "Export a Project, Translation Project, or path. " \
            "Multiple files will be zipped."
+    parallel_translation_projects = False
+    supports_jobs = False
 
     def add_arguments(self, parser):
         super(Command, self).add_arguments(parser)
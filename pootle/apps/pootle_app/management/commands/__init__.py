@@ -8,8 +8,10 @@
 
 import datetime
 import logging
+from multiprocessing import Pool
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 
 from pootle.runner import set_sync_mode
 from pootle_project.models import Project
@@ -31,11 +33,47 @@ class SkipChecksMixin(object):
             include_deployment_checks=include_deployment_checks)
 
 
+# the command and options that translation projects are handled with in the
+# worker processes
+_worker = {}
+
+
+def init_worker(command, options):
+    _worker["command"] = command
+    _worker["options"] = options
+
+
+def run_translation_project(tp_pk):
+    """Handles the translation project with `tp_pk`, returning its
+    pootle_path and whether it was handled without errors.
+
+    This is run in the worker processes when using more than one job.
+    """
+    command = _worker["command"]
+    try:
+        tp = TranslationProject.objects.get(pk=tp_pk)
+    except Exception:
+        logging.exception(u"Failed to run %s over translation project %s",
+                          command.name, tp_pk)
+        return tp_pk, False
+    return (
+        tp.pootle_path,
+        command.do_translation_project(tp, **_worker["options"]))
+
+
 class PootleCommand(BaseCommand):
     """Base class for handling recursive pootle store management commands."""
 
     process_disabled_projects = False
 
+    # when running with more than one job, translation projects are handled
+    # in worker processes. Commands that keep state between translation
+    # projects or manage their own workers disable this.
+    parallel_translation_projects = True
+
+    # commands that can only run in a single process reject `--jobs`
+    supports_jobs = True
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--project',
@@ -62,6 +100,14 @@ class PootleCommand(BaseCommand):
             help=(u"Run all jobs in a single process, without "
                   "using rq workers"),
         )
+        parser.add_argument(
+            '--jobs',
+            action='store',
+            type=int,
+            dest='jobs',
+            default=1,
+            help='Number of processes used to run the command',
+        )
 
     def __init__(self, *args, **kwargs):
         self.languages = []
@@ -69,6 +115,9 @@ class PootleCommand(BaseCommand):
         super(PootleCommand, self).__init__(*args, **kwargs)
 
     def do_translation_project(self, tp, **options):
+        """Runs the command over `tp` and its stores, returning whether this
+        was done without errors.
+        """
         process_stores = True
 
         if hasattr(self, "handle_translation_project"):
@@ -77,10 +126,10 @@ class PootleCommand(BaseCommand):
                 process_stores = self.handle_translation_project(tp, **options)
             except Exception:
                 logging.exception(u"Failed to run %s over %s", self.name, tp)
-                return
+                return False
 
             if not process_stores:
-                return
+                return True
 
         if hasattr(self, "handle_all_stores"):
             logging.info(u"Running %s over %s's files", self.name, tp)
@@ -89,8 +138,9 @@ class PootleCommand(BaseCommand):
             except Exception:
                 logging.exception(u"Failed to run %s over %s's files",
                                   self.name, tp)
-                return
+                return False
         elif hasattr(self, "handle_store"):
+            succeeded = True
             store_query = tp.stores.live()
             for store in store_query.iterator():
                 logging.info(u"Running %s over %s",
@@ -100,6 +150,9 @@ class PootleCommand(BaseCommand):
                 except Exception:
                     logging.exception(u"Failed to run %s over %s",
                                       self.name, store.pootle_path)
+                    succeeded = False
+            return succeeded
+        return True
 
     def handle(self, **options):
         # adjust debug level to the verbosity option
@@ -115,6 +168,9 @@ class PootleCommand(BaseCommand):
 
         # reduce size of parse pool early on
         self.name = self.__class__.__module__.split('.')[-1]
+        if options["jobs"] > 1 and not self.supports_jobs:
+            raise CommandError(
+                "%s can only be run with a single job" % self.name)
         from pootle_store.fields import TranslationStoreFieldFile
         TranslationStoreFieldFile._store_cache.maxsize = 2
         TranslationStoreFieldFile._store_cache.cullsize = 2
@@ -134,10 +190,7 @@ class PootleCommand(BaseCommand):
         end = datetime.datetime.now()
         logging.info('All done for %s in %s', self.name, end - start)
 
-    def handle_all(self, **options):
-        if options["no_rq"]:
-            set_sync_mode(options['noinput'])
-
+    def get_translation_projects(self):
         if self.process_disabled_projects:
             project_query = Project.objects.all()
         else:
@@ -154,4 +207,42 @@ class PootleCommand(BaseCommand):
                 tp_query = tp_query.filter(language__code__in=self.languages)
 
             for tp in tp_query.iterator():
-                self.do_translation_project(tp, **options)
+                yield tp
+
+    def handle_all(self, **options):
+        if options["no_rq"]:
+            set_sync_mode(options['noinput'])
+
+        if options["jobs"] > 1 and self.parallel_translation_projects:
+            self.handle_translation_projects(**options)
+            return
+
+        for tp in self.get_translation_projects():
+            self.do_translation_project(tp, **options)
+
+    def handle_translation_projects(self, **options):
+        """Runs the command over the translation projects in a pool of
+        `jobs` worker processes.
+        """
+        tp_pks = [tp.pk for tp in self.get_translation_projects()]
+        # the workers must not share the db connection
+        connections.close_all()
+        pool = Pool(
+            options["jobs"],
+            initializer=init_worker,
+            initargs=(self, options))
+        failed = []
+        try:
+            results = pool.imap_unordered(run_translation_project, tp_pks)
+            for done, (tp, succeeded) in enumerate(results, 1):
+                if not succeeded:
+                    failed.append(tp)
+                logging.info(u"Ran %s over %s (%s/%s)",
+                             self.name, tp, done, len(tp_pks))
+        finally:
+            pool.close()
+            pool.join()
+        if failed:
+            logging.error(u"%s failed over %s of %s translation projects: %s",
+                          self.name, len(failed), len(tp_pks),
+                          u", ".join(sorted(unicode(tp) for tp in failed)))
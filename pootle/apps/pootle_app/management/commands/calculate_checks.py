@@ -7,18 +7,60 @@
 # AUTHORS file for copyright and authorship information.
 
 import os
+from functools import partial
+from multiprocessing import Pool
 
 # This must be run before importing Django.
 os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 
+from django.db import connections, transaction
+
 from pootle.core.checks.checker import QualityCheckUpdater
+from pootle.core.contextmanagers import keep_data
+from pootle.core.delegate import data_tool
+from pootle_app.models import Directory
+from pootle_store.models import Store
 
 from . import PootleCommand
 
 
+class StoreChecksUpdater(QualityCheckUpdater):
+    """Updates the checks of a chunk of stores in a worker process.
+
+    Only the data of the stores is updated, the data of their directories
+    and TPs is shared with the stores of the other workers.
+    """
+
+    def update_store_data(self, store_pk):
+        check_delta = {
+            k: v
+            for k, v
+            in self.check_deltas.pop(store_pk, {}).items()
+            if v}
+        if not check_delta:
+            return
+        with keep_data():
+            data_tool.get(Store)(Store.objects.get(pk=store_pk)).update(
+                check_delta=check_delta)
+
+
+def update_store_checks(store_pks, check_names=None):
+    """Update the checks for a chunk of stores, returning the number of
+    updated units.
+
+    This is run in the worker processes when using more than one job.
+    """
+    updater = StoreChecksUpdater(check_names, stores=store_pks)
+    updated = updater.update_translated()
+    updater.update_stores_data()
+    return updated
+
+
 class Command(PootleCommand):
     help = "Allow checks to be recalculated manually."
     process_disabled_projects = True
+    # stores are updated in worker processes with `--jobs`
+    parallel_translation_projects = False
 
     def add_arguments(self, parser):
         super(Command, self).add_arguments(parser)
@@ -29,17 +71,75 @@ class Command(PootleCommand):
             default=None,
             help='Check to recalculate',
         )
+        parser.add_argument(
+            '--chunk-size',
+            action='store',
+            type=int,
+            dest='chunk_size',
+            default=50,
+            help='Number of stores updated in each job',
+        )
+
+    def get_chunks(self, stores, chunk_size):
+        stores = list(stores.order_by("pk").values_list("pk", flat=True))
+        return [
+            stores[i:i + chunk_size]
+            for i
+            in range(0, len(stores), chunk_size)]
+
+    def update_checks(self, updater, stores, **options):
+        # checks that are no longer used, and checks of untranslated units
+        # are removed in a single query each
+        updater.clear_checks()
+        updater.update_untranslated()
+        updater.update_stores_data()
+        update = partial(
+            update_store_checks,
+            check_names=options['check_names'])
+        chunks = self.get_chunks(stores, options['chunk_size'])
+        results = (
+            self.pool.imap(update, chunks)
+            if self.pool is not None
+            else (update(chunk) for chunk in chunks))
+        return sum(results)
+
+    def update_tp_data(self, tp):
+        # the data of directories and the TP is updated from the data of
+        # their stores once all the stores are updated
+        with transaction.atomic():
+            for directory in tp.dirs.order_by("-pootle_path").iterator():
+                data_tool.get(Directory)(directory).update()
+            tp.data_tool.update()
 
     def handle_all_stores(self, translation_project, **options):
         self.stdout.write(u"Running %s for %s" %
                           (self.name, translation_project))
-        QualityCheckUpdater(
-            options['check_names'],
-            translation_project).update()
+        self.update_checks(
+            QualityCheckUpdater(
+                options['check_names'],
+                translation_project),
+            translation_project.stores,
+            **options)
+        self.update_tp_data(translation_project)
 
     def handle_all(self, **options):
-        if not self.projects and not self.languages:
-            self.stdout.write(u"Running %s (noargs)" % self.name)
-            QualityCheckUpdater(options['check_names']).update()
-        else:
-            super(Command, self).handle_all(**options)
+        self.pool = None
+        if options["jobs"] > 1:
+            # the workers must not share the db connection
+            connections.close_all()
+            self.pool = Pool(options["jobs"])
+        try:
+            if not self.projects and not self.languages:
+                self.stdout.write(u"Running %s (noargs)" % self.name)
+                self.update_checks(
+                    QualityCheckUpdater(options['check_names']),
+                    Store.objects.all(),
+                    **options)
+                for tp in self.get_translation_projects():
+                    self.update_tp_data(tp)
+            else:
+                super(Command, self).handle_all(**options)
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
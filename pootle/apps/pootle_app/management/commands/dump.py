@@ -40,6 +40,9 @@ DUMPED = {
 
 class Command(PootleCommand):
     help = "Dump data."
+    # the data is dumped in the order of the translation projects
+    parallel_translation_projects = False
+    supports_jobs = False
 
     def add_arguments(self, parser):
         super(Command, self).add_arguments(parser)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+
+# This must be run before importing Django.
+os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
+
+from pootle.core.checks.checker import CheckableUnit
+from pootle_misc.checks import check_timings, run_given_filters
+from pootle_store.constants import UNTRANSLATED
+from pootle_store.models import Unit
+
+from . import PootleCommand
+
+
+class Command(PootleCommand):
+    help = "Time the quality checks over a sample of units of each TP."
+    process_disabled_projects = True
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--sample',
+            action='store',
+            type=int,
+            dest='sample',
+            default=1000,
+            help='Number of translated units checked in each TP',
+        )
+
+    def get_units(self, tp, sample):
+        units = (
+            Unit.objects.filter(
+                store__translation_project=tp,
+                state__gt=UNTRANSLATED)
+            .order_by("?")[:sample])
+        unit_fields = (
+            "id", "source_f", "target_f", "locations", "state", "store__id",
+            "store__translation_project__language__code")
+        for unit in units.values(*unit_fields).iterator():
+            yield CheckableUnit(unit)
+
+    def write_timings(self, timings):
+        total = sum(timing[2] for timing in timings)
+        self.stdout.write(
+            u"%-36s %8s %12s %10s %10s %6s"
+            % ("Check", "Calls", "Total (ms)", "Mean (ms)", "Max (ms)", "%"))
+        for name, calls, cumulative, longest in timings:
+            self.stdout.write(
+                u"%-36s %8d %12.2f %10.3f %10.3f %6.1f"
+                % (name,
+                   calls,
+                   cumulative * 1000,
+                   cumulative * 1000 / calls,
+                   longest * 1000,
+                   (cumulative * 100 / total) if total else 0))
+
+    def handle_translation_project(self, tp, **options):
+        tee_checker = tp.checker
+        # each check is run by the checker that defines it
+        checkers = [
+            (checker, [name
+                       for name in checker.defaultfilters
+                       if name in tee_checker.combinedfilters])
+            for checker
+            in tee_checker.checkers]
+        check_timings.clear()
+        check_timings.enabled = True
+        units = 0
+        try:
+            for unit in self.get_units(tp, options["sample"]):
+                for checker, check_names in checkers:
+                    run_given_filters(checker, unit, check_names)
+                units += 1
+        finally:
+            check_timings.enabled = False
+        self.stdout.write(u"Checked %s units in %s" % (units, tp))
+        timings = check_timings.get_ranked()
+        if timings:
+            self.write_timings(timings)
+        elif units:
+            self.stdout.write(u"No checks were timed for %s" % tp)
+        check_timings.clear()
+        return False
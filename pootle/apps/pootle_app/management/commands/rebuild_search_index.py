@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+
+# This must be run before importing Django.
+os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
+
+from django.db import transaction
+
+from pootle_store.unit.search_index import search_index
+
+from . import PootleCommand
+
+
+class Command(PootleCommand):
+    help = "Rebuild the search index of the units of stores."
+    process_disabled_projects = True
+
+    def handle_store(self, store, **options):
+        with transaction.atomic():
+            search_index.rebuild(store)
+
+    def handle_translation_project(self, tp, **options):
+        self.stdout.write(u"Rebuilding search index for %s" % tp)
+        return True
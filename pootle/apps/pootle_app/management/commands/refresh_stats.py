@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import datetime
+import os
+from multiprocessing import Pool
+
+# This must be run before importing Django.
+os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
+
+from django.db import connections, transaction
+
+from pootle.core.cache import get_cache
+from pootle.core.contextmanagers import keep_data
+from pootle.core.delegate import data_tool
+from pootle_app.models import Directory
+from pootle_store.models import Store, Unit
+
+from . import PootleCommand
+
+
+def refresh_stores(store_pks):
+    """Refresh the data for a chunk of stores, returning the number of units
+    in the chunk.
+
+    This is run in the worker processes when using more than one job.
+    """
+    with keep_data():
+        with transaction.atomic():
+            for store in Store.objects.filter(pk__in=store_pks).iterator():
+                data_tool.get(Store)(store).update()
+    return Unit.objects.filter(store_id__in=store_pks).count()
+
+
+class StatsCheckpoint(object):
+    """Records the progress of a refresh, so that an interrupted run can be
+    resumed.
+
+    For each translation project the last store that was refreshed is stored,
+    stores are refreshed in `pk` order.
+    """
+
+    def __init__(self, name):
+        self.key = "pootle.refresh_stats.%s" % name
+        self.cache = get_cache("redis")
+
+    @property
+    def progress(self):
+        return self.cache.get(self.key) or {}
+
+    def clear(self):
+        self.cache.delete(self.key)
+
+    def get(self, tp_pk):
+        return self.progress.get(tp_pk)
+
+    def set(self, tp_pk, value):
+        progress = self.progress
+        progress[tp_pk] = value
+        self.cache.set(self.key, progress, timeout=None)
+
+
+class Command(PootleCommand):
+    help = "Refresh the stats data of stores, directories and TPs."
+    process_disabled_projects = True
+    # stores are refreshed in worker processes with `--jobs`
+    parallel_translation_projects = False
+    tp_done = "done"
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--chunk-size',
+            action='store',
+            type=int,
+            dest='chunk_size',
+            default=50,
+            help='Number of stores refreshed in each job',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            dest='reset',
+            default=False,
+            help='Discard the progress of an interrupted run',
+        )
+
+    @property
+    def checkpoint_name(self):
+        return "%s.%s" % (
+            ",".join(sorted(self.projects or [])) or "*",
+            ",".join(sorted(self.languages or [])) or "*")
+
+    def handle_all(self, **options):
+        self.checkpoint = StatsCheckpoint(self.checkpoint_name)
+        if options["reset"]:
+            self.checkpoint.clear()
+        elif self.checkpoint.progress:
+            self.stdout.write(u"Resuming %s" % self.name)
+        self.total_stores = 0
+        self.total_units = 0
+        self.pool = None
+        if options["jobs"] > 1:
+            # the workers must not share the db connection
+            connections.close_all()
+            self.pool = Pool(options["jobs"])
+        start = datetime.datetime.now()
+        try:
+            super(Command, self).handle_all(**options)
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+        progress = self.checkpoint.progress
+        if all(v == self.tp_done for v in progress.values()):
+            self.checkpoint.clear()
+        self.stdout.write(
+            u"Refreshed %s stores (%s units) in %s, %s"
+            % (self.total_stores,
+               self.total_units,
+               datetime.datetime.now() - start,
+               self.get_throughput(self.total_units, start)))
+
+    def get_throughput(self, units, start):
+        seconds = (datetime.datetime.now() - start).total_seconds()
+        return u"%.1f units/sec" % (units / seconds if seconds else 0)
+
+    def get_chunks(self, tp, chunk_size):
+        stores = tp.stores.order_by("pk").values_list("pk", flat=True)
+        last_store = self.checkpoint.get(tp.pk)
+        if last_store is not None:
+            stores = stores.filter(pk__gt=last_store)
+        stores = list(stores)
+        return [
+            stores[i:i + chunk_size]
+            for i
+            in range(0, len(stores), chunk_size)]
+
+    def handle_translation_project(self, tp, **options):
+        if self.checkpoint.get(tp.pk) == self.tp_done:
+            self.stdout.write(u"Skipping %s, already refreshed" % tp)
+            return False
+        start = datetime.datetime.now()
+        chunks = self.get_chunks(tp, options["chunk_size"])
+        results = (
+            self.pool.imap(refresh_stores, chunks)
+            if self.pool is not None
+            else (refresh_stores(chunk) for chunk in chunks))
+        units = 0
+        # results are returned in order, so the checkpoint is only moved
+        # past stores that have been refreshed
+        for i, chunk_units in enumerate(results):
+            chunk = chunks[i]
+            units += chunk_units
+            self.total_stores += len(chunk)
+            self.checkpoint.set(tp.pk, chunk[-1])
+        self.total_units += units
+        with transaction.atomic():
+            for directory in tp.dirs.order_by("-pootle_path").iterator():
+                data_tool.get(Directory)(directory).update()
+            tp.data_tool.update()
+        self.checkpoint.set(tp.pk, self.tp_done)
+        self.stdout.write(
+            u"Refreshed %s (%s units), %s"
+            % (tp, units, self.get_throughput(units, start)))
+        return False
@@ -20,6 +20,9 @@ from . import PootleCommand
 
 class Command(PootleCommand):
     help = "Manage Store formats."
+    # the filetypes are set for each project, not each translation project
+    parallel_translation_projects = False
+    supports_jobs = False
 
     def add_arguments(self, parser):
         super(Command, self).add_arguments(parser)
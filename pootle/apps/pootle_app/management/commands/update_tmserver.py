@@ -6,27 +6,51 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import importlib
 import os
-import sys
 from hashlib import md5
+from multiprocessing.dummy import Pool as ThreadPool
 
 # This must be run before importing Django.
 os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 
-from elasticsearch import Elasticsearch, helpers
 from translate.storage import factory
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import dateparse
 
+from pootle.core.cache import get_cache
 from pootle.core.utils import dateformat
+from pootle_language.models import Language
 from pootle_store.models import Unit
 
 
 BULK_CHUNK_SIZE = 5000
 
 
+class RevisionCheckpoints(object):
+    """The last revision that was indexed for each language of a local TM,
+    which is kept so that an interrupted update resumes from there.
+    """
+
+    def __init__(self, index_name):
+        self.index_name = index_name
+        self.cache = get_cache('redis')
+
+    def get_key(self, language):
+        return 'pootle:tmserver:%s:%s' % (self.index_name, language)
+
+    def get(self, language):
+        return self.cache.get(self.get_key(language))
+
+    def set(self, language, revision):
+        self.cache.set(self.get_key(language), revision)
+
+    def clear(self):
+        self.cache.delete_pattern(self.get_key('*'))
+
+
 class DBParser(object):
 
     def __init__(self, *args, **kwargs):
@@ -34,8 +58,13 @@ class DBParser(object):
         self.INDEX_NAME = kwargs.pop('index', None)
         self.exclude_disabled_projects = not kwargs.pop('disabled_projects')
 
-    def get_units(self, filenames):
-        """Gets the units to import and its total count."""
+    def get_languages(self):
+        return Language.objects.order_by('code').values_list('code', flat=True)
+
+    def get_units(self, filenames, language=None):
+        """Gets the units to import, in revision order, and its total
+        count.
+        """
         units_qs = (
             Unit.objects.exclude(target_f__isnull=True)
                         .exclude(target_f__exact='')
@@ -51,6 +80,10 @@ class DBParser(object):
                 store__translation_project__project__disabled=True
             )
 
+        if language is not None:
+            units_qs = units_qs.filter(
+                store__translation_project__language__code=language)
+
         units_qs = units_qs.values(
             'id',
             'revision',
@@ -63,9 +96,9 @@ class DBParser(object):
             'store__translation_project__project__fullname',
             'store__pootle_path',
             'store__translation_project__language__code'
-        ).order_by()
+        )
 
-        return units_qs.iterator(), units_qs.count()
+        return units_qs.order_by('revision').iterator(), units_qs.count()
 
     def get_unit_data(self, unit):
         """Return dict with data to import for a single unit."""
@@ -109,7 +142,7 @@ class FileParser(object):
         self.target_language = kwargs.pop('language', None)
         self.project = kwargs.pop('project', None)
 
-    def get_units(self, filenames):
+    def get_units(self, filenames, language=None):
         """Gets the units to import and its total count."""
         units = []
         all_filenames = set()
@@ -195,6 +228,22 @@ class Command(BaseCommand):
             default=False,
             help='Report the number of translations to index and quit'
         )
+        parser.add_argument(
+            '--jobs',
+            action='store',
+            type=int,
+            dest='jobs',
+            default=1,
+            help='Number of bulk requests sent to the TM server at a time'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            action='store',
+            type=int,
+            dest='chunk_size',
+            default=BULK_CHUNK_SIZE,
+            help='Number of translations sent in each bulk request'
+        )
 
         # Local TM specific options.
         local = parser.add_argument_group('Local TM', 'Pootle Local '
@@ -240,20 +289,7 @@ class Command(BaseCommand):
                  'translations.'
         )
 
-    def _parse_translations(self, **options):
-        units, total = self.parser.get_units(options['files'])
-
-        if total == 0:
-            self.stdout.write("No translations to index")
-            sys.exit()
-
-        self.stdout.write("%s translations to index" % total)
-
-        if options['dry_run']:
-            sys.exit()
-
-        self.stdout.write("")
-
+    def _parse_translations(self, units, total):
         i = 0
         for i, unit in enumerate(units, start=1):
             if (i % 1000 == 0) or (i == total):
@@ -266,6 +302,83 @@ class Command(BaseCommand):
         if i != total:
             self.stdout.write("Expected %d, loaded %d." % (total, i))
 
+    def _get_rounds(self, translations, chunk_size, jobs):
+        """Splits `translations` into rounds of `jobs` chunks that are sent
+        to the server at the same time.
+        """
+        chunks = []
+        chunk = []
+        for translation in translations:
+            chunk.append(translation)
+            if len(chunk) == chunk_size:
+                chunks.append(chunk)
+                chunk = []
+            if len(chunks) == jobs:
+                yield chunks
+                chunks = []
+        if chunk:
+            chunks.append(chunk)
+        if chunks:
+            yield chunks
+
+    def _bulk(self, translations):
+        objs = {}
+        for translation in translations:
+            obj = {k: v
+                   for k, v in translation.items()
+                   if not k.startswith('_')}
+            obj['id'] = translation['_id']
+            objs.setdefault(translation['_type'], []).append(obj)
+        for language, language_objs in objs.items():
+            self.tm.bulk_update(language, language_objs, raise_on_error=True)
+
+    def _index(self, units, total, language=None, **options):
+        """Sends the translations of `units` to the server in bulk requests,
+        `jobs` requests at a time.
+
+        When updating the local TM, the last indexed revision of `language`
+        is checkpointed after each round of requests.
+        """
+        translations = self._parse_translations(units, total)
+        jobs = max(options['jobs'], 1)
+        pool = ThreadPool(jobs)
+        revision = None
+        try:
+            for chunks in self._get_rounds(translations,
+                                           options['chunk_size'], jobs):
+                pool.map(self._bulk, chunks)
+                if language is None:
+                    continue
+                # the next round can have more translations with the same
+                # revision, so only the revisions before it are done
+                revision = chunks[-1][-1]['revision']
+                self.checkpoints.set(language, revision - 1)
+        finally:
+            pool.close()
+            pool.join()
+        if revision is not None:
+            self.checkpoints.set(language, revision)
+        self.stdout.write("")
+
+    def _index_languages(self, **options):
+        total = 0
+        for language in self.parser.get_languages():
+            self._set_latest_indexed_revision(language, **options)
+            units, language_total = self.parser.get_units(options['files'],
+                                                          language)
+            if not language_total:
+                continue
+            self.stdout.write("%s translations to index for %s" %
+                              (language_total, language))
+            total += language_total
+            if not options['dry_run']:
+                self._index(units, language_total, language, **options)
+
+        if total == 0:
+            self.stdout.write("No translations to index")
+        else:
+            self.stdout.write("%s translations to index" % total)
+
     def _initialize(self, **options):
         if not settings.POOTLE_TM_SERVER:
             raise CommandError('POOTLE_TM_SERVER setting is missing.')
@@ -281,13 +394,6 @@ class Command(BaseCommand):
         self.INDEX_NAME = self.tm_settings['INDEX_NAME']
         self.is_local_tm = options['tm'] == 'local'
 
-        self.es = Elasticsearch([
-            {
-                'host': self.tm_settings['HOST'],
-                'port': self.tm_settings['PORT'],
-            }], retry_on_timeout=True
-        )
-
         # If files to import have been provided.
         if options['files']:
             if self.is_local_tm:
@@ -307,49 +413,61 @@ class Command(BaseCommand):
             self.parser = DBParser(
                 stdout=self.stdout, index=self.INDEX_NAME,
                 disabled_projects=options['disabled_projects'])
+            self.checkpoints = RevisionCheckpoints(self.INDEX_NAME)
+
+        # the index is not created here, as whether it exists decides if
+        # the update can resume
+        module_name, class_name = self.tm_settings['ENGINE'].rsplit('.', 1)
+        self.tm = getattr(importlib.import_module(module_name),
+                          class_name)(options['tm'], create_index=False)
 
-    def _set_latest_indexed_revision(self, **options):
+    def _set_latest_indexed_revision(self, language, **options):
         self.last_indexed_revision = -1
 
-        if (not options['rebuild'] and
-            not options['refresh'] and
-            self.es.indices.exists(self.INDEX_NAME)):
-
-            result = self.es.search(
-                index=self.INDEX_NAME,
-                body={
-                    'aggs': {
-                        'max_revision': {
-                            'max': {
-                                'field': 'revision'
-                            }
-                        }
-                    }
-                }
-            )
-            self.last_indexed_revision = \
-                result['aggregations']['max_revision']['value'] or -1
+        if self.resume:
+            revision = self.checkpoints.get(language)
+            if revision is None:
+                # the TM was updated before checkpoints were kept
+                revision = self.tm.get_last_revision(language)
+            if revision is not None:
+                self.last_indexed_revision = int(revision)
 
         self.parser.last_indexed_revision = self.last_indexed_revision
 
-        self.stdout.write("Last indexed revision = %s" %
-                          self.last_indexed_revision)
+        self.stdout.write("Last indexed revision for %s = %s" %
+                          (language, self.last_indexed_revision))
 
     def handle(self, **options):
         self._initialize(**options)
 
+        index_exists = self.tm.index_exists()
         if (options['rebuild'] and
             not options['dry_run'] and
-            self.es.indices.exists(self.INDEX_NAME)):
+            index_exists):
 
-            self.es.indices.delete(index=self.INDEX_NAME)
+            self.tm.delete_index()
+            index_exists = False
 
         if (not options['dry_run'] and
-            not self.es.indices.exists(self.INDEX_NAME)):
+            not index_exists):
 
-            self.es.indices.create(index=self.INDEX_NAME)
+            self.tm.create_index()
 
         if self.is_local_tm:
-            self._set_latest_indexed_revision(**options)
+            self.resume = (
+                index_exists
+                and not options['rebuild']
+                and not options['refresh'])
+            if not self.resume and not options['dry_run']:
+                self.checkpoints.clear()
+            self._index_languages(**options)
+            return
 
-        helpers.bulk(self.es, self._parse_translations(**options))
+        units, total = self.parser.get_units(options['files'])
+        if total == 0:
+            self.stdout.write("No translations to index")
+            return
+
+        self.stdout.write("%s translations to index" % total)
+        if not options['dry_run']:
+            self._index(units, total, **options)
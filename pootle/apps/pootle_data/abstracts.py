@@ -11,19 +11,14 @@ from translate.filters.decorators import Category
 from django.db import models
 
 
-class AbstractPootleData(models.Model):
+class AbstractPootleStatsData(models.Model):
+    """Stats data without the unit/submission relations, these are defined
+    by subclasses
+    """
 
     class Meta(object):
         abstract = True
 
-    # last untranslated unit created
-    last_created_unit = models.OneToOneField(
-        "pootle_store.Unit",
-        db_index=True,
-        null=True,
-        blank=True,
-        related_name="last_created_for_%(class)s",
-        on_delete=models.CASCADE)
     # the mtime of the last unit to be changed - used to order Stores
     max_unit_mtime = models.DateTimeField(
         null=True,
@@ -36,14 +31,6 @@ class AbstractPootleData(models.Model):
         blank=True,
         default=0,
         db_index=True)
-    # last submission made
-    last_submission = models.OneToOneField(
-        "pootle_statistics.Submission",
-        null=True,
-        blank=True,
-        db_index=True,
-        related_name="%(class)s_stats_data",
-        on_delete=models.CASCADE)
     # the total number of failing critical checks
     critical_checks = models.IntegerField(
         null=False,
@@ -76,6 +63,29 @@ class AbstractPootleData(models.Model):
         db_index=True)
 
 
+class AbstractPootleData(AbstractPootleStatsData):
+
+    class Meta(object):
+        abstract = True
+
+    # last untranslated unit created
+    last_created_unit = models.OneToOneField(
+        "pootle_store.Unit",
+        db_index=True,
+        null=True,
+        blank=True,
+        related_name="last_created_for_%(class)s",
+        on_delete=models.CASCADE)
+    # last submission made
+    last_submission = models.OneToOneField(
+        "pootle_statistics.Submission",
+        null=True,
+        blank=True,
+        db_index=True,
+        related_name="%(class)s_stats_data",
+        on_delete=models.CASCADE)
+
+
 class AbstractPootleChecksData(models.Model):
 
     class Meta(object):
@@ -8,11 +8,42 @@
 
 from django.db.models import Max
 
+from pootle.core.decorators import persistent_property
+from pootle_app.models import Directory
 from pootle_translationproject.models import TranslationProject
 
+from .models import DirectoryData, StoreChecksData, StoreData
+from .tp_data import TPDataUpdater
 from .utils import RelatedStoresDataTool
 
 
+class DirectoryDataUpdater(TPDataUpdater):
+    """Set data for a Directory from the data of the Stores below it"""
+
+    related_name = "directory"
+
+    @property
+    def store_data_qs(self):
+        return StoreData.objects.filter(
+            store__pootle_path__startswith=self.model.pootle_path)
+
+    @property
+    def store_check_data_qs(self):
+        return StoreChecksData.objects.filter(
+            store__pootle_path__startswith=self.model.pootle_path)
+
+    def save_data(self, data_delta=None, **kwargs):
+        # the stale mark is only changed by `stale_directories`, so that a
+        # mark set after the data was read is not overwritten
+        kwargs["update_fields"] = [
+            field.name
+            for field
+            in self.data._meta.concrete_fields
+            if not (field.primary_key or field.name == "stale")]
+        return super(DirectoryDataUpdater, self).save_data(
+            data_delta=data_delta, **kwargs)
+
+
 class DirectoryDataTool(RelatedStoresDataTool):
     """Retrieves aggregate stats for a Directory"""
 
@@ -23,6 +54,40 @@ class DirectoryDataTool(RelatedStoresDataTool):
     def context_name(self):
         return self.context.pootle_path
 
+    @property
+    def is_tp_root(self):
+        return self.context.is_translationproject()
+
+    @property
+    def context_data(self):
+        """The persisted data for the context, this is created if it doesnt
+        exist yet.
+
+        The data of a TP root directory is the data of the TP.
+        """
+        if self.is_tp_root:
+            return self.context.translation_project.data
+        try:
+            data = self.context.data
+        except DirectoryData.DoesNotExist:
+            self.update()
+            return DirectoryData.objects.get(directory=self.context)
+        if data.stale:
+            stale_directories.rollup([self.context])
+            data.refresh_from_db()
+        return data
+
+    @property
+    def context_check_data(self):
+        if self.is_tp_root:
+            return self.context.translation_project.check_data
+        return self.context.check_data
+
+    def update(self, **kwargs):
+        if self.is_tp_root:
+            return self.context.translation_project.data_tool.update(**kwargs)
+        return super(DirectoryDataTool, self).update(**kwargs)
+
     @property
     def max_unit_revision(self):
         try:
@@ -30,34 +95,108 @@ class DirectoryDataTool(RelatedStoresDataTool):
         except TranslationProject.DoesNotExist:
             return self.all_stat_data.aggregate(rev=Max("max_unit_revision"))["rev"]
 
+    @property
+    def object_stats(self):
+        data = self.context_data
+        stats = {
+            v: getattr(data, k)
+            for k, v in self.stats_mapping.items()}
+        stats["last_submission"] = (
+            data.last_submission
+            and data.last_submission.get_submission_info()
+            or None)
+        stats["last_created_unit"] = (
+            data.last_created_unit
+            and data.last_created_unit.get_last_created_unit_info()
+            or None)
+        return stats
+
+    @property
+    def all_object_stats(self):
+        return self.object_stats
+
+    @persistent_property
+    def all_checks_data(self):
+        return self.get_context_checks()
+
+    @persistent_property
+    def checks_data(self):
+        return self.get_context_checks()
+
+    def get_context_checks(self):
+        if not self.is_tp_root:
+            # rolls up the check data of a stale directory
+            self.context_data
+        return dict(
+            self.context_check_data.values_list("name", "count"))
+
+    @property
+    def child_dirs_data(self):
+        stale_directories.rollup(self.context.child_dirs.all())
+        return DirectoryData.objects.filter(
+            directory__parent=self.context).values(
+                *("directory__name", ) + self.max_fields + self.sum_fields)
+
+    @property
+    def child_stores_data(self):
+        return self.data_model.filter(
+            store__parent=self.context).values(
+                *("store__name", ) + self.max_fields + self.sum_fields)
+
     def filter_data(self, qs):
         return qs.filter(
             store__translation_project=self.context.translation_project,
             store__parent__tp_path__startswith=self.context.tp_path)
 
     def get_children_stats(self, qs):
+        """Children stats are read from the persisted data of the child
+        directories and stores
+        """
         children = {}
-        for child in qs.iterator():
-            self.add_child_stats(children, child)
-        child_stores = self.data_model.filter(store__parent=self.context).values(
-            *("store__name", ) + self.max_fields + self.sum_fields)
-        for child in child_stores:
+        for child in self.child_dirs_data:
+            self.add_child_stats(
+                children,
+                child,
+                root=child["directory__name"],
+                use_aggregates=False)
+        for child in self.child_stores_data:
             self.add_child_stats(
                 children,
                 child,
                 root=child["store__name"],
                 use_aggregates=False)
-        self.add_submission_info(self.stat_data, children)
-        self.add_last_created_info(child_stores, children)
+        self.add_submission_info(qs, children)
+        self.add_last_created_info(qs, children)
         return children
 
-    @property
-    def child_stats_qs(self):
-        return super(
-            DirectoryDataTool,
-            self).child_stats_qs.exclude(store__parent=self.context)
 
-    def get_root_child_path(self, child):
-        return (
-            child["store__parent__tp_path"].replace(
-                self.context.tp_path, "").split("/")[0])
+class StaleDirectories(object):
+    """Directories whose data is rolled up from the data of their stores
+    when it is next read, rather than each time one of their stores is
+    updated.
+
+    The marks are kept in the DirectoryData, so that they are committed or
+    rolled back together with the store data that they are set for.
+    """
+
+    def mark(self, directories):
+        DirectoryData.objects.filter(
+            directory__in=directories).update(stale=True)
+
+    def rollup(self, directories):
+        """Updates the data of any of `directories` that are stale"""
+        stale = list(
+            DirectoryData.objects.filter(
+                directory__in=directories,
+                stale=True).values_list("directory_id", flat=True))
+        if not stale:
+            return
+        # the marks are cleared first, so that stores that are updated
+        # during the rollup mark the directories again
+        DirectoryData.objects.filter(
+            directory_id__in=stale).update(stale=False)
+        for directory in Directory.objects.filter(pk__in=stale):
+            DirectoryDataTool(directory).update()
+
+
+stale_directories = StaleDirectories()
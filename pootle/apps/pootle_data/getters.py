@@ -14,7 +14,7 @@ from pootle_project.models import Project, ProjectResource, ProjectSet
 from pootle_store.models import Store
 from pootle_translationproject.models import TranslationProject
 
-from .directory_data import DirectoryDataTool
+from .directory_data import DirectoryDataTool, DirectoryDataUpdater
 from .language_data import LanguageDataTool
 from .project_data import (
     ProjectDataTool, ProjectResourceDataTool, ProjectSetDataTool)
@@ -65,3 +65,8 @@ def language_data_tool_getter(**kwargs_):
 @getter(data_tool, sender=Directory)
 def directory_data_tool_getter(**kwargs_):
     return DirectoryDataTool
+
+
+@getter(data_updater, sender=DirectoryDataTool)
+def directory_data_tool_updater_getter(**kwargs_):
+    return DirectoryDataUpdater
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-18 19:01
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_statistics', '0005_index_ordering'),
+        ('pootle_store', '0023_add_unit_store_idxs'),
+        ('pootle_app', '0017_drop_stray_directories'),
+        ('pootle_data', '0006_add_cascade_deletes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryChecksData',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=64)),
+                ('category', models.IntegerField(db_index=True, default=0)),
+                ('count', models.IntegerField(db_index=True, default=0)),
+                ('directory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='check_data', to='pootle_app.Directory')),
+            ],
+            options={
+                'abstract': False,
+                'db_table': 'pootle_directory_check_data',
+            },
+        ),
+        migrations.CreateModel(
+            name='DirectoryData',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_unit_mtime', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('max_unit_revision', models.IntegerField(blank=True, db_index=True, default=0, null=True)),
+                ('critical_checks', models.IntegerField(db_index=True, default=0)),
+                ('pending_suggestions', models.IntegerField(db_index=True, default=0)),
+                ('total_words', models.IntegerField(db_index=True, default=0)),
+                ('translated_words', models.IntegerField(db_index=True, default=0)),
+                ('fuzzy_words', models.IntegerField(db_index=True, default=0)),
+                ('directory', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='data', to='pootle_app.Directory')),
+                ('last_created_unit', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='last_created_for_directorydata', to='pootle_store.Unit')),
+                ('last_submission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='directorydata_stats_data', to='pootle_statistics.Submission')),
+            ],
+            options={
+                'db_table': 'pootle_directory_data',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='directorychecksdata',
+            unique_together=set([('directory', 'category', 'name')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='directorychecksdata',
+            index_together=set([('directory', 'category', 'name'), ('name', 'category')]),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import logging
+
+from django.db import migrations
+
+
+logger = logging.getLogger(__name__)
+
+
+def update_directory_stats(apps, schema_editor):
+    # the directory data is calculated by the live data tools, which can't
+    # be used with historical models, so it is left to `refresh_stats`
+    Directory = apps.get_model("pootle_app.Directory")
+    if Directory.objects.filter(tp__isnull=False).exists():
+        logger.warning(
+            "Directory stats are not set by this migration, run "
+            "`pootle refresh_stats` to set them")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_data', '0007_add_directory_data'),
+    ]
+
+    operations = [
+        migrations.RunPython(update_directory_stats),
+    ]
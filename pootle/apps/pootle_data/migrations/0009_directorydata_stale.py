@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-18 23:58
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_data', '0008_update_directory_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='directorydata',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -8,7 +8,8 @@
 
 from django.db import models
 
-from .abstracts import AbstractPootleChecksData, AbstractPootleData
+from .abstracts import (
+    AbstractPootleChecksData, AbstractPootleData, AbstractPootleStatsData)
 
 
 class StoreData(AbstractPootleData):
@@ -77,3 +78,56 @@ class TPChecksData(AbstractPootleChecksData):
 
     def __unicode__(self):
         return self.tp.pootle_path
+
+
+class DirectoryData(AbstractPootleStatsData):
+
+    class Meta(object):
+        db_table = "pootle_directory_data"
+
+    directory = models.OneToOneField(
+        "pootle_app.Directory",
+        on_delete=models.CASCADE,
+        db_index=True,
+        related_name="data")
+    # the last created unit and submission are shared by all of the
+    # directories above a store, so these cannot be one2one
+    last_created_unit = models.ForeignKey(
+        "pootle_store.Unit",
+        db_index=True,
+        null=True,
+        blank=True,
+        related_name="last_created_for_directorydata",
+        on_delete=models.CASCADE)
+    last_submission = models.ForeignKey(
+        "pootle_statistics.Submission",
+        null=True,
+        blank=True,
+        db_index=True,
+        related_name="directorydata_stats_data",
+        on_delete=models.CASCADE)
+    # the data is rolled up from the data of the stores below the directory
+    # when it is next read
+    stale = models.BooleanField(default=False)
+
+    def __unicode__(self):
+        return self.directory.pootle_path
+
+
+class DirectoryChecksData(AbstractPootleChecksData):
+
+    class Meta(AbstractPootleChecksData.Meta):
+        db_table = "pootle_directory_check_data"
+        unique_together = ["directory", "category", "name"]
+        index_together = (
+            [AbstractPootleChecksData.Meta.index_together]
+            + [["directory", "category", "name"]])
+
+    directory = models.ForeignKey(
+        "pootle_app.Directory",
+        on_delete=models.CASCADE,
+        db_index=True,
+        related_name="check_data")
+
+    def __unicode__(self):
+        return self.directory.pootle_path
@@ -13,40 +13,83 @@ from django.dispatch import receiver
 
 from pootle.core.delegate import data_tool
 from pootle.core.signals import update_data
+from pootle_app.models import Directory
 from pootle_store.models import Store
 from pootle_translationproject.models import TranslationProject
 
+from .directory_data import stale_directories
 from .models import StoreData
 
 
 logger = logging.getLogger(__name__)
 
 
+def get_store_directories(store):
+    """The directories containing a Store, below the TP root"""
+    tp_path = store.translation_project.pootle_path
+    paths = []
+    path = tp_path
+    for part in store.pootle_path[len(tp_path):].split("/")[:-1]:
+        path = "%s%s/" % (path, part)
+        paths.append(path)
+    return Directory.objects.filter(pootle_path__in=paths)
+
+
 @receiver(post_save, sender=StoreData)
 def handle_storedata_save(**kwargs):
-    tp = kwargs["instance"].store.translation_project
-    update_data.send(tp.__class__, instance=tp)
+    instance = kwargs["instance"]
+    tp = instance.store.translation_project
+    data_delta = getattr(instance, "data_delta", None)
+    # the data of the TP root directory is the data of the TP
+    directories = get_store_directories(instance.store)
+    if data_delta is None:
+        # without a delta the directories are rolled up once, when their
+        # data is next read
+        stale_directories.mark(directories)
+    else:
+        for directory in directories:
+            update_data.send(
+                directory.__class__,
+                instance=directory,
+                data_delta=data_delta)
+    update_data.send(
+        tp.__class__,
+        instance=tp,
+        data_delta=data_delta)
 
 
 @receiver(update_data, sender=Store)
 def handle_store_data_update(**kwargs):
     store = kwargs["instance"]
-    data_tool.get(Store)(store).update()
+    data_tool.get(Store)(store).update(
+        unit_delta=kwargs.get("unit_delta"),
+        unit_deltas=kwargs.get("unit_deltas"),
+        check_delta=kwargs.get("check_delta"))
+
+
+@receiver(update_data, sender=Directory)
+def handle_directory_data_update(**kwargs):
+    directory = kwargs["instance"]
+    data_tool.get(Directory)(directory).update(
+        data_delta=kwargs.get("data_delta"))
 
 
 @receiver(update_data, sender=TranslationProject)
 def handle_tp_data_update(**kwargs):
     tp = kwargs["instance"]
-    data_tool.get(TranslationProject)(tp).update()
+    data_tool.get(TranslationProject)(tp).update(
+        data_delta=kwargs.get("data_delta"))
 
 
 @receiver(post_save, sender=Store)
 def handle_store_data_create(sender, instance, created, **kwargs):
     if created:
-        update_data.send(instance.__class__, instance=instance)
+        # the data is created immediately, even if updates are being
+        # coalesced, as code handling new stores expects it to exist
+        data_tool.get(Store)(instance).update()
 
 
 @receiver(post_save, sender=TranslationProject)
 def handle_tp_data_create(sender, instance, created, **kwargs):
     if created:
-        update_data.send(instance.__class__, instance=instance)
+        data_tool.get(TranslationProject)(instance).update()
@@ -16,7 +16,8 @@ from pootle_store.constants import FUZZY, OBSOLETE, TRANSLATED
 from pootle_store.models import QualityCheck
 from pootle_store.util import SuggestionStates
 
-from .utils import DataTool, DataUpdater
+from .utils import (
+    WORD_FIELDS, DataTool, DataUpdater, get_checks_delta, get_word_delta)
 
 
 class StoreDataTool(DataTool):
@@ -49,6 +50,7 @@ class StoreDataUpdater(DataUpdater):
         "words",
         "max_unit_revision",
         "max_unit_mtime")
+    delta_fields = WORD_FIELDS + ("checks", "critical_checks")
 
     @property
     def store(self):
@@ -130,3 +132,46 @@ class StoreDataUpdater(DataUpdater):
         return (
             self.units.filter(suggestion__state=SuggestionStates.PENDING)
                       .values_list("suggestion").count())
+
+    def get_delta_fields(self, data_delta):
+        # checks are only updated from the delta if it contains them
+        if "checks" in data_delta:
+            return self.delta_fields
+        return WORD_FIELDS
+
+    def get_units_delta(self, unit_deltas):
+        """Combines the word and check changes of several units"""
+        data_delta = get_word_delta()
+        check_delta = None
+        for unit_delta in unit_deltas:
+            unit_delta = unit_delta.copy()
+            unit_checks = unit_delta.pop("checks", None)
+            for k, v in get_word_delta(**unit_delta).items():
+                data_delta[k] += v
+            if unit_checks is not None:
+                check_delta = check_delta or {}
+                for k, count in unit_checks.items():
+                    check_delta[k] = check_delta.get(k, 0) + count
+        return data_delta, check_delta
+
+    def update(self, **kwargs):
+        unit_delta = kwargs.pop("unit_delta", None)
+        unit_deltas = kwargs.pop("unit_deltas", None)
+        check_delta = kwargs.pop("check_delta", None)
+        if unit_delta is not None:
+            unit_deltas = [unit_delta]
+        if unit_deltas is not None:
+            kwargs["data_delta"], units_check_delta = self.get_units_delta(
+                unit_deltas)
+            if units_check_delta is not None:
+                # the changes to the checks of the units are added to any
+                # other changes to the checks
+                check_delta = dict(check_delta or {})
+                for k, count in units_check_delta.items():
+                    check_delta[k] = check_delta.get(k, 0) + count
+        elif check_delta is not None:
+            # only the checks have changed
+            kwargs["data_delta"] = get_word_delta()
+        if check_delta is not None:
+            kwargs["data_delta"].update(get_checks_delta(check_delta))
+        return super(StoreDataUpdater, self).update(**kwargs)
@@ -26,6 +26,8 @@ class TPDataUpdater(DataUpdater):
         "max_unit_revision",
         "max_unit_mtime",
         "pending_suggestions")
+    # TPs are only updated from the deltas of their stores
+    delta_fields = DataUpdater.update_fields
 
     @property
     def aggregate_critical_checks(self):
@@ -102,6 +104,10 @@ class TPDataTool(RelatedStoresDataTool):
             "/%s" % (self.dir_path), "", 1)
         return remainder.split("/")[0]
 
+    def get_children_stats(self, qs):
+        # the children of a TP are those of its directory
+        return self.context.directory.data_tool.get_children_stats(qs)
+
     @property
     def rev_cache_key(self):
         return revision.get(self.context.directory.__class__)(
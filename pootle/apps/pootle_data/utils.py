@@ -6,15 +6,20 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from django.db import models
-from django.db.models import Max, Sum
+from translate.filters.decorators import Category
+
+from django.conf import settings
+from django.db import DatabaseError, models, transaction
+from django.db.models import F, Max, Sum
 from django.utils.functional import cached_property
 
+from pootle.core.cache import get_cache
 from pootle.core.decorators import persistent_property
 from pootle.core.delegate import data_updater, revision
 from pootle.core.url_helpers import split_pootle_path
 from pootle_statistics.models import Submission
 from pootle_statistics.proxy import SubmissionProxy
+from pootle_store.constants import FUZZY, OBSOLETE, TRANSLATED
 from pootle_store.models import Unit
 
 from .models import StoreChecksData, StoreData, TPChecksData, TPData
@@ -27,6 +32,47 @@ SUM_FIELDS = (
     "translated_words",
     "pending_suggestions")
 
+WORD_FIELDS = (
+    "total_words",
+    "fuzzy_words",
+    "translated_words")
+
+
+def get_checks_delta(checks):
+    """Returns the data delta for changes to the check counts in `checks`,
+    keyed on (category, name).
+    """
+    return dict(
+        checks=checks,
+        critical_checks=sum(
+            count
+            for (category, name_), count
+            in checks.items()
+            if category == Category.CRITICAL))
+
+
+def get_word_delta(old_state=None, old_wordcount=None,
+                   state=None, wordcount=None):
+    """Calculates the change to the wordcount fields caused by a unit moving
+    from one state/wordcount to another.
+
+    A state of `None` means the unit didnt exist before/after the change.
+    """
+    delta = {k: 0 for k in WORD_FIELDS}
+    changes = (
+        (-1, old_state, old_wordcount),
+        (1, state, wordcount))
+    for sign, unit_state, unit_wordcount in changes:
+        if unit_state is None or not unit_wordcount > 0:
+            continue
+        if unit_state > OBSOLETE:
+            delta["total_words"] += sign * unit_wordcount
+        if unit_state == TRANSLATED:
+            delta["translated_words"] += sign * unit_wordcount
+        elif unit_state == FUZZY:
+            delta["fuzzy_words"] += sign * unit_wordcount
+    return delta
+
 
 class DataTool(object):
 
@@ -107,6 +153,10 @@ class DataUpdater(object):
         translated_words=0,
         critical_checks=0,
         pending_suggestions=0)
+    # fields that are fully covered by a data_delta, any other fields are
+    # calculated in the usual way when updating from a delta
+    delta_fields = ()
+    data_created = False
 
     def __init__(self, tool):
         self.tool = tool
@@ -120,6 +170,7 @@ class DataUpdater(object):
         try:
             return self.model.data
         except self.data_field.related_model.DoesNotExist:
+            self.data_created = True
             return self.data_field.related_model.objects.create(
                 **{self.related_name: self.model})
 
@@ -132,18 +183,37 @@ class DataUpdater(object):
     def model(self):
         return self.tool.context
 
+    @property
+    def reconcile_key(self):
+        return (
+            "pootle_data.deltas.%s.%s"
+            % (self.related_name, self.model.pk))
+
+    @property
+    def use_delta(self):
+        """Whether a data_delta can be applied to the existing data"""
+        if not settings.POOTLE_DATA_DELTA_UPDATES:
+            return False
+        # newly created data must be calculated in full
+        return bool(self.data.pk and not self.data_created)
+
     def filter_aggregate_fields(self, fields_to_get):
         aggregate_fields = list(self.aggregate_fields)
-        for f in ["max_unit_revision", "max_unit_mtime"]:
-            if f not in fields_to_get:
+        for f in self.aggregate_fields:
+            if f == "words":
+                if not set(fields_to_get) & set(WORD_FIELDS + ("words", )):
+                    aggregate_fields.remove(f)
+            elif f not in fields_to_get:
                 aggregate_fields.remove(f)
         return aggregate_fields
 
     def filter_fields(self, **kwargs):
         if "fields" in kwargs:
-            return list(
-                set(kwargs["fields"])
-                & set(self.update_fields))
+            # keep the order of update_fields as some fields depend on others
+            return [
+                f for f
+                in self.update_fields
+                if f in kwargs["fields"]]
         return self.update_fields
 
     def get_aggregate_data(self, fields):
@@ -169,6 +239,17 @@ class DataUpdater(object):
             agg.update(getattr(self, "aggregate_%s" % field))
         return agg
 
+    def get_data(self, k):
+        return getattr(
+            self.data,
+            (k in self.fk_fields
+             and "%s_id" % k
+             or k))
+
+    def get_delta_fields(self, data_delta):
+        """Fields that are covered by `data_delta`"""
+        return self.delta_fields
+
     def get_fields(self, fields_to_get):
         field_data = {}
         kwargs = self.get_aggregate_data(fields_to_get)
@@ -195,7 +276,11 @@ class DataUpdater(object):
         return data
 
     def set_check_data(self, store_data=None):
+        """Sets the check data, returning a dictionary of changes to the
+        check counts keyed on (category, name).
+        """
         checks = {}
+        check_delta = {}
         existing_checks = self.model.check_data.values_list(
             "pk", "category", "name", "count")
         for pk, category, name, count in existing_checks:
@@ -210,13 +295,17 @@ class DataUpdater(object):
                 checks.get((category, name)))
             if not check_exists:
                 to_add.append(check)
+                check_delta[(category, name)] = count
                 continue
             elif checks[(category, name)][1] != count:
                 to_update.append((checks[(category, name)][0], count))
+                check_delta[(category, name)] = (
+                    count - checks[(category, name)][1])
             del checks[(category, name)]
-        for category, name in checks.keys():
+        for (category, name), (pk_, count) in checks.items():
             # bulk delete?
             self.model.check_data.filter(category=category, name=name).delete()
+            check_delta[(category, name)] = -count
         for pk, count in to_update:
             # bulk update?
             check = self.model.check_data.get(pk=pk)
@@ -232,6 +321,33 @@ class DataUpdater(object):
                        "count": check["count"]}))
         if new_checks:
             self.model.check_data.bulk_create(new_checks)
+        return check_delta
+
+    def set_check_delta(self, check_delta):
+        """Adds the counts in `check_delta` to the existing check data"""
+        checks = {
+            (category, name): pk
+            for pk, category, name
+            in self.model.check_data.values_list("pk", "category", "name")}
+        new_checks = []
+        for (category, name), count in check_delta.items():
+            if not count:
+                continue
+            if (category, name) in checks:
+                self.model.check_data.filter(
+                    pk=checks[(category, name)]).update(
+                        count=F("count") + count)
+            elif count > 0:
+                new_checks.append(
+                    self.check_data_field.related_model(
+                        **{self.related_name: self.model,
+                           "category": category,
+                           "name": name,
+                           "count": count}))
+        if new_checks:
+            self.model.check_data.bulk_create(new_checks)
+        self.model.check_data.filter(count__lte=0).delete()
+        return {k: v for k, v in check_delta.items() if v}
 
     def set_data(self, k, v):
         k = (k in self.fk_fields
@@ -245,7 +361,27 @@ class DataUpdater(object):
             return True
         return False
 
+    def should_reconcile(self):
+        """Every `POOTLE_DATA_RECONCILE_INTERVAL` delta updates a full
+        update is made, correcting any drift in the data.
+        """
+        interval = settings.POOTLE_DATA_RECONCILE_INTERVAL
+        if not interval:
+            return False
+        cache = get_cache("redis")
+        try:
+            count = cache.incr(self.reconcile_key)
+        except ValueError:
+            count = 1
+            cache.set(self.reconcile_key, count)
+        return not count % interval
+
     def update(self, **kwargs):
+        data_delta = kwargs.pop("data_delta", None)
+        if (data_delta is not None
+                and self.use_delta
+                and not self.should_reconcile()):
+            return self.update_delta(data_delta, **kwargs)
         store_data = self.get_store_data(**kwargs)
         data_changed = any(
             [self.set_data(k, store_data[k])
@@ -256,8 +392,90 @@ class DataUpdater(object):
         if data_changed:
             self.save_data()
 
-    def save_data(self):
-        self.data.save()
+    def update_delta(self, data_delta, **kwargs):
+        """Updates the data from a `data_delta`.
+
+        Summed fields in the delta are added to the existing values with
+        `F()` expressions, max fields are set if greater than the existing
+        values, and `checks` are added to the existing check counts. Fields
+        that are not in `delta_fields` are calculated as usual.
+
+        The changes made are passed on with the saved data so that parent
+        data can also be updated incrementally.
+        """
+        fields = self.filter_fields(**kwargs)
+        delta_fields = self.get_delta_fields(data_delta)
+        kwargs["fields"] = [
+            k for k in fields
+            if k not in delta_fields]
+        store_data = self.get_store_data(**kwargs)
+        parent_delta = {}
+        delta_valid = True
+        data_changed = False
+        for k in kwargs["fields"]:
+            if k == "checks":
+                continue
+            original = self.get_data(k)
+            if not self.set_data(k, store_data[k]):
+                continue
+            data_changed = True
+            if k in self.sum_fields:
+                parent_delta[k] = store_data[k] - (original or 0)
+            elif original is None or store_data[k] > original:
+                parent_delta[k] = store_data[k]
+            else:
+                # a max field has decreased, so parents cant be updated
+                # from a delta
+                delta_valid = False
+        incremental = {}
+        for k in delta_fields:
+            if k == "checks" or k not in fields or k not in data_delta:
+                continue
+            if k in self.sum_fields:
+                if data_delta[k]:
+                    incremental[k] = data_delta[k]
+            elif data_delta[k] is not None:
+                original = self.get_data(k)
+                if original is None or data_delta[k] > original:
+                    self.set_data(k, data_delta[k])
+                    parent_delta[k] = data_delta[k]
+                    data_changed = True
+        for k, v in incremental.items():
+            setattr(self.data, k, F(k) + v)
+            parent_delta[k] = v
+        if "checks" in store_data:
+            parent_delta["checks"] = self.set_check_data(store_data)
+        elif "checks" in fields and data_delta.get("checks"):
+            parent_delta["checks"] = self.set_check_delta(data_delta["checks"])
+        if data_changed or incremental or parent_delta.get("checks"):
+            try:
+                with transaction.atomic():
+                    self.save_data(
+                        data_delta=(
+                            parent_delta
+                            if delta_valid
+                            else None),
+                        force_update=True)
+            except DatabaseError:
+                if self.data.__class__.objects.filter(pk=self.data.pk).exists():
+                    raise
+                # the data has been deleted, eg by a cascading delete, so it
+                # is recreated in full
+                self.model.__dict__.pop(self.data_field.get_cache_name(), None)
+                del self.data
+                kwargs["fields"] = fields
+                return self.update(**kwargs)
+        if incremental:
+            self.data.refresh_from_db(fields=incremental.keys())
+
+    def save_data(self, data_delta=None, **kwargs):
+        # the data_delta is used by post_save handlers to update parent
+        # data incrementally
+        self.data.data_delta = data_delta
+        try:
+            self.data.save(**kwargs)
+        finally:
+            del self.data.data_delta
         # this ensures that any calling code gets the
         # correct revision. It doesnt refresh the last
         # created/updated fks tho
@@ -325,6 +543,15 @@ class RelatedStoresDataTool(DataTool):
                self.context_name,
                self.rev_cache_key))
 
+    @property
+    def stale_cache_key(self):
+        # stats for a previous revision can be returned while the stats for
+        # the current revision are being calculated
+        return (
+            'pootle_data.%s.%s.stale'
+            % (self.cache_key_name,
+               self.context_name))
+
     @property
     def child_stats_qs(self):
         """Aggregates grouped sum/max fields"""
@@ -14,6 +14,7 @@ from django.contrib.auth import get_user_model
 from django.utils.functional import cached_property
 from django.utils.lru_cache import lru_cache
 
+from pootle.core.contextmanagers import bulk_data_update
 from pootle.core.delegate import (
     config, response as pootle_response, state as pootle_state)
 from pootle_store.constants import POOTLE_WINS, SOURCE_WINS
@@ -342,9 +343,10 @@ class Plugin(object):
         :param pootle_path: Pootle path glob to filter translations
         :returns response: Where ``response`` is an instance of self.respose_class
         """
-        for fs_state in (state['fs_staged'] + state['fs_ahead']):
-            fs_state.store_fs.file.pull(user=self.pootle_user)
-            response.add("pulled_to_pootle", fs_state=fs_state)
+        with bulk_data_update():
+            for fs_state in (state['fs_staged'] + state['fs_ahead']):
+                fs_state.store_fs.file.pull(user=self.pootle_user)
+                response.add("pulled_to_pootle", fs_state=fs_state)
         return response
 
     @responds_to_state
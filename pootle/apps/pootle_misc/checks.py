@@ -7,15 +7,22 @@
 # AUTHORS file for copyright and authorship information.
 
 import logging
+import pydoc
 import re
+import time
 from collections import OrderedDict
+from hashlib import md5
 
+from translate.__version__ import sver as ttk_version
 from translate.filters import checks
 from translate.filters.decorators import Category, cosmetic, critical
 from translate.lang import data
 
 from django.conf import settings
 
+from pootle import __version__ as pootle_version
+from pootle.core.cache import get_cache
+from pootle.core.utils.multistring import SEPARATOR
 from pootle.i18n.gettext import ugettext_lazy as _
 
 from .util import import_func
@@ -268,22 +275,258 @@ class SkipCheck(Exception):
     pass
 
 
+def _search(regex):
+    def prefilter(str1):
+        return regex.search(str1) is not None
+    return prefilter
+
+
+def _is_date_format(str1):
+    return bool(
+        date_format_regex.match(str1)
+        and not date_format_exception_regex.match(str1))
+
+
+def _not_banner(str1):
+    return not img_banner_regex.match(str1)
+
+
+def _not_plurr(str1):
+    return not plurr_format_regex.search(str1)
+
+
+# the number of source strings that the applicable checks are remembered for
+CHECK_PLAN_SOURCES = 5000
+
+
+class CheckPlan(object):
+    """The checks of a checker for a target language, in the order that
+    they are run.
+
+    Checks that have a source prefilter can only fail when their prefilter
+    is true for the source string, so they are only run for those sources.
+    The applicable checks are remembered for each source string.
+    """
+
+    def __init__(self, checker, maxsize=CHECK_PLAN_SOURCES):
+        ignores = set(checker.get_ignored_filters())
+        names = checker.defaultfilters.keys()
+        self.checks = [
+            name
+            for name
+            in (list(checker.preconditions.keys())
+                + [name for name in names
+                   if name not in checker.preconditions])
+            if name not in ignores]
+        self.prefilters = {
+            name: prefilter
+            for name, prefilter
+            in getattr(checker, "source_prefilters", {}).items()
+            if name in self.checks}
+        self.docs = {}
+        self.maxsize = maxsize
+        self.sources = {}
+
+    def get_doc(self, name, filterfunction):
+        if name not in self.docs:
+            # Strip out unnecessary whitespace from docstring
+            self.docs[name] = pydoc.getdoc(filterfunction)
+        return self.docs[name]
+
+    def get_source_checks(self, str1):
+        try:
+            return self.sources[str1]
+        except KeyError:
+            pass
+        if len(self.sources) >= self.maxsize:
+            self.sources.clear()
+        skipped = set(
+            name
+            for name, prefilter in self.prefilters.items()
+            if not prefilter(str1))
+        applicable = [name for name in self.checks if name not in skipped]
+        self.sources[str1] = applicable, skipped
+        return applicable, skipped
+
+    def get_checks(self, str1):
+        """Returns the names of the checks that can fail for `str1`."""
+        return self.get_source_checks(str1)[0]
+
+    def get_skipped(self, str1):
+        """Returns the names of the checks that always pass for `str1`."""
+        return self.get_source_checks(str1)[1]
+
+
+_check_plans = {}
+
+
+def get_check_plan(checker):
+    """Returns the `CheckPlan` for the checker class, target language and
+    filters of `checker`.
+    """
+    key = (
+        checker.__class__,
+        checker.config.targetlanguage,
+        tuple(sorted(checker.defaultfilters.keys())))
+    if key not in _check_plans:
+        _check_plans[key] = CheckPlan(checker)
+    return _check_plans[key]
+
+
+class CheckTimings(object):
+    """Records the number of calls, and the cumulative and maximum time
+    spent in each check, while enabled.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.timings = {}
+
+    def clear(self):
+        self.timings = {}
+
+    def start(self):
+        if self.enabled:
+            return time.time()
+
+    def stop(self, name, start):
+        if start is None:
+            return
+        elapsed = time.time() - start
+        calls, total, longest = self.timings.get(name, (0, 0, 0))
+        self.timings[name] = (
+            calls + 1,
+            total + elapsed,
+            max(longest, elapsed))
+
+    def get_ranked(self):
+        """Returns `(name, calls, total, max)` for each check, with the most
+        expensive checks first.
+        """
+        return sorted(
+            ((name, ) + timing
+             for name, timing
+             in self.timings.items()),
+            key=lambda timing: (-timing[2], timing[0]))
+
+
+check_timings = CheckTimings()
+
+
 class ENChecker(checks.UnitChecker):
 
+    #: Prefilters for the checks that can only fail for some source strings,
+    #: keyed on check name. A check always passes when its prefilter is not
+    #: true for the source string.
+    source_prefilters = {
+        "java_format": _search(java_format_regex),
+        "template_format": _search(template_format_regex),
+        "android_format": _search(android_format_regex),
+        "objective_c_format": _search(objective_c_format_regex),
+        "javaencoded_unicode": _search(javaencoded_unicode_regex),
+        "dollar_sign_placeholders": _search(dollar_sign_placeholders_regex),
+        "dollar_sign_closure_placeholders": _search(
+            dollar_sign_closure_placeholders_regex),
+        "percent_sign_placeholders": _search(percent_sign_placeholders_regex),
+        "percent_sign_closure_placeholders": _search(
+            percent_sign_closure_placeholders_regex),
+        "uppercase_placeholders": _search(uppercase_placeholders_regex),
+        "mustache_placeholders": _search(mustache_placeholders_regex),
+        "percent_brace_placeholders": _search(
+            percent_brace_placeholders_regex),
+        "mustache_placeholder_pairs": _search(
+            mustache_placeholder_pairs_open_tag_regex),
+        "mustache_like_placeholder_pairs": (
+            lambda str1: not mustache_placeholder_pairs_open_tag_regex.search(
+                str1)),
+        "date_format": _is_date_format,
+        "unescaped_ampersands": _search(escaped_entities_regex),
+        "changed_attributes": _not_banner,
+        "unbalanced_curly_braces": _not_plurr,
+        "tags_differ": (
+            lambda str1: _not_banner(str1) and not no_tags_regex.match(str1)),
+        "accelerators": (
+            lambda str1: _not_plurr(str1) and _not_banner(str1)),
+        "doublequoting": lambda str1: u'"' not in str1,
+        "double_quotes_in_tags": _not_banner,
+        "plurr_format": _search(plurr_format_regex),
+        "plurr_placeholders": _search(plurr_placeholders_regex),
+    }
+
     def run_test(self, test, unit):
         """Runs the given test on the given unit."""
         return test(self.str1, self.str2, language_code=self.language_code)
 
     def run_filters(self, unit, categorised=False):
-        """Make some optimizations before running individual filters in
-        `run_test`.
+        """Run the checks from the `CheckPlan` that can fail for the unit's
+        source.
+
+        :rtype: Dictionary
+        :return: Content of the dictionary is as follows::
+
+           {'testname': {
+               'message': message_or_exception,
+               'category': failure_category
+            }}
         """
         self.str1 = data.normalized_unicode(unit.source) or u''
         self.str2 = data.normalized_unicode(unit.target) or u''
 
         self.language_code = unit.store.translation_project.language.code
 
-        return super(ENChecker, self).run_filters(unit, categorised)
+        plan = get_check_plan(self)
+        self.results_cache = {}
+        failures = {}
+        ignores = set()
+
+        for functionname in plan.get_checks(self.str1):
+            if functionname in ignores:
+                continue
+
+            filterfunction = self.defaultfilters.get(functionname)
+            if filterfunction is None:
+                filterfunction = getattr(self, functionname, None)
+                if filterfunction is None:
+                    continue
+
+            filtermessage = u""
+
+            start = check_timings.start()
+            try:
+                filterresult = self.run_test(filterfunction, unit)
+            except checks.FilterFailure as e:
+                filterresult = False
+                filtermessage = unicode(e)
+            except Exception as e:
+                if self.errorhandler is None:
+                    raise ValueError("error in filter %s: %r, %r, %s" %
+                                     (functionname, unit.source, unit.target,
+                                      e))
+                filterresult = self.errorhandler(functionname, unit.source,
+                                                 unit.target, e)
+            check_timings.stop(functionname, start)
+
+            if not filterresult:
+                if not filtermessage:
+                    # Should be quite rare
+                    filtermessage = plan.get_doc(functionname, filterfunction)
+                # We test some preconditions that aren't actually a cause for
+                # failure
+                if functionname in self.defaultfilters:
+                    failures[functionname] = {
+                        'message': filtermessage,
+                        'category': self.categories[functionname],
+                    }
+
+                if functionname in self.preconditions:
+                    ignores.update(self.preconditions[functionname])
+
+        self.results_cache = {}
+
+        if not categorised:
+            for name, info in failures.items():
+                failures[name] = info['message']
+        return failures
 
     @critical
     def java_format(self, str1, str2, **kwargs):
@@ -1054,6 +1297,11 @@ def run_given_filters(checker, unit, check_names=None):
     checker.hasplural = unit.hasplural()
     checker.locations = unit.getlocations()
 
+    if isinstance(checker, ENChecker):
+        # only run the checks that can fail for the source
+        skipped = get_check_plan(checker).get_skipped(checker.str1)
+        check_names = [name for name in check_names if name not in skipped]
+
     checker.results_cache = {}
     failures = {}
 
@@ -1067,6 +1315,7 @@ def run_given_filters(checker, unit, check_names=None):
 
         filtermessage = filterfunction.__doc__
 
+        start = check_timings.start()
         try:
             filterresult = checker.run_test(filterfunction, unit)
         except checks.FilterFailure, e:
@@ -1079,6 +1328,7 @@ def run_given_filters(checker, unit, check_names=None):
             else:
                 filterresult = checker.errorhandler(functionname, unit.source,
                                                     unit.target, e)
+        check_timings.stop(functionname, start)
 
         if not filterresult:
             # We test some preconditions that aren't actually a cause for
@@ -1094,6 +1344,117 @@ def run_given_filters(checker, unit, check_names=None):
     return failures
 
 
+def get_checker_fingerprint(checker):
+    """Returns a fingerprint of the checks run by `checker`, which changes if
+    the checker classes, target language, or set of checks change.
+    """
+    fingerprint = getattr(checker, "_pootle_fingerprint", None)
+    if fingerprint is not None:
+        return fingerprint
+    filters = (
+        getattr(checker, "combinedfilters", None)
+        or checker.defaultfilters)
+    fingerprint = md5(repr((
+        pootle_version,
+        ttk_version,
+        settings.POOTLE_QUALITY_CHECKER,
+        ["%s.%s" % (c.__class__.__module__, c.__class__.__name__)
+         for c in getattr(checker, "checkers", [checker])],
+        checker.config.targetlanguage,
+        sorted(filters.keys())))).hexdigest()
+    checker._pootle_fingerprint = fingerprint
+    return fingerprint
+
+
+def _get_strings(string):
+    return getattr(string, "strings", [string or u""])
+
+
+class CheckResults(object):
+    """Remembers the failures of quality checks for units with the same
+    source, target, plurality and locations, checked with the same checker.
+
+    Recent results are kept in-process, and are shared between processes if
+    `POOTLE_QUALITY_CHECKS_MEMO_CACHE` is set.
+    """
+
+    cache_key = "pootle_misc.checks.%s"
+
+    def __init__(self):
+        self.results = OrderedDict()
+
+    @property
+    def maxsize(self):
+        return settings.POOTLE_QUALITY_CHECKS_MEMO_SIZE
+
+    @property
+    def cache(self):
+        if settings.POOTLE_QUALITY_CHECKS_MEMO_CACHE:
+            return get_cache(settings.POOTLE_QUALITY_CHECKS_MEMO_CACHE)
+
+    def get_key(self, checker, unit, check_names=None):
+        source_hash = md5(
+            SEPARATOR.join(_get_strings(unit.source)).encode("utf-8"))
+        target_hash = md5(
+            SEPARATOR.join(_get_strings(unit.target)).encode("utf-8"))
+        return md5(repr((
+            get_checker_fingerprint(checker),
+            source_hash.hexdigest(),
+            target_hash.hexdigest(),
+            bool(unit.hasplural()),
+            unit.getlocations(),
+            check_names and sorted(check_names)))).hexdigest()
+
+    def get(self, key):
+        try:
+            failures = self.results.pop(key)
+        except KeyError:
+            cache = self.cache
+            failures = cache and cache.get(self.cache_key % key)
+            if failures is None:
+                return None
+        self.results[key] = failures
+        return failures
+
+    def set(self, key, failures):
+        self.results[key] = failures
+        while len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+        cache = self.cache
+        if cache:
+            cache.set(self.cache_key % key, failures)
+
+    def clear(self):
+        self.results.clear()
+
+    def run_filters(self, checker, unit, check_names=None):
+        """Returns the categorised check failures for `unit`, running the
+        checks if the failures are not remembered.
+
+        If `check_names` is given only those checks are run.
+        """
+        if not self.maxsize:
+            failures = None
+        else:
+            key = self.get_key(checker, unit, check_names)
+            failures = self.get(key)
+        if failures is None:
+            if check_names is None:
+                failures = checker.run_filters(unit, categorised=True)
+            else:
+                failures = run_given_filters(checker, unit, check_names)
+            if self.maxsize:
+                self.set(key, failures)
+        # callers can change the failures
+        return {
+            name: dict(failure)
+            for name, failure
+            in failures.items()}
+
+
+check_results = CheckResults()
+
+
 def get_qualitychecks():
     available_checks = {}
 
@@ -6,9 +6,14 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import bisect
 import difflib
+import hashlib
 from collections import OrderedDict
 
+from translate.misc.multistring import multistring
+
+from django.conf import settings
 from django.db import models
 from django.utils.functional import cached_property
 
@@ -19,6 +24,100 @@ from .fields import to_python as multistring_to_python
 from .unit import UnitProxy
 
 
+def get_matching_blocks(a, b):
+    """Returns the same matching blocks as `difflib.SequenceMatcher` does
+    for the sequences `a` and `b` of unique items, such as unitids.
+
+    As the items are unique each item of `a` matches one item of `b` at
+    most, so the blocks are the runs of consecutive matching items. The
+    longest runs are matched first, and the runs that cross a run that is
+    already matched are skipped, which is what `SequenceMatcher` does without
+    searching the whole of each slice of the sequences for its longest run.
+    """
+    b_indexes = {item: j for j, item in enumerate(b)}
+    if len(b_indexes) != len(b) or len(set(a)) != len(a):
+        return difflib.SequenceMatcher(None, a, b).get_matching_blocks()
+    runs = []
+    last_j = None
+    for i, item in enumerate(a):
+        j = b_indexes.get(item)
+        if j is not None and last_j is not None and j == last_j + 1:
+            runs[-1][2] += 1
+        elif j is not None:
+            runs.append([i, j, 1])
+        last_j = j
+    # runs of the same length are matched in the order of `a`
+    runs.sort(key=lambda run: (-run[2], run[0]))
+    starts = []
+    blocks = []
+    for i, j, size in runs:
+        pos = bisect.bisect(starts, i)
+        if pos and blocks[pos - 1][1] + blocks[pos - 1][2] > j:
+            continue
+        if pos < len(blocks) and j + size > blocks[pos][1]:
+            continue
+        starts.insert(pos, i)
+        blocks.insert(pos, (i, j, size))
+    blocks.append((len(a), len(b), 0))
+    return blocks
+
+
+def get_opcodes(a, b):
+    """Returns the same opcodes as `difflib.SequenceMatcher.get_opcodes`
+    for the sequences `a` and `b` of unique items.
+    """
+    i = j = 0
+    opcodes = []
+    for ai, bj, size in get_matching_blocks(a, b):
+        tag = ''
+        if i < ai and j < bj:
+            tag = 'replace'
+        elif i < ai:
+            tag = 'delete'
+        elif j < bj:
+            tag = 'insert'
+        if tag:
+            opcodes.append((tag, i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
+
+
+def get_comparable(value):
+    """Returns `value` in a form that is compared as the value is, where
+    multistrings are compared by each of their strings.
+    """
+    if isinstance(value, multistring):
+        return (unicode(value), ) + tuple(
+            unicode(string) for string in value.strings[1:])
+    return value
+
+
+def _update_digest(digest, value):
+    if isinstance(value, tuple):
+        digest.update("t%s\0" % len(value))
+        for item in value:
+            _update_digest(digest, item)
+    elif value is None:
+        digest.update("n\0")
+    elif isinstance(value, basestring):
+        value = unicode(value).encode("utf-8")
+        digest.update("s%s\0" % len(value))
+        digest.update(value)
+    else:
+        digest.update("v%s\0" % value)
+
+
+def get_fingerprint_digest(fingerprint):
+    """Returns a digest of a unit fingerprint, the digests of fingerprints
+    that are equal are equal.
+    """
+    digest = hashlib.md5()
+    _update_digest(digest, fingerprint)
+    return digest.digest()
+
+
 class UnitDiffProxy(UnitProxy):
     """Wraps File/DB Unit dicts used by StoreDiff for equality comparison"""
 
@@ -29,6 +128,15 @@ class UnitDiffProxy(UnitProxy):
         return all(getattr(self, k) == getattr(other, k)
                    for k in self.match_attrs)
 
+    @classmethod
+    def get_fingerprint(cls, unit):
+        """Returns a tuple of the matched attributes of the `unit` dict, which
+        is equal to the fingerprint of any unit that is equal to it.
+        """
+        proxy = cls(unit)
+        return tuple(get_comparable(getattr(proxy, k))
+                     for k in cls.match_attrs)
+
     def __ne__(self, other):
         return not self == other
 
@@ -55,7 +163,18 @@ class UnitDiffProxy(UnitProxy):
 
 
 class DBUnit(UnitDiffProxy):
-    pass
+
+    @classmethod
+    def get_fingerprint(cls, unit):
+        # the matched attributes are read from the dict without a proxy
+        return (
+            unit["context"] or "",
+            unit["developer_comment"] or "",
+            unit["locations"] or "",
+            get_comparable(multistring_to_python(unit["source_f"])),
+            unit["state"] or "",
+            get_comparable(multistring_to_python(unit["target_f"])),
+            unit["translator_comment"] or "")
 
 
 class FileUnit(UnitDiffProxy):
@@ -75,6 +194,18 @@ class FileUnit(UnitDiffProxy):
     def hasplural(self):
         return self.unit["hasplural"]
 
+    @classmethod
+    def get_fingerprint(cls, unit):
+        # the matched attributes are read from the dict without a proxy
+        return (
+            unit["context"] or "",
+            unit["developer_comment"] or "",
+            "\n".join(unit["locations"]),
+            get_comparable(multistring_to_python(unit["source"])),
+            unit["state"] or "",
+            get_comparable(multistring_to_python(unit["target"])),
+            unit["translator_comment"] or "")
+
 
 class DiffableStore(object):
     """Default Store representation for diffing
@@ -148,6 +279,76 @@ class DiffableStore(object):
             return self.db_unit_class
         return self.file_unit_class
 
+    def get_source_unit(self, unitid):
+        return self.source_units.get(unitid)
+
+    def get_source_fingerprint(self, unitid):
+        return self.source_unit_class.get_fingerprint(
+            self.source_units[unitid])
+
+    def get_target_fingerprint(self, unitid):
+        return self.target_unit_class.get_fingerprint(
+            self.target_units[unitid])
+
+
+class StreamingDiffableStore(DiffableStore):
+    """Store representation for diffing large stores
+
+    Only the fields that are needed to diff the units and a digest of the
+    fingerprint of each unit are kept, and the db units are read in windows
+    of `window_size` units. The values of units that are added are read
+    from the source store as they are needed.
+    """
+
+    window_size = 2000
+
+    compact_fields = ("unitid", "state", "id", "index", "revision")
+
+    def get_compact_unit(self, unit, fingerprint):
+        compact_unit = {
+            k: unit[k]
+            for k in self.compact_fields
+            if k in unit}
+        compact_unit["fingerprint"] = get_fingerprint_digest(fingerprint)
+        return compact_unit
+
+    def get_db_units(self, unit_qs):
+        diff_units = OrderedDict()
+        ids = list(unit_qs.order_by("index").values_list("id", flat=True))
+        for i in xrange(0, len(ids), self.window_size):
+            window_ids = ids[i:i + self.window_size]
+            units = {
+                unit["id"]: unit
+                for unit
+                in unit_qs.filter(id__in=window_ids).values(*self.unit_fields)}
+            for pk in window_ids:
+                unit = units[pk]
+                diff_units[unit["unitid"]] = self.get_compact_unit(
+                    unit, self.db_unit_class.get_fingerprint(unit))
+        return diff_units
+
+    def get_file_units(self, units):
+        diff_units = OrderedDict()
+        for unit in units:
+            if unit.isheader():
+                continue
+            file_unit = self.get_file_unit(unit)
+            diff_units[unit.getid()] = self.get_compact_unit(
+                file_unit, self.file_unit_class.get_fingerprint(file_unit))
+        return diff_units
+
+    def get_source_unit(self, unitid):
+        if unitid not in self.source_units:
+            return None
+        # only file stores are streamed, see `StoreDiff.should_stream`
+        return self.get_file_unit(self.source_store.findid(unitid))
+
+    def get_source_fingerprint(self, unitid):
+        return self.source_units[unitid]["fingerprint"]
+
+    def get_target_fingerprint(self, unitid):
+        return self.target_units[unitid]["fingerprint"]
+
 
 class StoreDiff(object):
     """Compares 2 DBStores"""
@@ -165,8 +366,19 @@ class StoreDiff(object):
             self.target_store.filetype.name)
         if differ:
             return differ
+        if self.should_stream:
+            return diffs["streaming"]
         return diffs["default"]
 
+    @property
+    def should_stream(self):
+        """Large file stores are diffed with `StreamingDiffableStore`"""
+        streaming_units = settings.POOTLE_STORE_DIFF_STREAMING_UNITS
+        return bool(
+            streaming_units
+            and not isinstance(self.source_store, models.Model)
+            and len(self.source_store.units) > streaming_units)
+
     def get_target_revision(self):
         return self.target_store.get_max_unit_revision()
 
@@ -248,8 +460,9 @@ class StoreDiff(object):
 
         # These unit are either present in both or only in the file so are
         # kept in the file order
+        obsoleted = set(self.obsoleted_target_units)
         new_units += [u for u in self.source_units.keys()
-                      if u not in self.obsoleted_target_units]
+                      if u not in obsoleted]
 
         return new_units
 
@@ -261,10 +474,7 @@ class StoreDiff(object):
 
     @cached_property
     def opcodes(self):
-        sm = difflib.SequenceMatcher(None,
-                                     self.active_target_units,
-                                     self.new_unit_list)
-        return sm.get_opcodes()
+        return get_opcodes(self.active_target_units, self.new_unit_list)
 
     @cached_property
     def updated_target_units(self):
@@ -302,19 +512,22 @@ class StoreDiff(object):
 
         for (insert_at, uids_add, next_index_, delta) in self.insert_points:
             for index, uid in enumerate(uids_add):
-                source_unit = self.source_units.get(uid)
-                if source_unit and uid not in self.target_units:
+                if uid in self.source_units and uid not in self.target_units:
                     new_unit_index = insert_at + index + 1 + offset
-                    to_add += [(proxy(source_unit), new_unit_index)]
+                    to_add += [
+                        (proxy(self.diffable.get_source_unit(uid)),
+                         new_unit_index)]
             if delta > 0:
                 offset += delta
         return to_add
 
     def get_units_to_obsolete(self):
+        active = set(self.active_target_units)
+        updated = set(self.updated_target_units)
         return [unit['id'] for unitid, unit in self.target_units.items()
                 if (unitid not in self.source_units
-                    and unitid in self.active_target_units
-                    and unitid not in self.updated_target_units)]
+                    and unitid in active
+                    and unitid not in updated)]
 
     def get_units_to_update(self):
         uid_index_map = {}
@@ -341,15 +554,12 @@ class StoreDiff(object):
         for (tag, i1, i2, j1_, j2_) in self.opcodes:
             if tag != 'equal':
                 continue
-            update_ids.update(
-                set(self.target_units[uid]['id']
-                    for uid in self.active_target_units[i1:i2]
-                    if (uid in self.source_units
-                        and (
-                            self.diffable.target_unit_class(
-                                self.target_units[uid])
-                            != self.diffable.source_unit_class(
-                                self.source_units[uid])))))
+            for uid in self.active_target_units[i1:i2]:
+                if uid not in self.source_units:
+                    continue
+                if (self.diffable.get_target_fingerprint(uid)
+                        != self.diffable.get_source_fingerprint(uid)):
+                    update_ids.add(self.target_units[uid]['id'])
         return update_ids
 
     def has_changes(self, diff):
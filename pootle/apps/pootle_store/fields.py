@@ -10,12 +10,16 @@
 
 import logging
 import os
+import pickle
+from hashlib import sha1
 
 from translate.misc.multistring import multistring
 
+from django.conf import settings
 from django.db import models
 from django.db.models.fields.files import FieldFile, FileField
 
+from pootle.core.cache import get_cache
 from pootle.core.utils.multistring import (parse_multistring,
                                            unparse_multistring)
 
@@ -115,13 +119,85 @@ class StoreTuple(object):
         self.realpath = realpath
 
 
+class ParsedStores(object):
+    """Shares parsed translation stores between processes.
+
+    Stores are kept in the cache named by `POOTLE_PARSED_STORE_CACHE`, keyed
+    by the hash of the content of the file and the class that parses it, so
+    that a file that has been parsed by any process is not parsed again.
+    Only stores that survive being pickled are shared - lxml based stores
+    such as XLIFF and TS can be pickled, but the unpickled copies are broken,
+    so they are always parsed from the file.
+    """
+
+    cache_key = "pootle_store.parsed.%s.%s"
+    chunk_size = 2 ** 20
+
+    @property
+    def cache(self):
+        if settings.POOTLE_PARSED_STORE_CACHE:
+            return get_cache(settings.POOTLE_PARSED_STORE_CACHE)
+
+    def get_content_hash(self, path):
+        content_hash = sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                content_hash.update(chunk)
+        return content_hash.hexdigest()
+
+    def get_cache_key(self, path, storeclass):
+        return self.cache_key % (
+            "%s.%s" % (storeclass.__module__, storeclass.__name__),
+            self.get_content_hash(path))
+
+    def can_share(self, storeclass):
+        from translate.storage import lisa
+
+        return not issubclass(storeclass, lisa.LISAfile)
+
+    def set(self, cache, cache_key, store):
+        # the file the store was parsed from is not shared
+        fileobj = getattr(store, "fileobj", None)
+        store.fileobj = None
+        try:
+            cache.set(cache_key, store)
+        except (TypeError, pickle.PicklingError):
+            logging.debug(
+                u"Parsed store for %s cannot be shared", store.filename)
+        finally:
+            store.fileobj = fileobj
+
+    def parse(self, path, ignore=None, classes=None):
+        """Returns the store parsed from the file at `path`, from the cache
+        if the same content has been parsed already.
+        """
+        from translate.storage import factory
+
+        cache = self.cache
+        if not cache or not os.path.exists(path):
+            return factory.getobject(path, ignore=ignore, classes=classes)
+        storeclass = factory.getclass(path, ignore=ignore, classes=classes)
+        if not self.can_share(storeclass):
+            return factory.getobject(path, ignore=ignore, classes=classes)
+        cache_key = self.get_cache_key(path, storeclass)
+        store = cache.get(cache_key)
+        if store is not None:
+            store.filename = path
+            return store
+        store = factory.getobject(path, ignore=ignore, classes=classes)
+        self.set(cache, cache_key, store)
+        return store
+
+
+parsed_stores = ParsedStores()
+
+
 class TranslationStoreFieldFile(FieldFile):
     """FieldFile is the file-like object of a FileField, that is found in a
     TranslationStoreField.
     """
 
     from translate.misc.lru import LRUCachingDict
-    from django.conf import settings
 
     _store_cache = LRUCachingDict(settings.PARSE_POOL_SIZE,
                                   settings.PARSE_POOL_CULL_FREQUENCY)
@@ -178,15 +254,13 @@ class TranslationStoreFieldFile(FieldFile):
                     raise KeyError
             except KeyError:
                 logging.debug(u"Cache miss for %s", self.path)
-                from translate.storage import factory
-
                 fileclass = self.instance.syncer.file_class
                 classes = {
                     str(self.instance.filetype.extension): fileclass,
                     str(self.instance.filetype.template_extension): fileclass}
-                store_obj = factory.getobject(self.path,
-                                              ignore=self.field.ignore,
-                                              classes=classes)
+                store_obj = parsed_stores.parse(self.path,
+                                                ignore=self.field.ignore,
+                                                classes=classes)
                 self._store_tuple = StoreTuple(store_obj, mod_info,
                                                self.realpath)
                 self._store_cache[self.path] = self._store_tuple
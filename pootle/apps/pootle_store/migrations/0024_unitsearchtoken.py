@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-18 20:50
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_language', '0002_case_insensitive_schema'),
+        ('pootle_store', '0023_add_unit_store_idxs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitSearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=3)),
+                ('language', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='pootle_language.Language')),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pootle_store.Unit')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='unitsearchtoken',
+            unique_together=set([('token', 'language', 'unit')]),
+        ),
+    ]
@@ -7,6 +7,7 @@
 # AUTHORS file for copyright and authorship information.
 
 import datetime
+import functools
 import operator
 from hashlib import md5
 
@@ -46,9 +47,10 @@ from pootle.core.utils import dateformat
 from pootle.core.utils.aggregate import max_column
 from pootle.core.utils.multistring import PLURAL_PLACEHOLDER, SEPARATOR
 from pootle.core.utils.timezone import datetime_min, make_aware
+from pootle.core.utils.wordcount import WordCounter
 from pootle.i18n.gettext import ugettext_lazy as _
 from pootle_format.models import Format
-from pootle_misc.checks import check_names
+from pootle_misc.checks import check_names, check_results
 from pootle_misc.util import import_func
 from pootle_statistics.models import (Submission, SubmissionFields,
                                       SubmissionTypes)
@@ -58,8 +60,11 @@ from .constants import (
     TRANSLATED, UNTRANSLATED)
 from .fields import MultiStringField, TranslationStoreField
 from .managers import StoreManager, SuggestionManager, UnitManager
+from .side_effects import unit_side_effects
+from .source import SourceStrings
 from .store.deserialize import StoreDeserialization
 from .store.serialize import StoreSerialization
+from .unit.search_index import search_index
 from .util import SuggestionStates, vfolders_installed
 
 
@@ -99,6 +104,21 @@ class QualityCheck(models.Model):
             .exclude(name__in=check_names.keys())
         unknown_checks.delete()
 
+
+class UnitSearchToken(models.Model):
+    """Trigram of the searchable text of a unit, used to narrow down unit
+    searches when `POOTLE_SEARCH_INDEX` is enabled.
+    """
+
+    token = models.CharField(max_length=3, db_index=False)
+    unit = models.ForeignKey("pootle_store.Unit", db_index=True,
+                             on_delete=models.CASCADE)
+    language = models.ForeignKey("pootle_language.Language", db_index=False,
+                                 on_delete=models.CASCADE)
+
+    class Meta(object):
+        unique_together = ("token", "language", "unit")
+
 # # # # # # # # # Suggestion # # # # # # # #
 
 
@@ -173,15 +193,21 @@ class Suggestion(models.Model, base.TranslationUnit):
 # # # # # # # # Unit # # # # # # # # # #
 
 wordcount_f = import_func(settings.POOTLE_WORDCOUNT_FUNC)
+if not isinstance(wordcount_f, WordCounter):
+    wordcount_f = WordCounter(wordcount_f)
 
 
 def count_words(strings):
-    wordcount = 0
+    return sum(wordcount_f.count_many(strings))
+
 
-    for string in strings:
-        wordcount += wordcount_f(string)
+def count_source_words(strings):
+    # the counts are remembered by `source_strings`, rather than by
+    # `wordcount_f`
+    return sum(wordcount_f.func(string) for string in strings)
 
-    return wordcount
+
+source_strings = SourceStrings(count_source_words)
 
 
 def stringcount(string):
@@ -303,6 +329,76 @@ class Unit(models.Model, base.TranslationUnit):
         self._comment_updated = False
         self._auto_translated = False
         self._encoding = 'UTF-8'
+        self._freeze_state()
+
+    def _freeze_state(self):
+        # deferred fields are not in the instance dict, so this never
+        # triggers a db lookup
+        self._original_state = self.__dict__.get("state")
+        self._original_wordcount = self.__dict__.get("source_wordcount")
+        self._original_search_values = [
+            self.__dict__.get(field) for field in search_index.fields]
+        # changes to the active (not false positive) checks of the unit
+        self._check_delta = {}
+
+    def _search_values_updated(self):
+        """Whether any of the fields that are indexed for searches have
+        changed since the unit was loaded or last saved.
+        """
+        return any(
+            self.__dict__.get(field) != original
+            for field, original
+            in zip(search_index.fields, self._original_search_values))
+
+    def _add_check_delta(self, category, name, count=1):
+        key = (category, name)
+        self._check_delta[key] = self._check_delta.get(key, 0) + count
+
+    def get_check_delta(self, old_state=None):
+        """Returns the changes to the counted checks of the unit, keyed on
+        (category, name).
+
+        Checks are only counted for units that are not obsolete, so if the
+        unit has become (non-)obsolete all of its active checks are added or
+        removed.
+        """
+        counted = self.state > OBSOLETE
+        was_counted = old_state is not None and old_state > OBSOLETE
+        if old_state is None or counted == was_counted:
+            return (
+                dict(self._check_delta)
+                if counted
+                else {})
+        checks = {}
+        active_checks = self.get_active_qualitychecks().values_list(
+            "category", "name")
+        for category, name in active_checks:
+            checks[(category, name)] = 1
+        if counted:
+            return checks
+        # the checks that were counted before this change
+        for key, count in self._check_delta.items():
+            checks[key] = checks.get(key, 0) - count
+        return {k: -v for k, v in checks.items() if v}
+
+    def get_unit_delta(self, created=False):
+        """Returns the state/wordcount transition and the changes to the
+        checks since the unit was loaded or last saved, or `None` if the
+        original values are not known.
+        """
+        if created:
+            old_state = old_wordcount = None
+        elif None in (self._original_state, self._original_wordcount):
+            return None
+        else:
+            old_state = self._original_state
+            old_wordcount = self._original_wordcount
+        return dict(
+            old_state=old_state,
+            old_wordcount=old_wordcount,
+            state=self.state,
+            wordcount=self.source_wordcount,
+            checks=self.get_check_delta(old_state))
 
     def delete(self, *args, **kwargs):
         action_log(user='system', action=UNIT_DELETED,
@@ -310,31 +406,63 @@ class Unit(models.Model, base.TranslationUnit):
                    unit=self.id, translation='', path=self.store.pootle_path)
         super(Unit, self).delete(*args, **kwargs)
 
-    def save(self, *args, **kwargs):
-        created = self.id is None
-        source_updated = kwargs.pop("source_updated", None) or self._source_updated
-        target_updated = kwargs.pop("target_updated", None) or self._target_updated
-        state_updated = kwargs.pop("state_updated", None) or self._state_updated
-        auto_translated = (
-            kwargs.pop("auto_translated", None)
-            or self._auto_translated)
-        comment_updated = (
-            kwargs.pop("comment_updated", None)
-            or self._comment_updated)
-        action = kwargs.pop("action", None) or getattr(self, "_save_action", None)
-
+    def get_save_options(self, kwargs):
+        """Pops the options for saving the unit from the `save` kwargs,
+        combined with the changes flagged on the unit.
+        """
         if not hasattr(self, '_log_user'):
             User = get_user_model()
             self._log_user = User.objects.get_system_user()
-        user = kwargs.pop("user", self._log_user)
+        return dict(
+            source_updated=(
+                kwargs.pop("source_updated", None)
+                or self._source_updated),
+            target_updated=(
+                kwargs.pop("target_updated", None)
+                or self._target_updated),
+            state_updated=(
+                kwargs.pop("state_updated", None)
+                or self._state_updated),
+            auto_translated=(
+                kwargs.pop("auto_translated", None)
+                or self._auto_translated),
+            comment_updated=(
+                kwargs.pop("comment_updated", None)
+                or self._comment_updated),
+            action=(
+                kwargs.pop("action", None)
+                or getattr(self, "_save_action", None)),
+            user=kwargs.pop("user", self._log_user),
+            revision=kwargs.pop('revision', None))
+
+    def needs_revision(self, options):
+        """Whether saving the unit with `options` gives it a new revision,
+        rather than the revision passed in `options`.
+        """
+        if options["revision"] is not None and not options["auto_translated"]:
+            return False
+        return bool(
+            options["target_updated"]
+            or options["state_updated"]
+            or options["comment_updated"])
+
+    def prepare_save(self, created, options):
+        """Updates the fields that are derived from the changes to the unit,
+        before it is saved, and sets the `action` to log in `options`.
+        """
+        action = options["action"]
+        source_updated = options["source_updated"]
+        target_updated = options["target_updated"]
+        state_updated = options["state_updated"]
 
         if created:
             action = UNIT_ADDED
 
         if source_updated:
             # update source related fields
-            self.source_hash = md5(self.source_f.encode("utf-8")).hexdigest()
-            self.source_length = len(self.source_f)
+            source = source_strings.get(self.source_f)
+            self.source_hash = source["source_hash"]
+            self.source_length = source["source_length"]
             self.update_wordcount(auto_translate=True)
 
         if target_updated:
@@ -357,20 +485,12 @@ class Unit(models.Model, base.TranslationUnit):
         # a new value (the same for all units during its store updated)
         # since that change doesn't require further sync but note that
         # auto_translated units require further sync
-        revision = kwargs.pop('revision', None)
-        if revision is not None and not auto_translated:
+        revision = options["revision"]
+        if revision is not None and not options["auto_translated"]:
             self.revision = revision
-        elif target_updated or state_updated or comment_updated:
+        elif self.needs_revision(options):
             self.revision = Revision.incr()
 
-        if not created and action:
-            action_log(
-                user=self._log_user,
-                action=action,
-                lang=self.store.translation_project.language.code,
-                unit=self.id,
-                translation=self.target_f,
-                path=self.store.pootle_path)
         was_fuzzy = (
             state_updated and self.state == TRANSLATED
             and action == TRANSLATION_CHANGED
@@ -391,34 +511,93 @@ class Unit(models.Model, base.TranslationUnit):
             self.reviewed_by = None
             self.submitted_by = None
             self.submitted_on = None
+        options["action"] = action
+
+    def _clear_save_flags(self):
+        # done processing source/target update remove flag
+        self._source_updated = False
+        self._target_updated = False
+        self._state_updated = False
+        self._comment_updated = False
+        self._auto_translated = False
+
+    def save(self, *args, **kwargs):
+        created = self.id is None
+        options = self.get_save_options(kwargs)
+        self.prepare_save(created, options)
+        action = options["action"]
+        user = options["user"]
+        source_updated = options["source_updated"]
+        target_updated = options["target_updated"]
+
+        if not created and action:
+            self._log_action(action)
 
         super(Unit, self).save(*args, **kwargs)
 
         if action and action == UNIT_ADDED:
-            action_log(
-                user=self._log_user,
-                action=action,
-                lang=self.store.translation_project.language.code,
+            self._log_action(action)
+            self._run_side_effect(
+                "initial_submission",
+                functools.partial(self.add_initial_submission, user=user),
                 unit=self.id,
-                translation=self.target_f,
-                path=self.store.pootle_path)
-            self.add_initial_submission(user=user)
+                user=(user or self._log_user).pk)
 
         if source_updated or target_updated:
             if not (created and self.state == UNTRANSLATED):
-                self.update_qualitychecks()
+                self._run_side_effect(
+                    "qualitychecks",
+                    self.update_qualitychecks,
+                    unit=self.id)
             if self.istranslated():
-                self.update_tmserver()
-
-        # done processing source/target update remove flag
-        self._source_updated = False
-        self._target_updated = False
-        self._state_updated = False
-        self._comment_updated = False
-        self._auto_translated = False
-
-        update_data.send(
-            self.store.__class__, instance=self.store)
+                self._run_side_effect(
+                    "tmserver",
+                    self.update_tmserver,
+                    unit=self.id)
+
+        # the tokens are only replaced if the indexed text has changed
+        search_updated = created or self._search_values_updated()
+        if search_index.enabled and search_updated:
+            self._run_side_effect(
+                "search_index",
+                functools.partial(search_index.update, self.store, [self]),
+                unit=self.id)
+
+        self._clear_save_flags()
+        unit_delta = self.get_unit_delta(created=created)
+        self._freeze_state()
+
+        self._run_side_effect(
+            "update_data",
+            functools.partial(
+                update_data.send,
+                self.store.__class__,
+                instance=self.store,
+                unit_delta=unit_delta),
+            unit_delta=unit_delta)
+
+    def _log_action(self, action):
+        log = dict(
+            user=self._log_user,
+            action=action,
+            lang=self.store.translation_project.language.code,
+            unit=self.id,
+            translation=self.target_f,
+            path=self.store.pootle_path)
+        self._run_side_effect(
+            "action_log",
+            functools.partial(action_log, **log),
+            **log)
+
+    def _run_side_effect(self, effect, run, **item):
+        """Runs a side effect of saving the unit, or if the effect is
+        deferred records `item` so that it is run for the store after the
+        transaction is committed.
+        """
+        if unit_side_effects.is_deferred(effect):
+            unit_side_effects.add(effect, self.store_id, item)
+        else:
+            run()
 
     def get_absolute_url(self):
         return self.store.get_absolute_url()
@@ -612,7 +791,8 @@ class Unit(models.Model, base.TranslationUnit):
         :param auto_translate: when set to `True`, it will copy the
             source string into the target field.
         """
-        self.source_wordcount = count_words(self.source_f.strings)
+        self.source_wordcount = source_strings.get(
+            self.source_f)["source_wordcount"]
 
         if self.source_wordcount == 0:
             # We can't set the actual wordcount to zero since the unit
@@ -641,22 +821,26 @@ class Unit(models.Model, base.TranslationUnit):
         checks = self.qualitycheck_set.all()
 
         existing = {}
-        for check in checks.values('name', 'false_positive', 'id'):
+        for check in checks.values('name', 'false_positive', 'id', 'category'):
             existing[check['name']] = {
                 'false_positive': check['false_positive'],
                 'id': check['id'],
+                'category': check['category'],
             }
 
         # no checks if unit is untranslated
         if not self.target:
             if existing:
                 self.qualitycheck_set.all().delete()
+                for name, check in existing.items():
+                    if not check['false_positive']:
+                        self._add_check_delta(check['category'], name, -1)
                 return True
 
             return False
 
         checker = self.store.translation_project.checker
-        qc_failures = checker.run_filters(self, categorised=True)
+        qc_failures = check_results.run_filters(checker, self)
         checks_to_add = []
         for name in qc_failures.iterkeys():
             if name in existing:
@@ -664,6 +848,7 @@ class Unit(models.Model, base.TranslationUnit):
                 if (existing[name]['false_positive'] and
                         not keep_false_positives):
                     unmute_list.append(name)
+                    self._add_check_delta(existing[name]['category'], name)
                 del existing[name]
                 continue
 
@@ -675,6 +860,7 @@ class Unit(models.Model, base.TranslationUnit):
                     name=name,
                     message=message,
                     category=category))
+            self._add_check_delta(category, name)
             result = True
 
         if checks_to_add:
@@ -687,6 +873,9 @@ class Unit(models.Model, base.TranslationUnit):
         # delete inactive checks
         if existing:
             self.qualitycheck_set.filter(name__in=existing).delete()
+            for name, check in existing.items():
+                if not check['false_positive']:
+                    self._add_check_delta(check['category'], name, -1)
 
         changed = result or bool(unmute_list) or bool(existing)
         return changed
@@ -723,7 +912,8 @@ class Unit(models.Model, base.TranslationUnit):
 
 # # # # # # # # # # # TranslationUnit # # # # # # # # # # # # # #
 
-    def update_tmserver(self):
+    def get_tmserver_data(self):
+        """Returns the data of the unit that is indexed in the TM server."""
         obj = {
             'id': self.id,
             # 'revision' must be an integer for statistical queries to work
@@ -749,9 +939,11 @@ class Unit(models.Model, base.TranslationUnit):
                 'fullname': self.submitted_by.full_name,
                 'email_md5': md5(self.submitted_by.email).hexdigest(),
             })
+        return obj
 
+    def update_tmserver(self):
         get_tm_broker().update(self.store.translation_project.language.code,
-                               obj)
+                               self.get_tmserver_data())
 
     def get_tm_suggestions(self):
         return get_tm_broker().search(self)
@@ -888,6 +1080,8 @@ class Unit(models.Model, base.TranslationUnit):
 
         check.false_positive = false_positive
         check.save()
+        self._add_check_delta(
+            check.category, check.name, false_positive and -1 or 1)
 
         self._log_user = user
         if false_positive:
@@ -9,14 +9,16 @@
 from pootle.core.delegate import format_diffs, format_syncers, format_updaters
 from pootle.core.plugin import provider
 
-from .diff import DiffableStore
+from .diff import DiffableStore, StreamingDiffableStore
 from .syncer import StoreSyncer
 from .updater import StoreUpdater
 
 
 @provider(format_diffs)
 def register_format_diffs(**kwargs_):
-    return dict(default=DiffableStore)
+    return dict(
+        default=DiffableStore,
+        streaming=StreamingDiffableStore)
 
 
 @provider(format_syncers)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from django_rq.queues import get_queue
+
+from pootle.core.log import action_log
+from pootle.core.signals import update_data
+
+
+logger = logging.getLogger(__name__)
+
+
+SYNC = "sync"
+COMMIT = "commit"
+RQ = "rq"
+SIDE_EFFECT_MODES = (SYNC, COMMIT, RQ)
+
+
+def _get_units(store, items):
+    units = store.unit_set.filter(
+        pk__in=set(item["unit"] for item in items)).order_by("index")
+    units = units.select_related("submitted_by")
+    for unit in units.iterator():
+        unit.store = store
+        yield unit
+
+
+def log_actions(store, items):
+    for item in items:
+        action_log(**item)
+
+
+def add_initial_submissions(store, items):
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    users = User.objects.in_bulk(set(item["user"] for item in items))
+    submitters = {item["unit"]: users.get(item["user"]) for item in items}
+    for unit in _get_units(store, items):
+        unit.add_initial_submission(
+            user=(
+                submitters[unit.pk]
+                or User.objects.get_system_user()))
+
+
+def update_qualitychecks(store, items):
+    check_delta = {}
+    for unit in _get_units(store, items):
+        unit.update_qualitychecks()
+        for k, count in unit.get_check_delta().items():
+            check_delta[k] = check_delta.get(k, 0) + count
+    check_delta = {k: count for k, count in check_delta.items() if count}
+    if check_delta:
+        update_data.send(
+            store.__class__,
+            instance=store,
+            check_delta=check_delta)
+
+
+def update_tmserver(store, items):
+    from pootle_store.models import get_tm_broker
+
+    # the units of the store are sent to the TM server in one request
+    get_tm_broker().bulk_update(
+        store.translation_project.language.code,
+        [unit.get_tmserver_data()
+         for unit in _get_units(store, items)
+         if unit.istranslated()])
+
+
+def update_search_index(store, items):
+    from pootle_store.unit.search_index import search_index
+
+    search_index.update(store, _get_units(store, items))
+
+
+def update_store_data(store, items):
+    unit_deltas = [item["unit_delta"] for item in items]
+    if None in unit_deltas:
+        # the change to at least one of the units is not known
+        unit_deltas = None
+    update_data.send(
+        store.__class__,
+        instance=store,
+        unit_deltas=unit_deltas)
+
+
+# the side effects of saving a unit, in the order they are run
+SIDE_EFFECTS = OrderedDict((
+    ("action_log", log_actions),
+    ("initial_submission", add_initial_submissions),
+    ("qualitychecks", update_qualitychecks),
+    ("tmserver", update_tmserver),
+    ("search_index", update_search_index),
+    ("update_data", update_store_data)))
+
+
+def run_side_effect(effect, store_pk, items):
+    """Runs a side effect for the saved units of a store.
+
+    This is run in-process after the transaction is committed, or by an rq
+    worker.
+    """
+    from pootle_store.models import Store
+
+    try:
+        store = Store.objects.select_related(
+            "translation_project__language",
+            "translation_project__project").get(pk=store_pk)
+    except Store.DoesNotExist:
+        logger.debug(
+            "Store (%s) removed before running '%s' side effect",
+            store_pk, effect)
+        return
+    with transaction.atomic():
+        SIDE_EFFECTS[effect](store, items)
+
+
+class SideEffectBatch(object):
+    """The side effects of units saved in a transaction or savepoint, grouped
+    by effect and store.
+    """
+
+    def __init__(self):
+        self.items = OrderedDict(
+            (effect, OrderedDict())
+            for effect
+            in SIDE_EFFECTS)
+        self._on_commit = None
+
+    def add(self, effect, store_pk, item):
+        self.items[effect].setdefault(store_pk, []).append(item)
+
+    @property
+    def is_registered(self):
+        # the connection holds the only reference to the callback, and drops
+        # it if the transaction or savepoint it was registered in is rolled
+        # back
+        return bool(self._on_commit and self._on_commit())
+
+    def register(self):
+        """Flushes the batch once the current transaction or savepoint is
+        committed.
+        """
+        on_commit = self.flush
+        self._on_commit = weakref.ref(on_commit)
+        transaction.on_commit(on_commit)
+
+    def flush(self):
+        self._on_commit = None
+        for effect, stores in self.items.items():
+            for store_pk, items in stores.items():
+                try:
+                    unit_side_effects.dispatch(effect, store_pk, items)
+                except Exception:
+                    # the units have already been saved
+                    logger.exception(
+                        "Failed running '%s' side effect for Store (%s)",
+                        effect, store_pk)
+
+
+class UnitSideEffects(object):
+    """Runs the side effects of saving units.
+
+    Each effect can be run synchronously, when the unit is saved, or
+    recorded and run for each store once the transaction is committed,
+    either in-process or by an rq worker.
+
+    The mode for each effect is set with `POOTLE_UNIT_SIDE_EFFECTS`.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get_mode(self, effect):
+        mode = settings.POOTLE_UNIT_SIDE_EFFECTS.get(effect, SYNC)
+        if mode not in SIDE_EFFECT_MODES:
+            return SYNC
+        return mode
+
+    def is_deferred(self, effect):
+        return self.get_mode(effect) != SYNC
+
+    @property
+    def batches(self):
+        """The batches of this thread that are waiting for their transaction
+        or savepoint to be committed, keyed by savepoint.
+        """
+        batches = getattr(self._local, "batches", None)
+        if batches is None:
+            batches = self._local.batches = OrderedDict()
+        for sids, batch in batches.items():
+            if not batch.is_registered:
+                del batches[sids]
+        return batches
+
+    def add(self, effect, store_pk, item):
+        """Records a side effect to run for a unit in the store once the
+        transaction is committed.
+        """
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            self.dispatch(effect, store_pk, [item])
+            return
+        # effects are batched for each savepoint, so that the effects of a
+        # savepoint that is rolled back are dropped with it
+        sids = tuple(sid for sid in connection.savepoint_ids if sid)
+        batches = getattr(self._local, "batches", {})
+        batch = batches.get(sids)
+        if batch is None or not batch.is_registered:
+            batch = SideEffectBatch()
+            batch.register()
+            self.batches[sids] = batch
+        batch.add(effect, store_pk, item)
+
+    def dispatch(self, effect, store_pk, items):
+        if self.get_mode(effect) == RQ:
+            get_queue('default').enqueue(
+                run_side_effect, effect, store_pk, items)
+        else:
+            run_side_effect(effect, store_pk, items)
+
+
+unit_side_effects = UnitSideEffects()
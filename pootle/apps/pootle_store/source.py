@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from hashlib import md5
+
+from django.conf import settings
+
+from pootle.core.cache import get_cache
+from pootle.core.utils.multistring import SEPARATOR
+
+
+# the number of source strings that are remembered in-process
+SOURCE_STRINGS_SIZE = 10000
+
+
+class SourceStrings(object):
+    """The values derived from source strings - the hash, length and
+    wordcount - which are the same for all units with the same source in any
+    store or language.
+
+    Values are remembered in-process, keyed on the source strings, and are
+    shared between processes with the `lru` cache, keyed on their hash.
+    `count_words` should not remember counts itself, so that only this cache
+    is kept for source strings.
+    """
+
+    cache_key = "pootle_store.source.%s.%s"
+
+    def __init__(self, count_words, maxsize=SOURCE_STRINGS_SIZE):
+        self.count_words = count_words
+        self.maxsize = maxsize
+        self.sources = {}
+
+    @property
+    def cache(self):
+        return get_cache("lru")
+
+    def get_key(self, source):
+        """Returns the in-process key for `source`, which is its string for
+        sources without plurals.
+        """
+        strings = source.strings
+        if len(strings) == 1:
+            return strings[0]
+        return tuple(strings)
+
+    def get_cache_key(self, source):
+        """Returns the shared cache key for `source`, the hash of its
+        strings.
+        """
+        source_hash = md5(
+            SEPARATOR.join(source.strings).encode("utf-8")).hexdigest()
+        # wordcounts depend on the configured wordcount function
+        return self.cache_key % (settings.POOTLE_WORDCOUNT_FUNC, source_hash)
+
+    def calculate(self, source):
+        return dict(
+            source_hash=md5(source.encode("utf-8")).hexdigest(),
+            source_length=len(source),
+            source_wordcount=self.count_words(source.strings))
+
+    def remember(self, key, values):
+        if len(self.sources) >= self.maxsize:
+            self.sources.clear()
+        self.sources[key] = values
+
+    def get(self, source):
+        """Returns the values for the `source` multistring."""
+        key = self.get_key(source)
+        values = self.sources.get(key)
+        if values is None:
+            values = self.calculate(source)
+            self.remember(key, values)
+        return values
+
+    def prefetch(self, sources):
+        """Gets the values for `sources` that are not remembered from the
+        shared cache, calculating and storing any that are not cached.
+        """
+        missing = {}
+        for source in sources:
+            key = self.get_key(source)
+            if key not in self.sources:
+                missing[self.get_cache_key(source)] = (key, source)
+        if not missing:
+            return
+        cached = self.cache.get_many(missing.keys())
+        calculated = {}
+        for cache_key, (key, source) in missing.items():
+            values = cached.get(cache_key)
+            if values is None:
+                values = calculated[cache_key] = self.calculate(source)
+            self.remember(key, values)
+        if calculated:
+            self.cache.set_many(calculated)
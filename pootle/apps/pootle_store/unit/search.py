@@ -6,12 +6,18 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+from array import array
+from hashlib import md5
+
 from django.db.models import Max
 from django.utils.functional import cached_property
 
+from pootle.core.cache import get_cache
+from pootle.core.models import Revision
 from pootle_store.constants import SIMPLY_SORTED
 from pootle_store.models import Unit
 from pootle_store.unit.filters import UnitSearchFilter, UnitTextSearch
+from pootle_store.unit.search_index import search_index
 
 
 class DBSearchBackend(object):
@@ -21,6 +27,12 @@ class DBSearchBackend(object):
     select_related = (
         'store__translation_project__project',
         'store__translation_project__language')
+    # the search kwargs that the results depend on
+    results_keys = (
+        "category", "checks", "dir_path", "filename", "filter",
+        "language_code", "modified-since", "month", "project_code", "search",
+        "sfields", "soptions", "sort_by", "sort_on", "user")
+    results_cache_timeout = 60 * 60
 
     def __init__(self, request_user, **kwargs):
         self.kwargs = kwargs
@@ -135,6 +147,10 @@ class DBSearchBackend(object):
                     submitted_on__lte=month[1]).distinct()
 
         if sfields and search:
+            if search_index.enabled:
+                qs = search_index.filter(
+                    qs, search, exact=exact,
+                    language_code=self.language_code)
             qs = UnitTextSearch(qs).search(
                 search, sfields, exact=exact)
         return qs
@@ -143,8 +159,47 @@ class DBSearchBackend(object):
     def results(self):
         return self.sort_qs(self.filter_qs(self.units_qs))
 
+    @property
+    def results_kwargs(self):
+        return {
+            k: getattr(v, "pk", v)
+            for k, v
+            in self.kwargs.items()
+            if k in self.results_keys}
+
+    @property
+    def results_cache_key(self):
+        return "pootle_store.search.%s" % md5(repr((
+            self.__class__.__name__,
+            getattr(self.request_user, "pk", None),
+            Revision.get(),
+            sorted(self.results_kwargs.items())))).hexdigest()
+
+    @cached_property
+    def result_uids(self):
+        """The ids of all of the units in the results, in order.
+
+        A new search always gets the ids from the db, and the following
+        chunks of its results are served from the cached ids until the
+        revision changes.
+        """
+        cache = get_cache("lru")
+        cache_key = self.results_cache_key
+        uids = None
+        if self.previous_uids:
+            uids = cache.get(cache_key)
+        if uids is None:
+            uids = array("l", self.results.values_list("pk", flat=True))
+            cache.set(cache_key, uids, self.results_cache_timeout)
+        return uids
+
+    def get_units(self, start, end):
+        return self.results.filter(
+            pk__in=self.result_uids[start:end].tolist())
+
     def search(self):
-        total = self.results.count()
+        uids = self.result_uids
+        total = len(uids)
         start = self.offset
 
         if start > total:
@@ -161,9 +216,8 @@ class DBSearchBackend(object):
 
         if find_unit:
             # find the uid in the Store
-            uid_list = list(self.results.values_list("pk", flat=True))
-            if self.chunk_size and self.uids[0] in uid_list:
-                unit_index = uid_list.index(self.uids[0])
+            if self.chunk_size and self.uids[0] in uids:
+                unit_index = uids.index(self.uids[0])
                 start = (
                     int(unit_index / (2 * self.chunk_size))
                     * (2 * self.chunk_size))
@@ -172,13 +226,12 @@ class DBSearchBackend(object):
             # that the results we are returning start from the end of previous
             # result set
             _start = start = max(self.offset - len(self.previous_uids), 0)
-            end = max(self.offset + (2 * self.chunk_size), total)
-            uid_list = self.results[start:end].values_list("pk", flat=True)
-            for i, uid in enumerate(uid_list):
-                if uid in self.previous_uids:
-                    start = _start + i + 1
+            following = uids[_start:]
+            for uid in self.previous_uids:
+                if uid in following:
+                    start = max(start, _start + following.index(uid) + 1)
         if self.chunk_size is None:
             return total, 0, total, self.results
         start = start or 0
         end = min(start + (2 * self.chunk_size), total)
-        return total, start, end, self.results[start:end]
+        return total, start, end, self.get_units(start, end)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import unicodedata
+
+from django.conf import settings
+from django.db.models import Count
+
+from pootle_store.fields import to_db
+from pootle_store.unit.filters import UnitTextSearch
+
+
+# the number of units that are indexed in each query
+SEARCH_INDEX_BATCH_SIZE = 500
+TOKEN_LENGTH = 3
+
+
+def normalize_text(text):
+    """Lowercases `text` and strips its accents, so that tokens match
+    case and accent insensitive searches.
+    """
+    return u"".join(
+        c for c
+        in unicodedata.normalize("NFKD", unicode(text).lower())
+        if not unicodedata.combining(c))
+
+
+def get_tokens(text):
+    """Returns the set of trigrams in `text`."""
+    text = normalize_text(text or u"")
+    return set(
+        text[i:i + TOKEN_LENGTH]
+        for i
+        in range(len(text) - TOKEN_LENGTH + 1))
+
+
+def get_search_tokens(word):
+    """Returns the set of non-overlapping trigrams that cover `word`, which
+    are enough to narrow down a search for it.
+    """
+    word = normalize_text(word or u"")
+    if len(word) < TOKEN_LENGTH:
+        return set()
+    tokens = set(
+        word[i:i + TOKEN_LENGTH]
+        for i
+        in range(0, len(word) - TOKEN_LENGTH + 1, TOKEN_LENGTH))
+    tokens.add(word[-TOKEN_LENGTH:])
+    return tokens
+
+
+class UnitSearchIndex(object):
+    """Trigram index of the searchable text of units.
+
+    Any unit that contains a search word in one of its searchable fields has
+    all of the word's trigrams in its index, so the index is used to narrow
+    down the units that are searched with `UnitTextSearch`. Words shorter
+    than a trigram can't be narrowed down.
+    """
+
+    fields = UnitTextSearch.search_fields
+
+    @property
+    def enabled(self):
+        return settings.POOTLE_SEARCH_INDEX
+
+    @property
+    def model(self):
+        from pootle_store.models import UnitSearchToken
+
+        return UnitSearchToken
+
+    def get_unit_tokens(self, unit):
+        tokens = set()
+        for field in self.fields:
+            # plural strings are searched in their db representation
+            tokens.update(get_tokens(to_db(getattr(unit, field))))
+        return tokens
+
+    def index(self, store, units, replace=True):
+        """Adds the tokens of `units` of `store`, replacing any existing
+        tokens.
+        """
+        language_id = store.translation_project.language_id
+        units = list(units)
+        for i in range(0, len(units), SEARCH_INDEX_BATCH_SIZE):
+            batch = units[i:i + SEARCH_INDEX_BATCH_SIZE]
+            if replace:
+                self.model.objects.filter(
+                    unit_id__in=[unit.pk for unit in batch]).delete()
+            self.model.objects.bulk_create(
+                [self.model(
+                    unit_id=unit.pk, language_id=language_id, token=token)
+                 for unit in batch
+                 for token in self.get_unit_tokens(unit)],
+                batch_size=SEARCH_INDEX_BATCH_SIZE)
+
+    def update(self, store, units):
+        """Updates the tokens of the units of `store`."""
+        self.index(store, units)
+
+    def rebuild(self, store):
+        """Rebuilds the tokens of all of the units of `store`."""
+        self.model.objects.filter(unit__store=store).delete()
+        units = store.unit_set.only(*(("id", ) + self.fields))
+        self.index(store, units.iterator(), replace=False)
+
+    def get_matching_units(self, word, language_code=None):
+        """Returns the ids of the units that have all of the trigrams of
+        `word`, or `None` if `word` is too short to be narrowed down.
+        """
+        tokens = get_search_tokens(word)
+        if not tokens:
+            return None
+        matching = self.model.objects.filter(token__in=tokens)
+        if language_code:
+            matching = matching.filter(language__code=language_code)
+        return (
+            matching.values("unit_id")
+                    .annotate(token_count=Count("token"))
+                    .filter(token_count=len(tokens))
+                    .values("unit_id"))
+
+    def filter(self, qs, text, exact=False, language_code=None):
+        """Narrows down `qs` to the units that can match a search for
+        `text`.
+        """
+        for word in UnitTextSearch(qs).get_words(text, exact):
+            units = self.get_matching_units(word, language_code)
+            if units is not None:
+                qs = qs.filter(pk__in=units)
+        return qs
+
+
+search_index = UnitSearchIndex()
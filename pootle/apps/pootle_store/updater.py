@@ -16,10 +16,16 @@ from pootle.core.contextmanagers import update_data_after
 from pootle.core.delegate import review
 from pootle.core.log import log
 from pootle.core.models import Revision
+from pootle.core.signals import update_data
+from pootle_misc.checks import check_results
+from pootle_statistics.models import (Submission, SubmissionFields,
+                                      SubmissionTypes)
 
-from .constants import OBSOLETE, PARSED, POOTLE_WINS
+from .constants import OBSOLETE, PARSED, POOTLE_WINS, UNTRANSLATED
 from .diff import StoreDiff
-from .models import Suggestion
+from .models import QualityCheck, Suggestion, source_strings
+from .side_effects import unit_side_effects
+from .unit.search_index import search_index
 from .util import get_change_str
 
 
@@ -207,8 +213,174 @@ class UnitUpdater(object):
         return updated, suggested
 
 
+class BulkUnitCreator(object):
+    """Creates new units in a store in bulk.
+
+    The units are prepared as `Unit.save` would, and are then inserted in
+    batches, as are their initial submissions and quality checks. The store
+    data is updated once for all of the new units.
+
+    Side effects that are deferred with `POOTLE_UNIT_SIDE_EFFECTS` are
+    recorded for each unit as they would be when saving it.
+    """
+
+    batch_size = 500
+
+    def __init__(self, store, user=None, update_revision=None):
+        self.store = store
+        self.user = user
+        self.update_revision = update_revision
+
+    def build_unit(self, unit, index):
+        newunit = self.store.UnitClass(store=self.store, index=index)
+        newunit.update(unit, user=self.user)
+        return newunit
+
+    def get_save_options(self, unit):
+        return unit.get_save_options(
+            dict(revision=self.update_revision, user=self.user))
+
+    def insert_units(self, units):
+        self.store.UnitClass.objects.bulk_create(
+            units, batch_size=self.batch_size)
+        if all(unit.pk for unit in units):
+            return
+        # not all backends return the pks of created rows
+        pks = dict(
+            self.store.unit_set.filter(
+                unitid_hash__in=[unit.unitid_hash for unit in units]
+            ).values_list("unitid_hash", "pk"))
+        for unit in units:
+            unit.id = pks[unit.unitid_hash]
+
+    def add_initial_submissions(self, units):
+        submissions = []
+        for unit, options in units:
+            user = options["user"] or unit._log_user
+            if unit_side_effects.is_deferred("initial_submission"):
+                unit_side_effects.add(
+                    "initial_submission",
+                    self.store.pk,
+                    dict(unit=unit.id, user=user.pk))
+            elif unit.istranslated() or unit.isfuzzy():
+                submissions.append(
+                    Submission(
+                        creation_time=unit.creation_time,
+                        translation_project=self.store.translation_project,
+                        submitter=user,
+                        unit=unit,
+                        store=self.store,
+                        type=SubmissionTypes.UNIT_CREATE,
+                        field=SubmissionFields.TARGET,
+                        new_value=unit.target))
+        # initial submissions dont log scores, so `Submission.save` can be
+        # skipped
+        Submission.objects.bulk_create(
+            submissions, batch_size=self.batch_size)
+
+    def add_qualitychecks(self, units):
+        checks = []
+        checker = self.store.translation_project.checker
+        for unit, options in units:
+            updated = options["source_updated"] or options["target_updated"]
+            if not updated or unit.state == UNTRANSLATED:
+                continue
+            if unit_side_effects.is_deferred("qualitychecks"):
+                unit_side_effects.add(
+                    "qualitychecks", self.store.pk, dict(unit=unit.id))
+                continue
+            if not unit.target:
+                continue
+            qc_failures = check_results.run_filters(checker, unit)
+            for name, failure in qc_failures.items():
+                checks.append(
+                    QualityCheck(
+                        unit=unit,
+                        name=name,
+                        message=failure["message"],
+                        category=failure["category"]))
+                unit._add_check_delta(failure["category"], name)
+        QualityCheck.objects.bulk_create(checks, batch_size=self.batch_size)
+
+    def update_search_index(self, units):
+        if unit_side_effects.is_deferred("search_index"):
+            for unit in units:
+                unit_side_effects.add(
+                    "search_index", self.store.pk, dict(unit=unit.id))
+            return
+        search_index.update(self.store, units)
+
+    def update_store_data(self, unit_deltas):
+        if unit_side_effects.is_deferred("update_data"):
+            for unit_delta in unit_deltas:
+                unit_side_effects.add(
+                    "update_data",
+                    self.store.pk,
+                    dict(unit_delta=unit_delta))
+            return
+        update_data.send(
+            self.store.__class__,
+            instance=self.store,
+            unit_deltas=unit_deltas)
+
+    def create(self, units):
+        """Creates units in the store from `units`, a sequence of
+        (unit, index) tuples, and returns the created units.
+        """
+        created = []
+        unit_deltas = []
+        for i in xrange(0, len(units), self.batch_size):
+            batch, batch_deltas = self.create_batch(
+                units[i:i + self.batch_size])
+            created += batch
+            unit_deltas += batch_deltas
+        if unit_deltas:
+            self.update_store_data(unit_deltas)
+        return created
+
+    def create_batch(self, units):
+        """Creates a batch of units and returns the created units and their
+        unit deltas.
+        """
+        units = [self.build_unit(unit, index) for unit, index in units]
+        if not units:
+            return [], []
+        # the source values for units with the same source in other stores
+        # are reused
+        source_strings.prefetch(unit.source_f for unit in units)
+        units = [(unit, self.get_save_options(unit)) for unit in units]
+        # the revisions for units that are given their own revision are
+        # reserved right before the units are inserted, so that they are
+        # not lower than the revisions of units saved in the meantime
+        revisions = len(
+            [unit for unit, options in units
+             if unit.needs_revision(options)])
+        with Revision.reserved(revisions):
+            for unit, options in units:
+                unit.prepare_save(True, options)
+            self.insert_units([unit for unit, options_ in units])
+        for unit, options in units:
+            unit._log_action(options["action"])
+        self.add_initial_submissions(units)
+        self.add_qualitychecks(units)
+        unit_deltas = []
+        for unit, options in units:
+            if unit.istranslated():
+                unit._run_side_effect(
+                    "tmserver",
+                    unit.update_tmserver,
+                    unit=unit.id)
+            unit._clear_save_flags()
+            unit_deltas.append(unit.get_unit_delta(created=True))
+            unit._freeze_state()
+        if search_index.enabled:
+            self.update_search_index([unit for unit, options_ in units])
+        return [unit for unit, options_ in units], unit_deltas
+
+
 class StoreUpdater(object):
 
+    unit_creator_class = BulkUnitCreator
     unit_updater_class = UnitUpdater
 
     def __init__(self, target_store):
@@ -283,11 +455,10 @@ class StoreUpdater(object):
                 self.target_store.update_index(start=start, delta=delta)
 
             # Add new units
-            with update_data_after(self.target_store):
-                for unit, new_unit_index in to_change["add"]:
-                    self.target_store.addunit(
-                        unit, new_unit_index, user=user,
-                        update_revision=update_revision)
+            self.unit_creator_class(
+                self.target_store,
+                user=user,
+                update_revision=update_revision).create(to_change["add"])
             changes["added"] = len(to_change["add"])
 
             # Obsolete units
@@ -13,6 +13,7 @@ from django.contrib.auth import get_user_model
 from django.template import loader
 from django.utils import timezone
 
+from pootle.core.contextmanagers import bulk_data_update
 from pootle.core.delegate import site
 from pootle.core.mail import send_mail
 from pootle.core.signals import update_data
@@ -181,8 +182,9 @@ class SuggestionsReview(object):
         update_data.send(store.__class__, instance=store)
 
     def accept_suggestions(self):
-        for suggestion in self.suggestions:
-            self.accept_suggestion(suggestion)
+        with bulk_data_update():
+            for suggestion in self.suggestions:
+                self.accept_suggestion(suggestion)
 
     def accept(self, comment=""):
         self.accept_suggestions()
@@ -215,8 +217,9 @@ class SuggestionsReview(object):
             self.send_mail(template, subject, suggester, suggestions, comment)
 
     def reject_suggestions(self):
-        for suggestion in self.suggestions:
-            self.reject_suggestion(suggestion)
+        with bulk_data_update():
+            for suggestion in self.suggestions:
+                self.reject_suggestion(suggestion)
 
     def reject(self, comment=""):
         self.reject_suggestions()
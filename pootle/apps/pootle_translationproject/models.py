@@ -6,6 +6,7 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import itertools
 import logging
 
 from translate.misc.lru import LRUCachingDict
@@ -13,10 +14,12 @@ from translate.misc.lru import LRUCachingDict
 from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.db import models
+from django.db.models import F, Q
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils.functional import cached_property
 
+from pootle.core.contextmanagers import bulk_data_update
 from pootle.core.delegate import data_tool
 from pootle.core.mixins import CachedTreeItem
 from pootle.core.url_helpers import get_editor_filter, split_pootle_path
@@ -358,26 +361,49 @@ class TranslationProject(models.Model, CachedTreeItem):
 
         stores = self.stores.live().select_related('parent').exclude(file='')
         # Update store content from disk store
-        for store in stores.iterator():
-            if not store.file:
-                continue
-            disk_mtime = store.get_file_mtime()
-            if not force and disk_mtime == store.file_mtime:
-                # The file on disk wasn't changed since the last sync
-                logging.debug(u"File didn't change since last sync, "
-                              u"skipping %s", store.pootle_path)
-                continue
-
-            changed = (
-                store.updater.update_from_disk(overwrite=overwrite)
-                or changed)
-
+        with bulk_data_update() as updates:
+            for store in stores.iterator():
+                if not store.file:
+                    continue
+                disk_mtime = store.get_file_mtime()
+                if not force and disk_mtime == store.file_mtime:
+                    # The file on disk wasn't changed since the last sync
+                    logging.debug(u"File didn't change since last sync, "
+                                  u"skipping %s", store.pootle_path)
+                    continue
+
+                changed = (
+                    store.updater.update_from_disk(overwrite=overwrite)
+                    or changed)
+        logging.info(
+            u"Updated data for %s: %s updates coalesced, %s executed",
+            self, updates.coalesced, updates.executed)
         return changed
 
     def sync(self, conservative=True, skip_missing=False, only_newer=True):
         """Sync unsaved work on all stores to disk"""
-        stores = self.stores.live().exclude(file='').filter(state__gte=PARSED)
-        for store in stores.select_related("parent").iterator():
+        stores = (
+            self.stores.live()
+                       .exclude(file='')
+                       .filter(state__gte=PARSED)
+                       .select_related("parent", "data"))
+        if only_newer:
+            changed = (
+                Q(last_sync_revision__isnull=True)
+                | Q(data__isnull=True)
+                | Q(data__max_unit_revision__isnull=True)
+                | Q(data__max_unit_revision__gt=F("last_sync_revision")))
+            # stores with no changes since they were last synced are skipped,
+            # unless their file has been removed from disk
+            stores = itertools.chain(
+                stores.filter(changed).iterator(),
+                (store
+                 for store
+                 in stores.exclude(changed).iterator()
+                 if not store.file.exists()))
+        else:
+            stores = stores.iterator()
+        for store in stores:
             store.sync(update_structure=not conservative,
                        conservative=conservative,
                        skip_missing=skip_missing, only_newer=only_newer)
@@ -16,6 +16,12 @@ class VFolderDBSearchBackend(DBSearchBackend):
         self.vfolder = kwargs.pop("vfolder")
         super(VFolderDBSearchBackend, self).__init__(request_user, **kwargs)
 
+    @property
+    def results_kwargs(self):
+        kwargs = super(VFolderDBSearchBackend, self).results_kwargs
+        kwargs["vfolder"] = self.vfolder.pk
+        return kwargs
+
     def filter_qs(self, qs):
         filtered = super(VFolderDBSearchBackend, self).filter_qs(qs)
         return filtered.filter(store__vfolders=self.vfolder)
@@ -321,21 +321,31 @@ def check_settings(app_configs=None, **kwargs):
                     id="pootle.C010",
                 ))
 
-            if 'HOST' not in settings.POOTLE_TM_SERVER[server]:
-                errors.append(checks.Critical(
-                    _("POOTLE_TM_SERVER['%s'] has no HOST.", server),
-                    hint=_("Set a HOST for POOTLE_TM_SERVER['%s'].",
-                           server),
-                    id="pootle.C011",
-                ))
+            engine = settings.POOTLE_TM_SERVER[server].get('ENGINE', '')
+            if engine.endswith('.NgramTMBackend'):
+                if 'PATH' not in settings.POOTLE_TM_SERVER[server]:
+                    errors.append(checks.Critical(
+                        _("POOTLE_TM_SERVER['%s'] has no PATH.", server),
+                        hint=_("Set a PATH for POOTLE_TM_SERVER['%s'].",
+                               server),
+                        id="pootle.C022",
+                    ))
+            else:
+                if 'HOST' not in settings.POOTLE_TM_SERVER[server]:
+                    errors.append(checks.Critical(
+                        _("POOTLE_TM_SERVER['%s'] has no HOST.", server),
+                        hint=_("Set a HOST for POOTLE_TM_SERVER['%s'].",
+                               server),
+                        id="pootle.C011",
+                    ))
 
-            if 'PORT' not in settings.POOTLE_TM_SERVER[server]:
-                errors.append(checks.Critical(
-                    _("POOTLE_TM_SERVER['%s'] has no PORT.", server),
-                    hint=_("Set a PORT for POOTLE_TM_SERVER['%s'].",
-                           server),
-                    id="pootle.C012",
-                ))
+                if 'PORT' not in settings.POOTLE_TM_SERVER[server]:
+                    errors.append(checks.Critical(
+                        _("POOTLE_TM_SERVER['%s'] has no PORT.", server),
+                        hint=_("Set a PORT for POOTLE_TM_SERVER['%s'].",
+                               server),
+                        id="pootle.C012",
+                    ))
 
             if ('WEIGHT' in settings.POOTLE_TM_SERVER[server] and
                 not (0.0 <= settings.POOTLE_TM_SERVER[server]['WEIGHT']
@@ -348,6 +358,19 @@ def check_settings(app_configs=None, **kwargs):
                     id="pootle.W019",
                 ))
 
+    from pootle_store.side_effects import SIDE_EFFECT_MODES
+
+    for effect, mode in settings.POOTLE_UNIT_SIDE_EFFECTS.items():
+        if mode not in SIDE_EFFECT_MODES:
+            errors.append(checks.Warning(
+                _("Invalid mode '%s' for '%s' in POOTLE_UNIT_SIDE_EFFECTS.",
+                  mode, effect),
+                hint=_("Set the mode to one of: %s. Until then the side "
+                       "effect is run synchronously.",
+                       ", ".join(SIDE_EFFECT_MODES)),
+                id="pootle.W021",
+            ))
+
     for coefficient_name in ['EDIT', 'REVIEW', 'SUGGEST', 'ANALYZE']:
         if coefficient_name not in settings.POOTLE_SCORE_COEFFICIENTS:
             errors.append(checks.Critical(
@@ -9,13 +9,15 @@
 import logging
 import time
 
+from django.db.models import Count
 from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.lru_cache import lru_cache
 
-from pootle_misc.checks import run_given_filters
+from pootle.core.signals import update_data
+from pootle_misc.checks import check_names, check_results
 from pootle_store.constants import OBSOLETE
-from pootle_store.models import QualityCheck, Unit
+from pootle_store.models import QualityCheck, Store, Unit
 from pootle_store.unit import UnitProxy
 from pootle_translationproject.models import TranslationProject
 
@@ -23,6 +25,15 @@ from pootle_translationproject.models import TranslationProject
 logger = logging.getLogger(__name__)
 
 
+# the number of rows that are changed in each query when applying a batch
+CHECK_BATCH_SIZE = 500
+
+
+def _chunks(pks):
+    for i in range(0, len(pks), CHECK_BATCH_SIZE):
+        yield pks[i:i + CHECK_BATCH_SIZE]
+
+
 class CheckableUnit(UnitProxy):
     """CheckableUnit wraps a `Unit` values dictionary to provide a `Unit` like
     instance that can be used by UnitQualityCheck
@@ -44,10 +55,40 @@ class CheckableUnit(UnitProxy):
         return self.store__translation_project__language__code
 
 
+class QualityCheckBatch(object):
+    """Changes to QualityChecks and Units that are applied together.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.new_checks = []
+        self.deleted = []
+        self.unmuted = []
+        self.units = []
+
+    def flush(self):
+        """Apply the changes with as few queries as possible.
+        """
+        if self.new_checks:
+            QualityCheck.objects.bulk_create(
+                self.new_checks, batch_size=CHECK_BATCH_SIZE)
+        for pks in _chunks(self.deleted):
+            QualityCheck.objects.filter(pk__in=pks).delete()
+        for pks in _chunks(self.unmuted):
+            QualityCheck.objects.filter(pk__in=pks).update(
+                false_positive=False)
+        mtime = timezone.now()
+        for pks in _chunks(self.units):
+            Unit.objects.filter(pk__in=pks).update(mtime=mtime)
+        self.clear()
+
+
 class UnitQualityCheck(object):
 
     def __init__(self, unit, checker, original_checks,
-                 check_names, keep_false_positives=True):
+                 check_names, keep_false_positives=True, batch=None):
         """Refreshes QualityChecks for a Unit
 
         As this class can work with either `Unit` or `CheckableUnit` it only
@@ -59,22 +100,28 @@ class UnitQualityCheck(object):
         :param check_names: limit checks to given list of quality check names.
         :param keep_false_positives: when set to `False`, it will unmute any
             existing false positive checks.
+        :param batch: a `QualityCheckBatch` to add the changes to, instead of
+            saving them for this Unit.
         """
         self.checker = checker
         self.unit = unit
         self.original_checks = original_checks
         self.check_names = check_names
         self.keep_false_positives = keep_false_positives
+        self.batch = batch
         self.unmute_list = []
+        # changes to the active checks, keyed on (category, name)
+        self.check_delta = {}
+
+    def add_check_delta(self, category, name, count=1):
+        key = (category, name)
+        self.check_delta[key] = self.check_delta.get(key, 0) + count
 
     @cached_property
     def check_failures(self):
         """Current QualityCheck failure for the Unit
         """
-        if self.check_names is None:
-            return self.checker.run_filters(
-                self.unit, categorised=True)
-        return run_given_filters(
+        return check_results.run_filters(
             self.checker, self.unit, self.check_names)
 
     @cached_property
@@ -86,15 +133,28 @@ class UnitQualityCheck(object):
     def delete_checks(self, checks):
         """Delete checks that are no longer used.
         """
+        if self.batch is not None:
+            self.batch.deleted.extend(
+                check['id'] for check in checks.values())
+            for name, check in checks.items():
+                if not check['false_positive']:
+                    self.add_check_delta(check['category'], name, -1)
+            return True
         to_delete = self.checks_qs.filter(name__in=checks)
         if to_delete.exists():
             to_delete.delete()
+            for name, check in checks.items():
+                if not check['false_positive']:
+                    self.add_check_delta(check['category'], name, -1)
             return True
         return False
 
     def unmute_checks(self, checks):
         """Unmute checks that should no longer be muted
         """
+        if self.batch is not None:
+            # the ids were added to the batch when the checks were compared
+            return True
         to_unmute = self.checks_qs.filter(
             name__in=checks, false_positive=True)
         if to_unmute.exists():
@@ -133,6 +193,11 @@ class UnitQualityCheck(object):
                     and not self.keep_false_positives)
                 if unmute:
                     self.unmute_list.append(name)
+                    if self.batch is not None:
+                        self.batch.unmuted.append(
+                            self.original_checks[name]['id'])
+                    self.add_check_delta(
+                        self.original_checks[name]['category'], name)
                 # if the check is valid remove from the list and continue
                 del self.original_checks[name]
                 continue
@@ -144,8 +209,12 @@ class UnitQualityCheck(object):
                     name=name,
                     message=self.check_failures[name]['message'],
                     category=self.check_failures[name]['category']))
+            self.add_check_delta(
+                self.check_failures[name]['category'], name)
             updated = True
-        if new_checks:
+        if self.batch is not None:
+            self.batch.new_checks.extend(new_checks)
+        elif new_checks:
             self.checks_qs.bulk_create(new_checks)
         return updated
 
@@ -153,7 +222,7 @@ class UnitQualityCheck(object):
 class QualityCheckUpdater(object):
 
     def __init__(self, check_names=None, translation_project=None,
-                 keep_false_positives=True):
+                 keep_false_positives=True, stores=None):
         """Refreshes QualityChecks for Units
 
         :param check_names: limit checks to given list of quality check names.
@@ -161,19 +230,23 @@ class QualityCheckUpdater(object):
             restrict the update to.
         :param keep_false_positives: when set to `False`, it will unmute any
             existing false positive checks.
+        :param stores: a list of `Store` pks to restrict the update to.
         """
 
         self.check_names = check_names
         self.translation_project = translation_project
         self.keep_false_positives = keep_false_positives
-        self.stores = set()
+        self.stores = stores
+        self.batch = QualityCheckBatch()
         self._store_to_expire = None
+        self._store_checks = None, {}
+        # changes to the active checks of each store
+        self.check_deltas = {}
 
-    @cached_property
-    def checks(self):
-        """Existing checks in the database for all units
+    def get_store_checks(self, store_pk):
+        """Existing checks in the database for the units of a Store
         """
-        checks = self.checks_qs
+        checks = self.checks_qs.filter(unit__store_id=store_pk)
         check_keys = (
             'id', 'name', 'unit_id',
             'category', 'false_positive')
@@ -181,19 +254,34 @@ class QualityCheckUpdater(object):
         if self.check_names is not None:
             checks = checks.filter(name__in=self.check_names)
 
-        all_units_checks = {}
+        store_units_checks = {}
         for check in checks.values(*check_keys):
-            all_units_checks.setdefault(
+            store_units_checks.setdefault(
                 check['unit_id'], {})[check['name']] = check
-        return all_units_checks
+        return store_units_checks
+
+    def get_unit_checks(self, unit):
+        """Existing checks in the database for a unit
+
+        Units are updated in Store order, so only the checks for the current
+        Store are kept in memory.
+        """
+        store_pk, store_checks = self._store_checks
+        if store_pk != unit.store:
+            store_checks = self.get_store_checks(unit.store)
+            self._store_checks = unit.store, store_checks
+        return store_checks.get(unit.id, {})
 
     @cached_property
     def checks_qs(self):
-        """QualityCheck queryset for all units, restricted to TP if set
+        """QualityCheck queryset for all units, restricted to TP or Stores if
+        set
         """
         checks_qs = QualityCheck.objects.all()
 
-        if self.translation_project is not None:
+        if self.stores is not None:
+            checks_qs = checks_qs.filter(unit__store_id__in=self.stores)
+        elif self.translation_project is not None:
             tp_pk = self.translation_project.pk
             checks_qs = checks_qs.filter(
                 unit__store__translation_project__pk=tp_pk)
@@ -201,15 +289,33 @@ class QualityCheckUpdater(object):
 
     @cached_property
     def units(self):
-        """Result set of Units, restricted to TP if set
+        """Result set of Units, restricted to TP or Stores if set
         """
         units = Unit.objects.all()
-        if self.translation_project is not None:
+        if self.stores is not None:
+            units = units.filter(store_id__in=self.stores)
+        elif self.translation_project is not None:
             units = units.filter(
                 store__translation_project=self.translation_project)
         return units
 
+    def add_check_delta(self, store_pk, check_delta):
+        store_delta = self.check_deltas.setdefault(store_pk, {})
+        for k, count in check_delta.items():
+            store_delta[k] = store_delta.get(k, 0) + count
+
     def clear_checks(self):
+        unknown_checks = (
+            QualityCheck.objects.exclude(name__in=check_names.keys())
+                        .filter(false_positive=False)
+                        .filter(unit__state__gt=OBSOLETE)
+                        .values("unit__store_id", "category", "name")
+                        .annotate(count=Count("id"))
+                        .order_by())
+        for check in unknown_checks:
+            self.add_check_delta(
+                check["unit__store_id"],
+                {(check["category"], check["name"]): -check["count"]})
         QualityCheck.delete_unknown_checks()
 
     @lru_cache(maxsize=None)
@@ -240,9 +346,28 @@ class QualityCheckUpdater(object):
             # its the same Store that we saw last time
             return
 
+        # save the changes to the checks before updating the Store data
+        self.batch.flush()
+        self.update_store_data(self._store_to_expire)
         # remember the new store_pk
         self._store_to_expire = store_pk
 
+    def update_store_data(self, store_pk):
+        """Apply the changes to the checks of a Store to its data
+        """
+        check_delta = {
+            k: v
+            for k, v
+            in self.check_deltas.pop(store_pk, {}).items()
+            if v}
+        if not check_delta:
+            return
+        store = Store.objects.get(pk=store_pk)
+        update_data.send(
+            store.__class__,
+            instance=store,
+            check_delta=check_delta)
+
     def update(self):
         """Update/purge all QualityChecks for Units, and expire Store caches.
         """
@@ -267,19 +392,34 @@ class QualityCheckUpdater(object):
             "Updated checks for %s units in %s seconds",
             trans, (time.time() - start))
 
+        self.update_stores_data()
+
+    def update_stores_data(self):
+        """Update the data of any stores that have not been updated yet
+        """
+        for store_pk in self.check_deltas.keys():
+            self.update_store_data(store_pk)
+
     def update_translated_unit(self, unit, checker=None):
         """Update checks for a translated Unit
         """
+        counted = unit["state"] > OBSOLETE
         unit = CheckableUnit(unit)
+        original_checks = self.get_unit_checks(unit)
+        # the changes are saved with the batch when the Store is expired
+        self.expire_store_cache(unit.store)
         checker = UnitQualityCheck(
             unit,
             checker,
-            self.checks.get(unit.id, {}),
+            original_checks,
             self.check_names,
-            self.keep_false_positives)
+            self.keep_false_positives,
+            batch=self.batch)
         if checker.update():
-            self.expire_store_cache(unit.store)
-            self.units.filter(id=unit.id).update(mtime=timezone.now())
+            if counted:
+                # checks of obsolete units are not counted in the data
+                self.add_check_delta(unit.store, checker.check_delta)
+            self.batch.units.append(unit.id)
             return True
         return False
 
@@ -287,16 +427,16 @@ class QualityCheckUpdater(object):
         """Update checks for translated Units
         """
         unit_fields = [
-            "id", "source_f", "target_f", "locations", "store__id",
+            "id", "source_f", "target_f", "locations", "state", "store__id",
             "store__translation_project__language__code",
         ]
 
         tp_key = "store__translation_project__id"
-        if self.translation_project is None:
+        if self.translation_project is None or self.stores is not None:
             unit_fields.append(tp_key)
 
         checker = None
-        if self.translation_project is not None:
+        if self.translation_project is not None and self.stores is None:
             # we only need to get the checker once if TP is set
             checker = self.get_checker(self.translation_project.id)
 
@@ -305,10 +445,10 @@ class QualityCheckUpdater(object):
                       .order_by("store", "index"))
         updated_count = 0
         for unit in translated.values(*unit_fields).iterator():
-            if self.translation_project is not None:
+            if tp_key not in unit:
                 # if TP is set then manually add TP.id to the Unit value dict
                 unit[tp_key] = self.translation_project.id
-            if checker is None:
+            if checker is None or self.stores is not None:
                 checker = self.get_checker(unit[tp_key])
             if checker and self.update_translated_unit(unit, checker=checker):
                 updated_count += 1
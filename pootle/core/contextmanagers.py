@@ -6,9 +6,15 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import logging
 from contextlib import contextmanager
 
-from pootle.core.signals import update_data
+from django.db import transaction
+
+from pootle.core.signals import SignalCoalescer, update_data
+
+
+logger = logging.getLogger(__name__)
 
 
 @contextmanager
@@ -42,3 +48,42 @@ def update_data_after(sender, **kwargs):
         sender.__class__,
         instance=sender,
         **kwargs)
+
+
+@contextmanager
+def coalesce_signal(signal):
+    """Collect the sends of a `CoalescingSignal` and send them once per
+    sender/instance on exit.
+
+    If an error is raised inside an atomic block the transaction is rolled
+    back, and the collected sends are discarded.
+    """
+    if signal.coalescer is not None:
+        # the outer context flushes
+        yield signal.coalescer
+        return
+    coalescer = signal.coalescer = SignalCoalescer(signal)
+    try:
+        try:
+            yield coalescer
+        except Exception:
+            if transaction.get_connection().in_atomic_block:
+                coalescer.clear()
+            raise
+        finally:
+            coalescer.flush()
+    finally:
+        signal.coalescer = None
+    logger.debug(
+        "Coalesced %s signals, %s sent",
+        coalescer.coalesced,
+        coalescer.executed)
+
+
+@contextmanager
+def bulk_data_update():
+    """Collect `update_data` signals so that each Store/TP is only updated
+    once, when the context exits.
+    """
+    with coalesce_signal(update_data) as coalescer:
+        yield coalescer
@@ -6,8 +6,12 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import logging
+import time
+from collections import Counter
 from functools import wraps
 
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
 from django.http import Http404
@@ -25,6 +29,9 @@ from .exceptions import Http400
 from .url_helpers import split_pootle_path
 
 
+logger = logging.getLogger(__name__)
+
+
 CLS2ATTR = {
     'TranslationProject': 'translation_project',
     'Project': 'project',
@@ -172,17 +179,62 @@ class persistent_property(object):
     If no cache_key attribute is present or returns None, it will use instance
     caching by default. This behaviour can be switched off by setting
     `always_cache` to False in the decorator.
+
+    On a cache miss a lock is taken while the value is calculated, so that
+    concurrent misses for the same key wait for the value rather than all
+    calculating it.
+
+    If the class has an attribute `stale_cache_key` (the attribute can be
+    changed by setting `stale_key_attr`), the last calculated value is also
+    stored with it, and is returned while another process recalculates the
+    value for a new cache_key.
+
+    If `POOTLE_PERSISTENT_PROPERTY_METRICS` is set, counts of hits, misses,
+    waits and stale values returned are kept in the redis cache, so that they
+    are shared by all processes, and are read with
+    `persistent_property.get_metrics()`.
     """
 
-    def __init__(self, func, name=None, key_attr=None, always_cache=True):
+    metrics = ("hit", "miss", "wait", "stale")
+    metrics_key = "pootle.core.persistent_property.metrics.%s"
+    # max time in seconds that a lock is held for
+    lock_timeout = 60
+    # max time in seconds to wait for another process to set a value
+    wait_timeout = 10
+    wait_interval = .05
+
+    def __init__(self, func, name=None, key_attr=None, always_cache=True,
+                 stale_key_attr=None):
         self.func = func
         self.__doc__ = getattr(func, '__doc__')
         self.name = name or func.__name__
         self.key_attr = key_attr or "cache_key"
+        self.stale_key_attr = stale_key_attr or "stale_cache_key"
         self.always_cache = always_cache
 
-    def _get_cache_key(self, instance):
-        cache_key = getattr(instance, self.key_attr, None)
+    @classmethod
+    def count(cls, metric):
+        if not settings.POOTLE_PERSISTENT_PROPERTY_METRICS:
+            return
+        cache = get_cache('redis')
+        key = cls.metrics_key % metric
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+    @classmethod
+    def get_metrics(cls):
+        """Returns the counts of each of `metrics`, for all processes."""
+        cache = get_cache('redis')
+        counts = cache.get_many(
+            [cls.metrics_key % metric for metric in cls.metrics])
+        return Counter({
+            metric: counts.get(cls.metrics_key % metric, 0)
+            for metric in cls.metrics})
+
+    def _get_cache_key(self, instance, key_attr=None):
+        cache_key = getattr(instance, key_attr or self.key_attr, None)
         if cache_key:
             return "%s/%s" % (cache_key, self.name)
 
@@ -195,13 +247,49 @@ class persistent_property(object):
             cached = cache.get(cache_key)
             if cached is not None:
                 # cache hit
+                self.count("hit")
                 return cached
             # cache miss
-            res = self.func(instance)
-            cache.set(cache_key, res)
-            return res
+            return self._get_and_set(instance, cache, cache_key)
         elif self.always_cache:
             # no cache_key, use instance caching
             res = instance.__dict__[self.name] = self.func(instance)
             return res
         return self.func(instance)
+
+    def _get_and_set(self, instance, cache, cache_key):
+        lock_key = "%s.lock" % cache_key
+        stale_key = self._get_cache_key(instance, self.stale_key_attr)
+        locked = cache.add(lock_key, 1, timeout=self.lock_timeout)
+        if not locked:
+            # another process is calculating the value
+            stale = stale_key and cache.get(stale_key)
+            if stale is not None:
+                self.count("stale")
+                return stale
+            cached = self._wait(cache, cache_key, lock_key)
+            if cached is not None:
+                self.count("wait")
+                return cached
+        self.count("miss")
+        try:
+            res = self.func(instance)
+            values = {cache_key: res}
+            if stale_key:
+                values[stale_key] = res
+            cache.set_many(values)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+        return res
+
+    def _wait(self, cache, cache_key, lock_key):
+        waited = 0
+        while waited < self.wait_timeout:
+            time.sleep(self.wait_interval)
+            waited += self.wait_interval
+            cached = cache.get(cache_key)
+            if cached is not None or cache.get(lock_key) is None:
+                return cached
+        logger.debug(
+            "Timed out waiting for %s to be calculated", cache_key)
@@ -6,6 +6,9 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import threading
+from contextlib import contextmanager
+
 from ..cache import get_cache
 
 
@@ -16,12 +19,39 @@ class NoRevision(Exception):
     pass
 
 
+class RevisionBlock(object):
+    """A contiguous block of revision numbers reserved from the counter."""
+
+    def __init__(self, last, size):
+        self.first = last - size + 1
+        self.last = last
+        self.next_revision = self.first
+
+    @property
+    def remaining(self):
+        return self.last - self.next_revision + 1
+
+    def next(self):
+        """Hands out the next revision number from the block.
+
+        :return: the next revision number, or `None` if the block has been
+            used up.
+        """
+        if not self.remaining:
+            return None
+        revision = self.next_revision
+        self.next_revision += 1
+        return revision
+
+
 class Revision(object):
     """Wrapper around the revision counter stored in Redis."""
 
     CACHE_KEY = 'pootle:revision'
     INITIAL = 0
 
+    _local = threading.local()
+
     @classmethod
     def initialize(cls, force=False):
         """Initializes the revision with `cls.INITIAL`.
@@ -69,7 +99,44 @@ class Revision(object):
         :return: the new revision number after incrementing it, or the
             initial number if there's no revision stored yet.
         """
+        block = getattr(cls._local, "block", None)
+        revision = block and block.next()
+        if revision is not None:
+            return revision
         try:
             return cache.incr(cls.CACHE_KEY)
         except ValueError:
             raise NoRevision()
+
+    @classmethod
+    def reserve(cls, n):
+        """Reserves a block of `n` revision numbers with a single increment
+        of the counter.
+
+        :return: a `RevisionBlock` for the reserved revisions.
+        """
+        try:
+            return RevisionBlock(cache.incr(cls.CACHE_KEY, n), n)
+        except ValueError:
+            raise NoRevision()
+
+    @classmethod
+    @contextmanager
+    def reserved(cls, n):
+        """Reserves a block of `n` revisions, which are handed out by `incr`
+        in the current thread while the context is active.
+
+        Once the block is used up, `incr` increments the counter again.
+        Any unused revisions in the block are skipped, and nothing is
+        reserved if `n` is 0.
+
+        The block should be reserved right before the revisions are written,
+        so that they are not lower than revisions given to other changes
+        in the meantime.
+        """
+        previous = getattr(cls._local, "block", None)
+        cls._local.block = block = cls.reserve(n) if n else None
+        try:
+            yield block
+        finally:
+            cls._local.block = previous
@@ -8,7 +8,8 @@
 
 from .base import SearchBackend
 from .broker import SearchBroker
-from .backends import ElasticSearchBackend
+from .backends import ElasticSearchBackend, NgramTMBackend
 
 
-__all__ = ('SearchBackend', 'SearchBroker', 'ElasticSearchBackend')
+__all__ = ('SearchBackend', 'SearchBroker', 'ElasticSearchBackend',
+           'NgramTMBackend')
@@ -7,6 +7,7 @@
 # AUTHORS file for copyright and authorship information.
 
 from .elasticsearch import ElasticSearchBackend
+from .ngram import NgramTMBackend
 
 
-__all__ = ('ElasticSearchBackend', )
+__all__ = ('ElasticSearchBackend', 'NgramTMBackend')
@@ -13,7 +13,7 @@ import logging
 import Levenshtein
 
 try:
-    from elasticsearch import Elasticsearch
+    from elasticsearch import Elasticsearch, helpers
     from elasticsearch.exceptions import ElasticsearchException
 except ImportError:
     Elasticsearch = None
@@ -30,6 +30,14 @@ logger = logging.getLogger(__name__)
 DEFAULT_MIN_SIMILARITY = 0.7
 
 
+def get_similarity(source_text, hit_source_text):
+    """Returns the similarity (0..1) of two texts, from their Levenshtein
+    distance.
+    """
+    distance = Levenshtein.distance(source_text, hit_source_text)
+    return 1 - distance / float(max(len(source_text), len(hit_source_text)))
+
+
 def filter_hits_by_distance(hits, source_text,
                             min_similarity=DEFAULT_MIN_SIMILARITY):
     """Returns ES `hits` filtered according to their Levenshtein distance
@@ -45,14 +53,11 @@ def filter_hits_by_distance(hits, source_text,
     filtered_hits = []
     for hit in hits:
         hit_source_text = hit['_source']['source']
-        distance = Levenshtein.distance(source_text, hit_source_text)
-        similarity = (
-            1 - distance / float(max(len(source_text), len(hit_source_text)))
-        )
+        similarity = get_similarity(source_text, hit_source_text)
 
         logger.debug(
-            'Similarity: %.2f (distance: %d)\nOriginal:\t%s\nComparing with:\t%s',
-            similarity, distance, source_text, hit_source_text
+            'Similarity: %.2f\nOriginal:\t%s\nComparing with:\t%s',
+            similarity, source_text, hit_source_text
         )
 
         if similarity < min_similarity:
@@ -64,10 +69,11 @@ def filter_hits_by_distance(hits, source_text,
 
 
 class ElasticSearchBackend(SearchBackend):
-    def __init__(self, config_name):
+    def __init__(self, config_name, create_index=True):
         super(ElasticSearchBackend, self).__init__(config_name)
         self._es = self._get_es_server()
-        self._create_index_if_missing()
+        if create_index:
+            self._create_index_if_missing()
         self.weight = min(max(self._settings.get('WEIGHT', self.weight),
                               0.0), 1.0)
 
@@ -75,7 +81,7 @@ class ElasticSearchBackend(SearchBackend):
         return Elasticsearch([
             {'host': self._settings['HOST'],
              'port': self._settings['PORT']},
-        ])
+        ], retry_on_timeout=True)
 
     def _create_index_if_missing(self):
         try:
@@ -84,9 +90,6 @@ class ElasticSearchBackend(SearchBackend):
         except ElasticsearchException as e:
             self._log_error(e)
 
-    def _is_valuable_hit(self, unit, hit):
-        return str(unit.id) != hit['_id']
-
     def _es_call(self, cmd, *args, **kwargs):
         try:
             return getattr(self._es, cmd)(*args, **kwargs)
@@ -99,8 +102,6 @@ class ElasticSearchBackend(SearchBackend):
                      self._settings.get("HOST"), self._settings.get("PORT"), e)
 
     def search(self, unit):
-        counter = {}
-        res = []
         language = unit.store.translation_project.language.code
         es_res = self._es_call(
             "search",
@@ -135,33 +136,7 @@ class ElasticSearchBackend(SearchBackend):
             min_similarity=self._settings.get('MIN_SIMILARITY',
                                               DEFAULT_MIN_SIMILARITY)
         )
-        for hit in hits:
-            if self._is_valuable_hit(unit, hit):
-                body = hit['_source']
-                translation_pair = body['source'] + body['target']
-                if translation_pair not in counter:
-                    counter[translation_pair] = 1
-                    res.append({
-                        'unit_id': hit['_id'],
-                        'source': body['source'],
-                        'target': body['target'],
-                        'project': body['project'],
-                        'path': body['path'],
-                        'username': body['username'],
-                        'fullname': body['fullname'],
-                        'email_md5': body['email_md5'],
-                        'iso_submitted_on': body.get('iso_submitted_on', None),
-                        'display_submitted_on': body.get('display_submitted_on',
-                                                         None),
-                        'score': hit['_score'] * self.weight,
-                    })
-                else:
-                    counter[translation_pair] += 1
-
-        for item in res:
-            item['count'] = counter[item['source']+item['target']]
-
-        return res
+        return self._get_results(unit, hits)
 
     def update(self, language, obj):
         self._es_call(
@@ -171,3 +146,42 @@ class ElasticSearchBackend(SearchBackend):
             body=obj,
             id=obj['id']
         )
+
+    def bulk_update(self, language, objs, raise_on_error=False):
+        actions = [
+            dict(obj,
+                 _index=self._settings['INDEX_NAME'],
+                 _type=language,
+                 _id=obj['id'])
+            for obj in objs]
+        try:
+            helpers.bulk(self._es, actions, chunk_size=max(len(actions), 1))
+        except ElasticsearchException as e:
+            if raise_on_error:
+                raise
+            self._log_error(e)
+
+    def index_exists(self):
+        return self._es.indices.exists(self._settings['INDEX_NAME'])
+
+    def create_index(self):
+        self._es.indices.create(index=self._settings['INDEX_NAME'])
+
+    def delete_index(self):
+        self._es.indices.delete(index=self._settings['INDEX_NAME'])
+
+    def get_last_revision(self, language):
+        result = self._es.search(
+            index=self._settings['INDEX_NAME'],
+            doc_type=language,
+            body={
+                'aggs': {
+                    'max_revision': {
+                        'max': {
+                            'field': 'revision'
+                        }
+                    }
+                }
+            }
+        )
+        return result['aggregations']['max_revision']['value']
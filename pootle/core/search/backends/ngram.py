@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ..base import SearchBackend
+from .elasticsearch import (DEFAULT_MIN_SIMILARITY, filter_hits_by_distance,
+                            get_similarity)
+
+
+__all__ = ('NgramTMBackend',)
+
+
+logger = logging.getLogger(__name__)
+
+
+GRAM_LENGTH = 3
+# the number of units sharing the most n-grams with the searched text that
+# are scored
+MAX_CANDIDATES = 100
+MAX_RESULTS = 10
+# sqlite can't bind more variables in a query
+MAX_GRAMS = 500
+MMAP_SIZE = 256 * 1024 * 1024
+DB_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id TEXT PRIMARY KEY,
+    revision INTEGER,
+    source TEXT,
+    data TEXT);
+CREATE TABLE IF NOT EXISTS grams (
+    gram TEXT,
+    unit_id TEXT,
+    PRIMARY KEY (gram, unit_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS grams_unit_id ON grams (unit_id);
+"""
+
+# the schema is created by one thread at a time
+_schema_lock = threading.Lock()
+
+
+def get_grams(text):
+    """Returns the set of n-grams of the lowercased `text`, or the text
+    itself if it is shorter than an n-gram.
+    """
+    text = unicode(text or u"").lower()
+    if len(text) < GRAM_LENGTH:
+        return set([text]) if text else set()
+    return set(
+        text[i:i + GRAM_LENGTH]
+        for i
+        in range(len(text) - GRAM_LENGTH + 1))
+
+
+class NgramTMBackend(SearchBackend):
+    """TM backend that keeps an n-gram index of the translations of each
+    language in a sqlite database on disk, which is memory-mapped when
+    read.
+
+    The units that share the most n-grams with the searched text are
+    scored by their Levenshtein distance, as with Elasticsearch hits.
+    """
+
+    def __init__(self, config_name, create_index=True):
+        # the index is created when units are first added to it, so
+        # `create_index` has no effect
+        super(NgramTMBackend, self).__init__(config_name)
+        self.path = os.path.join(self._settings['PATH'],
+                                 self._settings['INDEX_NAME'])
+        self.weight = min(max(self._settings.get('WEIGHT', self.weight),
+                              0.0), 1.0)
+        self._local = threading.local()
+
+    @property
+    def connections(self):
+        # connections can't be shared by threads, or by forked processes
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.pid = os.getpid()
+            self._local.connections = {}
+        return self._local.connections
+
+    def _get_db_path(self, language):
+        return os.path.join(self.path, '%s.db' % language)
+
+    def _get_inode(self, db_path):
+        try:
+            return os.stat(db_path).st_ino
+        except OSError:
+            return None
+
+    def _connect(self, language, create=False):
+        """Returns a connection to the index of `language`, or `None` if
+        there is no index for it and it is not created.
+        """
+        db_path = self._get_db_path(language)
+        inode = self._get_inode(db_path)
+        if language in self.connections:
+            connection, connected_inode = self.connections.pop(language)
+            if inode is not None and inode == connected_inode:
+                self.connections[language] = (connection, inode)
+                return connection
+            # the index was removed or rebuilt
+            connection.close()
+        if inode is None and not create:
+            return None
+        with _schema_lock:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            connection = sqlite3.connect(db_path, timeout=DB_TIMEOUT)
+            connection.execute('PRAGMA mmap_size = %d' % MMAP_SIZE)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.executescript(SCHEMA)
+        self.connections[language] = (connection, self._get_inode(db_path))
+        return connection
+
+    def _close(self):
+        for connection, inode_ in self.connections.values():
+            connection.close()
+        self.connections.clear()
+
+    def _log_error(self, e):
+        logger.error("TM index error (%s): %s", self.path, e)
+
+    def _get_hits(self, connection, source):
+        grams = list(get_grams(source))[:MAX_GRAMS]
+        if not grams:
+            return []
+        candidates = connection.execute(
+            'SELECT unit_id FROM grams WHERE gram IN (%s) '
+            'GROUP BY unit_id ORDER BY COUNT(*) DESC LIMIT ?'
+            % ', '.join('?' * len(grams)),
+            grams + [MAX_CANDIDATES]).fetchall()
+        if not candidates:
+            return []
+        units = connection.execute(
+            'SELECT id, data FROM units WHERE id IN (%s)'
+            % ', '.join('?' * len(candidates)),
+            [unit_id for unit_id, in candidates]).fetchall()
+        hits = []
+        for unit_id, data in units:
+            body = json.loads(data)
+            hits.append({
+                '_id': unit_id,
+                '_source': body,
+                '_score': get_similarity(source, body['source'])})
+        return sorted(hits, reverse=True, key=lambda hit: hit['_score'])
+
+    def search(self, unit):
+        language = unit.store.translation_project.language.code
+        try:
+            connection = self._connect(language)
+            if connection is None:
+                return []
+            hits = self._get_hits(connection, unit.source)
+        except sqlite3.Error as e:
+            self._log_error(e)
+            return []
+
+        hits = filter_hits_by_distance(
+            hits,
+            unit.source,
+            min_similarity=self._settings.get('MIN_SIMILARITY',
+                                              DEFAULT_MIN_SIMILARITY)
+        )
+        return self._get_results(unit, hits[:MAX_RESULTS])
+
+    def update(self, language, obj):
+        self.bulk_update(language, [obj])
+
+    def bulk_update(self, language, objs, raise_on_error=False):
+        try:
+            connection = self._connect(language, create=True)
+            with connection:
+                unit_ids = [unicode(obj['id']) for obj in objs]
+                connection.executemany(
+                    'DELETE FROM grams WHERE unit_id = ?',
+                    [(unit_id, ) for unit_id in unit_ids])
+                connection.executemany(
+                    'INSERT OR REPLACE INTO units (id, revision, source, data) '
+                    'VALUES (?, ?, ?, ?)',
+                    [(unit_id,
+                      obj['revision'],
+                      unicode(obj['source']),
+                      json.dumps(obj, cls=DjangoJSONEncoder))
+                     for unit_id, obj in zip(unit_ids, objs)])
+                connection.executemany(
+                    'INSERT OR IGNORE INTO grams (gram, unit_id) VALUES (?, ?)',
+                    [(gram, unit_id)
+                     for unit_id, obj in zip(unit_ids, objs)
+                     for gram in get_grams(obj['source'])])
+        except (sqlite3.Error, EnvironmentError) as e:
+            if raise_on_error:
+                raise
+            self._log_error(e)
+
+    def index_exists(self):
+        return os.path.isdir(self.path)
+
+    def create_index(self):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+    def delete_index(self):
+        self._close()
+        shutil.rmtree(self.path)
+
+    def get_last_revision(self, language):
+        connection = self._connect(language)
+        if connection is None:
+            return None
+        return connection.execute(
+            'SELECT MAX(revision) FROM units').fetchone()[0]
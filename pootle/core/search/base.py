@@ -37,6 +37,43 @@ class SearchBackend(object):
 
         return False
 
+    def _is_valuable_hit(self, unit, hit):
+        return str(unit.id) != hit['_id']
+
+    def _get_results(self, unit, hits):
+        """Returns the TM results for `hits`, which are sorted from higher
+        to lower score and have the same shape as Elasticsearch hits.
+        """
+        counter = {}
+        res = []
+        for hit in hits:
+            if self._is_valuable_hit(unit, hit):
+                body = hit['_source']
+                translation_pair = body['source'] + body['target']
+                if translation_pair not in counter:
+                    counter[translation_pair] = 1
+                    res.append({
+                        'unit_id': hit['_id'],
+                        'source': body['source'],
+                        'target': body['target'],
+                        'project': body['project'],
+                        'path': body['path'],
+                        'username': body['username'],
+                        'fullname': body['fullname'],
+                        'email_md5': body['email_md5'],
+                        'iso_submitted_on': body.get('iso_submitted_on', None),
+                        'display_submitted_on': body.get('display_submitted_on',
+                                                         None),
+                        'score': hit['_score'] * self.weight,
+                    })
+                else:
+                    counter[translation_pair] += 1
+
+        for item in res:
+            item['count'] = counter[item['source']+item['target']]
+
+        return res
+
     def search(self, unit):
         """Search for TM results.
 
@@ -48,3 +85,23 @@ class SearchBackend(object):
     def update(self, language, obj):
         """Add a unit to the backend"""
         pass
+
+    def bulk_update(self, language, objs, raise_on_error=False):
+        """Add several units to the backend"""
+        for obj in objs:
+            self.update(language, obj)
+
+    def index_exists(self):
+        raise NotImplementedError
+
+    def create_index(self):
+        raise NotImplementedError
+
+    def delete_index(self):
+        raise NotImplementedError
+
+    def get_last_revision(self, language):
+        """Returns the highest revision of the units of `language` in the
+        backend, or `None` if there are none.
+        """
+        raise NotImplementedError
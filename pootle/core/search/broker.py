@@ -72,3 +72,10 @@ class SearchBroker(SearchBackend):
         for server in self._servers:
             if self._servers[server].is_auto_updatable:
                 self._servers[server].update(language, obj)
+
+    def bulk_update(self, language, objs):
+        if not objs:
+            return
+        for server in self._servers:
+            if self._servers[server].is_auto_updatable:
+                self._servers[server].bulk_update(language, objs)
@@ -7,7 +7,74 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import threading
+from collections import OrderedDict
+
 from django.dispatch import Signal
 
 
-update_data = Signal(providing_args=["instance"], use_caching=True)
+class SignalCoalescer(object):
+    """Collects the instances a signal is sent for, so that the signal can
+    be sent once for each sender/instance when flushed.
+    """
+
+    def __init__(self, signal):
+        self.signal = signal
+        self.pending = OrderedDict()
+        self.received = 0
+        self.executed = 0
+
+    @property
+    def coalesced(self):
+        return self.received - self.executed
+
+    def add(self, sender, instance):
+        self.received += 1
+        key = instance.pk if instance.pk is not None else id(instance)
+        self.pending[(sender, key)] = instance
+
+    def clear(self):
+        self.pending.clear()
+
+    def flush(self):
+        # the coalescer remains active while flushing, so that any signals
+        # sent by receivers are also collected and flushed
+        while self.pending:
+            (sender, key_), instance = self.pending.popitem(last=False)
+            self.executed += 1
+            Signal.send(self.signal, sender, instance=instance)
+
+
+class CoalescingSignal(Signal):
+    """A signal that can have its sends collected by a `SignalCoalescer` in
+    the current thread, rather than being sent immediately.
+
+    Only sends with an `instance` are collected, any other arguments are
+    dropped when the signal is flushed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(CoalescingSignal, self).__init__(*args, **kwargs)
+        self._local = threading.local()
+
+    @property
+    def coalescer(self):
+        return getattr(self._local, "coalescer", None)
+
+    @coalescer.setter
+    def coalescer(self, coalescer):
+        self._local.coalescer = coalescer
+
+    def send(self, sender, **named):
+        coalesce = (
+            self.coalescer is not None
+            and named.get("instance") is not None)
+        if not coalesce:
+            return super(CoalescingSignal, self).send(sender, **named)
+        if self.receivers:
+            # dont collect sends while the signal is suppressed
+            self.coalescer.add(sender, named["instance"])
+        return []
+
+
+update_data = CoalescingSignal(providing_args=["instance"], use_caching=True)
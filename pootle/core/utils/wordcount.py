@@ -13,10 +13,6 @@ re._MAXCACHE = 1000
 
 
 remove = re.compile(u"[\.]+", re.U)  # dots
-delimiters = re.compile(u"[\W]+", re.U)  # anything except a-z, A-Z and _
-delimiters_begin = re.compile(u"^[\W]+",
-                              re.U)  # anything except a-z, A-Z and _
-delimiters_end = re.compile(u"[\W]+$", re.U)  # anything except a-z, A-Z and _
 
 english_date = re.compile(
     u"(^|\W)(January|February|March|April|May|June|July|August|September|"
@@ -48,102 +44,118 @@ hanging_symbols_regex = \
     re.compile(u'(^[^\w\&]\s|\s[^\w\&]\s|\s[^\w\&]$|^[^\w\&]$)', re.U)
 
 
-def find_placeholders(aref, regex, cls=''):
-    # regex is compiled re object with pattern surrounded by "()"
-    i = 0
-    while i < len(aref):
-        chunk = aref[i]
-
-        if not chunk['translate']:
-            i += 1
-        else:
-            subchunks = regex.split(chunk['string'])
-            a = []
-            translate = False
-
-            for subchunk in subchunks:
-                translate = not translate
-                a.append({
-                    'translate': translate,
-                    'string': subchunk,
-                    'class': cls
-                })
-
-            aref[i:i+1] = a
-            i += len(a)
-
-
-def wordcount(string):
-    string = re.sub('\n', '{\\n}', string)
-
-    chunks = [{
-        'translate': 1,
-        'string': u'%s' % string,
-    }]
-
-    # FIXME: provide line continuations to fit lines below 80 chars
-
+# the placeholder patterns, in the order they are matched. Text matched by a
+# pattern is not counted, and is not matched by later patterns - so anchors
+# match at the boundaries of the text between earlier placeholders.
+PLACEHOLDERS = (
     # Escaped XML tags (used in some strings)
-    find_placeholders(chunks, escaped_xmltag_regex)
+    escaped_xmltag_regex,
     # XML tags
-    find_placeholders(chunks, xmltag_regex)
+    xmltag_regex,
     # Java format and it's escaped version
-    find_placeholders(chunks, java_format_regex)
+    java_format_regex,
     # Template format
-    find_placeholders(chunks, template_format_regex)
+    template_format_regex,
     # Android format
-    find_placeholders(chunks, android_format_regex)
+    android_format_regex,
     # sprintf
-    find_placeholders(chunks, sprintf_regex)
+    sprintf_regex,
     # Objective C style placeholders
-    find_placeholders(chunks, objective_c_regex)
+    objective_c_regex,
     # Dollar sign placeholders
-    find_placeholders(chunks, dollar_sign_regex)
+    dollar_sign_regex,
     # Percent sign placeholders
-    find_placeholders(chunks, persent_sign_regex)
+    persent_sign_regex,
     # '{\n}' newline marker
-    find_placeholders(chunks, newline_regex)
+    newline_regex,
     # Escaping sequences (\n, \r, \t)
-    find_placeholders(chunks, escaping_sqc_regex)
+    escaping_sqc_regex,
     # XML entities
-    find_placeholders(chunks, xml_entities_regex)
+    xml_entities_regex,
     # Product names
-    find_placeholders(chunks, product_names_regex)
+    product_names_regex,
     # Shortcuts
-    find_placeholders(chunks, shortcuts_regex)
+    shortcuts_regex,
     # Shortcut modifiers
-    find_placeholders(chunks, shortcuts_modifier_regex)
-
+    shortcuts_modifier_regex,
     # Find patterns that are not counted as words in Trados
     # Hanging symbols (excluding a-z, _ and &)
-    find_placeholders(chunks, hanging_symbols_regex, 'dont-count')
+    hanging_symbols_regex)
 
-    return _count_words(chunks)
+# matches if any of the placeholders could be found in a string
+any_placeholder = re.compile(
+    u"|".join(regex.pattern for regex in PLACEHOLDERS),
+    re.U)
 
+words = re.compile(u"\w+", re.U)
 
-def _count_words(aref):
+# the number of wordcounts that are remembered by `wordcount`
+WORDCOUNT_CACHE_SIZE = 10000
+
+
+def split_placeholders(string):
+    """Returns the chunks of `string` that are not placeholders."""
+    chunks = [string]
+    if not any_placeholder.search(string):
+        # the placeholders could only match chunks of the string if one
+        # of them matches the string
+        return chunks
+    for regex in PLACEHOLDERS:
+        # each pattern is surrounded by "()" so the placeholders are the odd
+        # items of the split
+        chunks = [
+            subchunk
+            for chunk in chunks
+            for subchunk in regex.split(chunk)[::2]]
+    return chunks
+
+
+def count_chunk_words(chunk):
     # These rules are based on observed Trados 2007 word calculation behavior
-    n = 0
 
-    for chunk in aref:
-        if chunk['translate']:
-            s = chunk['string']
-            # Replace the date with just the month name (i.e. count as a single
-            # word)
-            s = english_date.sub(u'\g<1>\g<2>\g<3>', s)
+    # Replace the date with just the month name (i.e. count as a single
+    # word)
+    chunk = english_date.sub(u'\g<1>\g<2>\g<3>', chunk)
+    # words separated by dots are counted as one word
+    return len(words.findall(remove.sub(u'', chunk)))
+
+
+class WordCounter(object):
+    """Counts the words in strings with `func`, remembering the counts for
+    up to `maxsize` strings.
+    """
+
+    def __init__(self, func, maxsize=WORDCOUNT_CACHE_SIZE):
+        self.func = func
+        self.maxsize = maxsize
+        self.counts = {}
+
+    def __call__(self, string):
+        try:
+            return self.counts[string]
+        except KeyError:
+            pass
+        if len(self.counts) >= self.maxsize:
+            self.counts.clear()
+        count = self.counts[string] = self.func(string)
+        return count
+
+    def count_many(self, strings):
+        """Returns the wordcounts for each of `strings`."""
+        return [self(string) for string in strings]
 
-            s = remove.sub(u'', s)
-            s = delimiters_begin.sub(u'', s)
-            s = delimiters_end.sub(u'', s)
 
-            a = delimiters.split(s)
+def _wordcount(string):
+    string = u'%s' % string.replace(u'\n', u'{\n}')
+    return sum(
+        count_chunk_words(chunk)
+        for chunk
+        in split_placeholders(string))
 
-            if len(a) > 1 and a[-1] == u'':
-                a.pop()
 
-            if len(a) == 1 and a[0] == u'':
-                a.pop()
+wordcount = WordCounter(_wordcount)
 
-            n += len(a)
 
-    return n
+def wordcount_many(strings):
+    """Returns the wordcounts for each of `strings`."""
+    return wordcount.count_many(strings)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+
+def _add_benchmark_stores(tp, parent, units):
+    from pytest_pootle.factories import StoreDBFactory, UnitDBFactory
+
+    from pootle_store.constants import FUZZY, TRANSLATED, UNTRANSLATED
+
+    states = (UNTRANSLATED, TRANSLATED, FUZZY, TRANSLATED)
+    for name in ["bench0.po", "bench1.po"]:
+        store = StoreDBFactory(
+            translation_project=tp,
+            parent=parent,
+            name=name,
+            pootle_path="%s%s" % (parent.pootle_path, name))
+        for i in range(0, units):
+            UnitDBFactory(store=store, state=states[i % len(states)])
+
+
+def _add_benchmark_tp(language, project, depth, units):
+    from pytest_pootle.factories import (
+        DirectoryFactory, TranslationProjectFactory)
+
+    tp = TranslationProjectFactory(project=project, language=language)
+    tp_dir = tp.directory
+    tp_dir.obsolete = False
+    tp_dir.save()
+    parent = tp_dir
+    _add_benchmark_stores(tp, parent, units)
+    for i in range(0, depth):
+        parent = DirectoryFactory(name="subdir%s" % i, parent=parent, tp=tp)
+        _add_benchmark_stores(tp, parent, units)
+    return tp
+
+
+@pytest.fixture
+def stats_benchmark_tree(request, english):
+    """Creates a synthetic tree of languages x projects x nested directories,
+    sized with the `--stats-benchmark` option.
+
+    Each directory in each TP has 2 stores with the given number of units,
+    and the quality checks are calculated for all of the units.
+    """
+    from pytest_pootle.factories import LanguageDBFactory, ProjectDBFactory
+
+    from pootle.core.checks.checker import QualityCheckUpdater
+    from pootle.core.contextmanagers import bulk_data_update
+    from pootle_format.models import Format
+
+    size = request.config.getoption("--stats-benchmark")
+    if not size:
+        pytest.skip("Stats benchmarks are only run with --stats-benchmark")
+    n_languages, n_projects, depth, units = [
+        int(x) for x in size.split(",")]
+    po = Format.objects.get(name="po")
+    languages = [
+        LanguageDBFactory(code="benchlanguage%s" % i)
+        for i in range(0, n_languages)]
+    projects = []
+    tps = []
+    with bulk_data_update():
+        for i in range(0, n_projects):
+            project = ProjectDBFactory(
+                code="benchproject%s" % i,
+                source_language=english)
+            project.filetypes.add(po)
+            projects.append(project)
+            for language in languages:
+                tps.append(
+                    _add_benchmark_tp(language, project, depth, units))
+        for tp in tps:
+            QualityCheckUpdater(translation_project=tp).update()
+    return dict(
+        size=dict(
+            languages=n_languages,
+            projects=n_projects,
+            depth=depth,
+            units=units),
+        languages=languages,
+        projects=projects,
+        tps=tps)
+
+
+@pytest.fixture
+def diff_benchmark_units(request):
+    """The number of units in the synthetic stores that are diffed in the
+    store diff benchmarks, set with the `--diff-benchmark` option.
+    """
+    units = request.config.getoption("--diff-benchmark")
+    if not units:
+        pytest.skip("Diff benchmarks are only run with --diff-benchmark")
+    return int(units)
+
+
+@pytest.fixture
+def wordcount_benchmark(request):
+    """Skips the wordcount benchmarks unless the `--wordcount-benchmark`
+    option is set.
+    """
+    if not request.config.getoption("--wordcount-benchmark"):
+        pytest.skip(
+            "Wordcount benchmarks are only run with --wordcount-benchmark")
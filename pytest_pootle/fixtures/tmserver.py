@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import json
+import threading
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+
+class TMServerHandler(BaseHTTPRequestHandler):
+    """Handles the few Elasticsearch requests that Pootle makes, storing
+    the indexed documents in memory.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def path_parts(self):
+        return [part for part in self.path.split("?")[0].split("/") if part]
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else ""
+
+    def respond(self, status, data=None):
+        body = json.dumps(data) if data is not None else ""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        index = self.path_parts[0]
+        self.respond(200 if index in self.server.indices else 404)
+
+    def do_PUT(self):
+        self.read_body()
+        self.server.indices.setdefault(self.path_parts[0], {})
+        self.respond(200, {"acknowledged": True})
+
+    def do_DELETE(self):
+        self.server.indices.pop(self.path_parts[0], None)
+        self.respond(200, {"acknowledged": True})
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+        body = self.read_body()
+        parts = self.path_parts
+        if parts[-1] == "_bulk":
+            self.respond(200, self.bulk(body))
+        elif parts[-1] == "_search":
+            self.respond(200, self.search(*parts[:-1]))
+        else:
+            self.respond(404, {})
+
+    def bulk(self, body):
+        self.server.bulk_requests.append(body)
+        lines = [json.loads(line) for line in body.splitlines() if line]
+        items = []
+        for action, doc in zip(lines[::2], lines[1::2]):
+            meta = action["index"]
+            self.server.indices.setdefault(meta["_index"], {})[
+                (meta["_type"], str(meta["_id"]))] = doc
+            items.append({"index": dict(meta, status=201)})
+        return {"took": 1, "errors": False, "items": items}
+
+    def search(self, index, doc_type=None):
+        revisions = [
+            doc["revision"]
+            for (_type, _id), doc
+            in self.server.indices.get(index, {}).items()
+            if doc_type is None or _type == doc_type]
+        return {
+            "hits": {"total": len(revisions), "hits": []},
+            "aggregations": {
+                "max_revision": {
+                    "value": max(revisions) if revisions else None}}}
+
+
+@pytest.fixture
+def tm_server(request, settings):
+    """A stand-in Elasticsearch server for the local TM."""
+    import pootle_store.models
+    from pootle.core.cache import get_cache
+
+    server = HTTPServer(("127.0.0.1", 0), TMServerHandler)
+    server.indices = {}
+    server.bulk_requests = []
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.ElasticSearchBackend',
+            'HOST': '127.0.0.1',
+            'PORT': server.server_port,
+            'INDEX_NAME': 'translations',
+        }
+    }
+    # drop any revision checkpoints and the cached TM broker
+    get_cache('redis').delete_pattern('pootle:tmserver:*')
+    pootle_store.models.TM_BROKER = None
+
+    def _stop_server():
+        server.shutdown()
+        server.server_close()
+        pootle_store.models.TM_BROKER = None
+
+    request.addfinalizer(_stop_server)
+    return server
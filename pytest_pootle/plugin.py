@@ -39,6 +39,23 @@ def pytest_addoption(parser):
         action="store",
         default="",
         help="Debug tests to a given file")
+    parser.addoption(
+        "--stats-benchmark",
+        action="store",
+        default="",
+        help=("Run the stats benchmarks against a synthetic tree of "
+              "LANGUAGES,PROJECTS,DEPTH,UNITS eg 2,2,3,20"))
+    parser.addoption(
+        "--diff-benchmark",
+        action="store",
+        default="",
+        help=("Run the store diff benchmarks against synthetic stores of "
+              "UNITS units eg 50000"))
+    parser.addoption(
+        "--wordcount-benchmark",
+        action="store_true",
+        default=False,
+        help="Run the wordcount benchmarks")
 
 
 @pytest.fixture(autouse=True)
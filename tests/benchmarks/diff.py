@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import difflib
+from collections import OrderedDict
+
+import pytest
+
+from translate.misc.multistring import multistring
+
+from pootle_store.constants import OBSOLETE, TRANSLATED, UNTRANSLATED
+from pootle_store.diff import DiffableStore, StoreDiff
+
+
+pytest.importorskip("pytest_benchmark")
+
+
+# the target revision, units with a higher revision are updated in the db
+TARGET_REVISION = 100
+
+
+class SyntheticDiffableStore(DiffableStore):
+    """Diffs units that are built in memory with a file store."""
+
+    target_units = None
+    source_units = None
+
+    def __init__(self, target_units, source_units):
+        super(SyntheticDiffableStore, self).__init__(None, None)
+        self.target_units = target_units
+        self.source_units = source_units
+
+
+class SyntheticStoreDiff(StoreDiff):
+
+    def __init__(self, target_units, source_units, source_revision):
+        self.diffable = SyntheticDiffableStore(target_units, source_units)
+        super(SyntheticStoreDiff, self).__init__(None, None, source_revision)
+
+    def get_target_revision(self):
+        return TARGET_REVISION
+
+
+class LegacySyntheticStoreDiff(SyntheticStoreDiff):
+    """The diff that runs `SequenceMatcher` over the whole unitid lists and
+    compares every unit with proxies, kept to compare with.
+    """
+
+    @property
+    def new_unit_list(self):
+        if self.source_revision >= self.target_revision:
+            return self.source_units.keys()
+        new_units = [u for u in self.updated_target_units
+                     if u not in self.source_units]
+        new_units += [u for u in self.source_units.keys()
+                      if u not in self.obsoleted_target_units]
+        return new_units
+
+    @property
+    def opcodes(self):
+        sm = difflib.SequenceMatcher(None,
+                                     self.active_target_units,
+                                     self.new_unit_list)
+        return sm.get_opcodes()
+
+    def get_units_to_obsolete(self):
+        return [unit['id'] for unitid, unit in self.target_units.items()
+                if (unitid not in self.source_units
+                    and unitid in self.active_target_units
+                    and unitid not in self.updated_target_units)]
+
+    def get_updated_sourceids(self):
+        update_ids = set()
+        for (tag, i1, i2, j1_, j2_) in self.opcodes:
+            if tag != 'equal':
+                continue
+            update_ids.update(
+                set(self.target_units[uid]['id']
+                    for uid in self.active_target_units[i1:i2]
+                    if (uid in self.source_units
+                        and (
+                            self.diffable.target_unit_class(
+                                self.target_units[uid])
+                            != self.diffable.source_unit_class(
+                                self.source_units[uid])))))
+        return update_ids
+
+
+def _get_units(units):
+    """Returns the db and file units of a store with `units` units, where 1%
+    of the units of the file are removed, added, moved or changed.
+    """
+    target_units = OrderedDict()
+    for i in range(units):
+        unitid = u"Unit %s" % i
+        target_units[unitid] = {
+            "unitid": unitid,
+            "state": OBSOLETE if i % 100 == 3 else TRANSLATED,
+            "id": i + 1,
+            "index": i,
+            "revision": i % (TARGET_REVISION + 1),
+            "source_f": multistring(u"Source %s" % i),
+            "target_f": multistring(u"Target %s" % i),
+            "developer_comment": u"",
+            "translator_comment": u"",
+            "locations": u"file.c:%s" % i,
+            "context": u""}
+    source_units = OrderedDict()
+    moved = []
+    for i, (unitid, unit) in enumerate(target_units.items()):
+        if i % 100 == 5:
+            continue
+        if i % 100 == 7:
+            new_unitid = u"New unit %s" % i
+            source_units[new_unitid] = {
+                "unitid": new_unitid,
+                "context": u"",
+                "locations": [u"new.c:%s" % i],
+                "source": multistring(u"New source %s" % i),
+                "target": multistring(u""),
+                "state": UNTRANSLATED,
+                "hasplural": False,
+                "developer_comment": u"",
+                "translator_comment": u""}
+        source_unit = {
+            "unitid": unitid,
+            "context": u"",
+            "locations": [unit["locations"]],
+            "source": unit["source_f"],
+            "target": unit["target_f"],
+            "state": TRANSLATED,
+            "hasplural": False,
+            "developer_comment": u"",
+            "translator_comment": u""}
+        if i % 100 == 9:
+            source_unit["target"] = multistring(u"Changed target %s" % i)
+        if i % 1000 == 11:
+            moved.append((unitid, source_unit))
+            continue
+        source_units[unitid] = source_unit
+    source_units.update(reversed(moved))
+    return target_units, source_units
+
+
+# the unit lists are only built when a benchmark is run, once for each size
+UNIT_LISTS = {}
+
+
+def _get_unit_lists(units):
+    if units not in UNIT_LISTS:
+        UNIT_LISTS[units] = _get_units(units)
+    return UNIT_LISTS[units]
+
+
+def _diff(diff_class, units, source_revision):
+    target_units, source_units = _get_unit_lists(units)
+    return diff_class(target_units, source_units, source_revision).diff()
+
+
+def _get_diff_result(diff):
+    return dict(
+        diff,
+        add=[(proxy.unit, index) for proxy, index in diff["add"]])
+
+
+@pytest.mark.parametrize("source_revision", [TARGET_REVISION, 50])
+def test_benchmark_store_diff_legacy(benchmark, diff_benchmark_units,
+                                     source_revision):
+    # the units are built before the diff is timed
+    _get_unit_lists(diff_benchmark_units)
+    benchmark.extra_info["units"] = diff_benchmark_units
+    diff = benchmark.pedantic(
+        _diff,
+        args=(LegacySyntheticStoreDiff, diff_benchmark_units,
+              source_revision),
+        rounds=1)
+    assert (
+        _get_diff_result(diff)
+        == _get_diff_result(
+            _diff(SyntheticStoreDiff, diff_benchmark_units,
+                  source_revision)))
+
+
+@pytest.mark.parametrize("source_revision", [TARGET_REVISION, 50])
+def test_benchmark_store_diff(benchmark, diff_benchmark_units,
+                              source_revision):
+    # the units are built before the diff is timed
+    _get_unit_lists(diff_benchmark_units)
+    benchmark.extra_info["units"] = diff_benchmark_units
+    diff = benchmark.pedantic(
+        _diff,
+        args=(SyntheticStoreDiff, diff_benchmark_units, source_revision),
+        rounds=5)
+    assert diff["add"]
+    assert diff["obsolete"]
+    assert diff["update"][0]
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from pootle_store.models import Store, Unit
+from pootle_store.unit.search import DBSearchBackend
+from pootle_store.unit.search_index import search_index
+
+
+pytest.importorskip("pytest_benchmark")
+
+
+SEARCHES = [
+    # a word in the text of the units of one store
+    ("subdir0/bench1.po", False),
+    # several words in all of the translated units
+    ("Translated Source", False),
+    ("Translated Source", True)]
+
+
+def _search(user, text, exact):
+    kwargs = {
+        "category": None,
+        "checks": None,
+        "soptions": exact and ["exact"] or [],
+        "search": text,
+        "sfields": ["source", "target"],
+        "user": user,
+        "modified-since": None,
+        "month": None}
+    backend = DBSearchBackend(user, **kwargs)
+    return list(
+        backend.filter_qs(Unit.objects.all()).values_list("pk", flat=True))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("text, exact", SEARCHES)
+def test_benchmark_search_icontains(stats_benchmark_tree, benchmark, member,
+                                    settings, text, exact):
+    settings.POOTLE_SEARCH_INDEX = False
+    benchmark.extra_info.update(stats_benchmark_tree["size"])
+    units = benchmark(_search, member, text, exact)
+    assert units
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("text, exact", SEARCHES)
+def test_benchmark_search_index(stats_benchmark_tree, benchmark, member,
+                                settings, text, exact):
+    for store in Store.objects.iterator():
+        search_index.rebuild(store)
+    settings.POOTLE_SEARCH_INDEX = False
+    expected = _search(member, text, exact)
+    settings.POOTLE_SEARCH_INDEX = True
+    benchmark.extra_info.update(stats_benchmark_tree["size"])
+    units = benchmark(_search, member, text, exact)
+    assert sorted(units) == sorted(expected)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.core.urlresolvers import reverse
+
+from pootle.core.cache import get_cache
+from pootle.core.delegate import data_tool
+from pootle_store.models import Store
+
+
+pytest.importorskip("pytest_benchmark")
+
+
+CONTEXTS = ["tp", "directory", "language", "project"]
+
+
+def _get_context(tree, name):
+    tp = tree["tps"][0]
+    if name == "tp":
+        return tp
+    elif name == "directory":
+        # the deepest directory in the tp
+        return tp.dirs.order_by("-pootle_path").first()
+    return getattr(tp, name)
+
+
+def _get_data_tool(context):
+    return data_tool.get(context.__class__)(context)
+
+
+def _clear_stats_cache():
+    get_cache("lru").delete_pattern("pootle_data.*")
+
+
+def _setup_benchmark(benchmark, tree, **kwargs):
+    benchmark.extra_info.update(tree["size"])
+    benchmark.extra_info.update(kwargs)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("context_name", CONTEXTS)
+def test_benchmark_get_stats(stats_benchmark_tree, benchmark, context_name):
+    context = _get_context(stats_benchmark_tree, context_name)
+    _setup_benchmark(benchmark, stats_benchmark_tree, context=context_name)
+    stats = benchmark.pedantic(
+        _get_data_tool(context).get_stats,
+        setup=_clear_stats_cache,
+        rounds=10)
+    assert stats["total"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("context_name", CONTEXTS)
+def test_benchmark_get_stats_cached(stats_benchmark_tree, benchmark,
+                                    context_name):
+    context = _get_context(stats_benchmark_tree, context_name)
+    _setup_benchmark(benchmark, stats_benchmark_tree, context=context_name)
+    _get_data_tool(context).get_stats()
+    assert benchmark(_get_data_tool(context).get_stats)["total"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("context_name", CONTEXTS)
+def test_benchmark_get_checks(stats_benchmark_tree, benchmark, context_name):
+    context = _get_context(stats_benchmark_tree, context_name)
+    _setup_benchmark(benchmark, stats_benchmark_tree, context=context_name)
+    checks = benchmark.pedantic(
+        _get_data_tool(context).get_checks,
+        setup=_clear_stats_cache,
+        rounds=10)
+    assert checks
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("context_name", ["store", "directory", "tp"])
+def test_benchmark_data_update(stats_benchmark_tree, benchmark, context_name):
+    if context_name == "store":
+        context = Store.objects.filter(
+            translation_project=stats_benchmark_tree["tps"][0]).first()
+    else:
+        context = _get_context(stats_benchmark_tree, context_name)
+    _setup_benchmark(benchmark, stats_benchmark_tree, context=context_name)
+    benchmark(_get_data_tool(context).update)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("view_name", ["tp", "language", "project"])
+def test_benchmark_browse_view(stats_benchmark_tree, benchmark, client,
+                               view_name):
+    tp = stats_benchmark_tree["tps"][0]
+    kwargs = {
+        "tp": dict(
+            language_code=tp.language.code,
+            project_code=tp.project.code,
+            dir_path=""),
+        "language": dict(language_code=tp.language.code),
+        "project": dict(
+            project_code=tp.project.code,
+            dir_path="",
+            filename="")}
+    url = reverse("pootle-%s-browse" % view_name, kwargs=kwargs[view_name])
+    _setup_benchmark(benchmark, stats_benchmark_tree, view=view_name)
+    response = benchmark.pedantic(
+        client.get,
+        args=(url, ),
+        setup=_clear_stats_cache,
+        rounds=5)
+    assert response.status_code == 200
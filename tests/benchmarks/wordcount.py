@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import re
+
+import pytest
+
+from pytest_pootle.fixtures.core.utils.wordcount import WORDCOUNT_TESTS
+
+from pootle.core.utils import wordcount
+
+
+pytest.importorskip("pytest_benchmark")
+
+
+STRINGS = [test["string"] for test in WORDCOUNT_TESTS.values()]
+
+delimiters = re.compile(u"[\W]+", re.U)  # anything except a-z, A-Z and _
+delimiters_begin = re.compile(u"^[\W]+",
+                              re.U)  # anything except a-z, A-Z and _
+delimiters_end = re.compile(u"[\W]+$", re.U)  # anything except a-z, A-Z and _
+
+
+def _legacy_wordcount(string):
+    """The wordcount engine that splits the string into a list of chunk
+    dicts once for each placeholder pattern, kept to compare with.
+    """
+    chunks = [{
+        'translate': 1,
+        'string': u'%s' % string.replace(u'\n', u'{\n}')}]
+    for regex in wordcount.PLACEHOLDERS:
+        i = 0
+        while i < len(chunks):
+            chunk = chunks[i]
+            if not chunk['translate']:
+                i += 1
+                continue
+            subchunks = []
+            translate = False
+            for subchunk in regex.split(chunk['string']):
+                translate = not translate
+                subchunks.append({
+                    'translate': translate,
+                    'string': subchunk,
+                    'class': ''})
+            chunks[i:i + 1] = subchunks
+            i += len(subchunks)
+    n = 0
+    for chunk in chunks:
+        if chunk['translate']:
+            s = wordcount.english_date.sub(u'\g<1>\g<2>\g<3>', chunk['string'])
+            s = wordcount.remove.sub(u'', s)
+            s = delimiters_begin.sub(u'', s)
+            s = delimiters_end.sub(u'', s)
+            a = delimiters.split(s)
+            if len(a) > 1 and a[-1] == u'':
+                a.pop()
+            if len(a) == 1 and a[0] == u'':
+                a.pop()
+            n += len(a)
+    return n
+
+
+def _count(func):
+    return [func(string) for string in STRINGS]
+
+
+def test_benchmark_wordcount_legacy(wordcount_benchmark, benchmark):
+    counts = benchmark(_count, _legacy_wordcount)
+    assert counts == _count(wordcount._wordcount)
+
+
+def test_benchmark_wordcount(wordcount_benchmark, benchmark):
+    counts = benchmark(_count, wordcount._wordcount)
+    assert counts == [test["pootle"] for test in WORDCOUNT_TESTS.values()]
+
+
+def test_benchmark_wordcount_many(wordcount_benchmark, benchmark):
+    # the remembered counts are cleared before each round, so that the
+    # strings are counted rather than looked up
+    counts = benchmark.pedantic(
+        wordcount.wordcount_many,
+        args=(STRINGS,),
+        setup=wordcount.wordcount.counts.clear,
+        rounds=1000)
+    assert counts == [test["pootle"] for test in WORDCOUNT_TESTS.values()]
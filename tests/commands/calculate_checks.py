@@ -40,3 +40,54 @@ def test_calculate_checks_language(capfd, project1):
     call_command('calculate_checks', '--language=language0')
     out, err = capfd.readouterr()
     assert 'Running calculate_checks for /language0/project0/' in out
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_calculate_checks_chunks(capfd, tp0, store0):
+    from pootle_store.models import QualityCheck
+
+    checks = QualityCheck.objects.filter(unit__store__translation_project=tp0)
+    check_keys = ("unit_id", "name", "category", "false_positive")
+    original_checks = sorted(checks.values_list(*check_keys))
+    critical_checks = store0.data.critical_checks
+    assert original_checks
+    checks.filter(unit__store=store0).delete()
+    store0.data_tool.update()
+    assert not store0.data.critical_checks
+    call_command(
+        'calculate_checks', '--language=language0', '--project=project0',
+        '--chunk-size=1')
+    out, err = capfd.readouterr()
+    assert 'Running calculate_checks for /language0/project0/' in out
+    assert sorted(checks.values_list(*check_keys)) == original_checks
+    store0.data.refresh_from_db()
+    assert store0.data.critical_checks == critical_checks
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_calculate_checks_worker(tp0, store0):
+    from pootle_app.management.commands.calculate_checks import (
+        update_store_checks)
+    from pootle_store.models import QualityCheck
+
+    checks = QualityCheck.objects.filter(unit__store=store0)
+    critical_checks = store0.data.critical_checks
+    tp_critical_checks = tp0.data.critical_checks
+    assert critical_checks
+    checks.delete()
+    store0.data_tool.update()
+    tp0.data_tool.update()
+    tp0.data.refresh_from_db()
+    assert (
+        tp0.data.critical_checks
+        == tp_critical_checks - critical_checks)
+    assert update_store_checks([store0.pk])
+    store0.data.refresh_from_db()
+    assert store0.data.critical_checks == critical_checks
+    # the data of the tp is shared with other workers and is not updated
+    tp0.data.refresh_from_db()
+    assert (
+        tp0.data.critical_checks
+        == tp_critical_checks - critical_checks)
@@ -81,3 +81,12 @@ def test_export_path_unknown():
     with pytest.raises(CommandError) as e:
         call_command('export', '--path=/af/unknown')
     assert "Could not find store matching '/af/unknown'" in str(e)
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_export_jobs():
+    """Export runs in a single process"""
+    with pytest.raises(CommandError) as e:
+        call_command('export', '--jobs=2')
+    assert "export can only be run with a single job" in str(e)
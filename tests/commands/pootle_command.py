@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.core.management import call_command
+
+from pootle_app.management.commands import (
+    PootleCommand, init_worker, run_translation_project)
+
+
+class StoresCommand(PootleCommand):
+    """Records the stores that it handles, failing over `fail_store`"""
+
+    name = "stores"
+
+    def __init__(self, *args, **kwargs):
+        self.fail_store = kwargs.pop("fail_store", None)
+        self.stores = []
+        super(StoresCommand, self).__init__(*args, **kwargs)
+
+    def handle_store(self, store, **options):
+        self.stores.append(store.pootle_path)
+        if store == self.fail_store:
+            raise ValueError
+
+
+class DummyPool(object):
+    """Runs the jobs in this process, so that they use the test db"""
+
+    def __init__(self, processes, initializer, initargs):
+        self.processes = processes
+        self.closed = False
+        self.joined = False
+        initializer(*initargs)
+        pools.append(self)
+
+    def imap_unordered(self, func, iterable):
+        return (func(item) for item in iterable)
+
+    def close(self):
+        self.closed = True
+
+    def join(self):
+        self.joined = True
+
+
+pools = []
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_pootle_command_worker(tp0, store0):
+    command = StoresCommand(fail_store=store0)
+    init_worker(command, {})
+    assert (
+        run_translation_project(tp0.pk)
+        == (tp0.pootle_path, False))
+    assert (
+        sorted(command.stores)
+        == sorted(tp0.stores.live().values_list("pootle_path", flat=True)))
+    command.stores = []
+    store0.makeobsolete()
+    assert (
+        run_translation_project(tp0.pk)
+        == (tp0.pootle_path, True))
+    assert store0.pootle_path not in command.stores
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_pootle_command_jobs(capfd, monkeypatch, tp0):
+    from pootle_app.management import commands
+    from pootle_app.management.commands.sync_stores import (
+        Command as SyncStoresCommand)
+    from pootle_translationproject.models import TranslationProject
+
+    closed = []
+    synced = []
+
+    def _handle_all_stores(command, tp, **options):
+        synced.append(tp.pootle_path)
+        if tp == tp0:
+            raise ValueError
+
+    monkeypatch.setattr(commands, "Pool", DummyPool)
+    monkeypatch.setattr(
+        commands.connections, "close_all", lambda: closed.append(True))
+    monkeypatch.setattr(
+        SyncStoresCommand, "handle_all_stores", _handle_all_stores)
+    del pools[:]
+    call_command("sync_stores", "--jobs=2")
+    tps = TranslationProject.objects.live()
+    # the connections are closed before the workers are started
+    assert closed == [True]
+    assert len(pools) == 1
+    assert pools[0].processes == 2
+    assert pools[0].closed and pools[0].joined
+    assert (
+        sorted(synced)
+        == sorted(tps.values_list("pootle_path", flat=True)))
+    out, err = capfd.readouterr()
+    assert (
+        "sync_stores failed over 1 of %s translation projects: %s"
+        % (tps.count(), tp0)
+        in err)
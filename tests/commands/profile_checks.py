@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.core.management import call_command
+
+from pootle_misc.checks import check_timings
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_profile_checks(capfd, tp0):
+    call_command(
+        'profile_checks', '--language=language0', '--project=project0',
+        '--sample=5')
+    out, err = capfd.readouterr()
+    assert 'Checked 5 units in %s' % tp0 in out
+    lines = out.splitlines()
+    assert lines[1].startswith('Check ')
+    assert 'Total (ms)' in lines[1]
+    # the checks are ranked by total time
+    totals = [float(line.split()[2]) for line in lines[2:]]
+    assert totals
+    assert totals == sorted(totals, reverse=True)
+    assert not check_timings.enabled
+    assert not check_timings.timings
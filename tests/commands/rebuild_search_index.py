@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.core.management import call_command
+
+from pootle_store.models import UnitSearchToken
+from pootle_store.unit.search_index import search_index
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_rebuild_search_index(capfd, tp0, store0):
+    unit = store0.units.first()
+    UnitSearchToken.objects.create(
+        unit=unit, language=tp0.language, token=u"zzz")
+    call_command(
+        'rebuild_search_index', '--language=language0', '--project=project0')
+    out, err = capfd.readouterr()
+    assert 'Rebuilding search index for %s' % tp0 in out
+    tokens = UnitSearchToken.objects.filter(unit=unit)
+    assert (
+        set(tokens.values_list("token", flat=True))
+        == search_index.get_unit_tokens(unit))
+    assert (
+        UnitSearchToken.objects.filter(
+            unit__store__translation_project=tp0).count()
+        == sum(len(search_index.get_unit_tokens(unit))
+               for unit
+               in store0.unit_set.model.objects.filter(
+                   store__translation_project=tp0,
+                   store__obsolete=False)))
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.core.management import call_command
+
+from pootle_app.management.commands.refresh_stats import StatsCheckpoint
+from pootle_data.models import StoreData
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_refresh_stats(capfd, tp0, store0):
+    total_words = store0.data.total_words
+    StoreData.objects.filter(store=store0).update(total_words=0)
+    tp0.data.total_words = 0
+    tp0.data.save()
+    call_command("refresh_stats", "--language=language0", "--project=project0")
+    out, err = capfd.readouterr()
+    assert "Refreshed %s" % tp0 in out
+    assert "units/sec" in out
+    store0.data.refresh_from_db()
+    tp0.data.refresh_from_db()
+    assert store0.data.total_words == total_words
+    assert (
+        tp0.data.total_words
+        == sum(tp0.stores.values_list("data__total_words", flat=True)))
+    # the progress is cleared after a complete run
+    assert not StatsCheckpoint("project0.language0").progress
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_refresh_stats_resume(capfd, tp0, store0):
+    checkpoint = StatsCheckpoint("project0.language0")
+    checkpoint.set(tp0.pk, "done")
+    StoreData.objects.filter(store=store0).update(total_words=0)
+    call_command("refresh_stats", "--language=language0", "--project=project0")
+    out, err = capfd.readouterr()
+    assert "Resuming refresh_stats" in out
+    assert "Skipping %s, already refreshed" % tp0 in out
+    store0.data.refresh_from_db()
+    assert store0.data.total_words == 0
+    assert not checkpoint.progress
+
+    # stores that were already refreshed are skipped
+    last_store = tp0.stores.order_by("pk").last()
+    checkpoint.set(tp0.pk, last_store.pk)
+    call_command("refresh_stats", "--language=language0", "--project=project0")
+    out, err = capfd.readouterr()
+    assert "Refreshed %s (0 units)" % tp0 in out
+    store0.data.refresh_from_db()
+    assert store0.data.total_words == 0
+
+    # unless the progress is reset
+    checkpoint.set(tp0.pk, "done")
+    call_command(
+        "refresh_stats", "--language=language0", "--project=project0",
+        "--reset")
+    out, err = capfd.readouterr()
+    assert "Skipping" not in out
+    store0.data.refresh_from_db()
+    assert store0.data.total_words > 0
@@ -108,3 +108,10 @@ def test_cmd_set_project_filetypes_bad():
             "set_filetype",
             "--project=PROJECT_DOES_NOT_EXIST",
             "po")
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_cmd_set_project_filetypes_jobs():
+    with pytest.raises(CommandError):
+        call_command("set_filetype", "--jobs=2", "po")
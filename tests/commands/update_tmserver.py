@@ -51,6 +51,137 @@ def __test_update_tmserver_noargs(capfd, tp0, settings):
     assert ("%d translations to index" % units_qs.count()) in out
 
 
+def _get_tm_units(**kwargs):
+    from pootle_store.models import Unit
+
+    return (
+        Unit.objects
+            .exclude(target_f__isnull=True)
+            .exclude(target_f__exact='')
+            .exclude(store__translation_project__project__disabled=True)
+            .filter(**kwargs))
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_tmserver_local(capfd, tm_server):
+    """Load the local TM from the database in bulk requests"""
+    from django.db.models import Max
+
+    from pootle.core.cache import get_cache
+
+    units_qs = _get_tm_units()
+    call_command('update_tmserver', '--jobs=2', '--chunk-size=10')
+    out, err = capfd.readouterr()
+    assert ("%d translations to index" % units_qs.count()) in out
+
+    docs = tm_server.indices["translations"]
+    assert len(docs) == units_qs.count()
+    assert len(tm_server.bulk_requests) >= units_qs.count() / 10
+    for language, unit_id in docs.keys():
+        assert units_qs.filter(
+            pk=unit_id,
+            store__translation_project__language__code=language).exists()
+
+    # the last indexed revision is kept for each language
+    revisions = units_qs.values_list(
+        "store__translation_project__language__code").annotate(
+            Max("revision"))
+    cache = get_cache("redis")
+    for language, revision in revisions:
+        assert cache.get("pootle:tmserver:translations:%s" % language) == revision
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_tmserver_local_resume(capfd, tm_server, language0):
+    """An interrupted update resumes from the last indexed revision"""
+    from pootle.core.cache import get_cache
+
+    call_command('update_tmserver')
+    docs = tm_server.indices["translations"]
+    revisions = sorted(
+        set(_get_tm_units(store__translation_project__language=language0)
+            .values_list("revision", flat=True)))
+    checkpoint = revisions[len(revisions) / 2]
+    get_cache("redis").set(
+        "pootle:tmserver:translations:%s" % language0.code,
+        checkpoint)
+    docs.clear()
+
+    call_command('update_tmserver')
+    out, err = capfd.readouterr()
+    assert (
+        "Last indexed revision for %s = %s" % (language0.code, checkpoint)
+        in out)
+    indexed = _get_tm_units(
+        store__translation_project__language=language0,
+        revision__gt=checkpoint)
+    assert indexed.count()
+    assert (
+        sorted(int(unit_id) for language, unit_id in docs.keys())
+        == sorted(indexed.values_list("pk", flat=True)))
+
+    # a refresh indexes everything again
+    call_command('update_tmserver', '--refresh')
+    assert len(docs) == _get_tm_units().count()
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_tmserver_local_missing_index(capfd, tm_server, language0):
+    """Checkpoints are discarded when the index is missing"""
+    from pootle.core.cache import get_cache
+
+    cache_key = "pootle:tmserver:translations:%s" % language0.code
+    revision = _get_tm_units().order_by("-revision").first().revision
+    get_cache("redis").set(cache_key, revision)
+
+    # a dry run does not create the index or drop the checkpoints
+    call_command('update_tmserver', '--dry-run')
+    assert "translations" not in tm_server.indices
+    assert get_cache("redis").get(cache_key) == revision
+
+    call_command('update_tmserver')
+    out, err = capfd.readouterr()
+    assert "Last indexed revision for %s = -1" % language0.code in out
+    assert len(tm_server.indices["translations"]) == _get_tm_units().count()
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_tmserver_ngram(capfd, settings, tmpdir):
+    """Load the embedded n-gram TM from the database"""
+    from pootle.core.search.backends import NgramTMBackend
+
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.NgramTMBackend',
+            'PATH': str(tmpdir),
+            'INDEX_NAME': 'translations-ngram',
+        }
+    }
+    units_qs = _get_tm_units()
+    call_command('update_tmserver', '--jobs=2', '--chunk-size=10')
+    out, err = capfd.readouterr()
+    assert ("%d translations to index" % units_qs.count()) in out
+
+    tm = NgramTMBackend('local')
+    for language, revision in units_qs.values_list(
+            "store__translation_project__language__code", "revision"):
+        assert tm.get_last_revision(language) >= revision
+    unit = units_qs.first()
+    assert tm.search(unit) == tm._get_results(
+        unit,
+        [hit for hit in tm._get_hits(tm._connect(
+            unit.store.translation_project.language.code), unit.source)
+         if hit['_score'] >= 0.7][:10])
+
+    call_command('update_tmserver', '--rebuild')
+    out, err = capfd.readouterr()
+    assert ("%d translations to index" % units_qs.count()) in out
+
+
 @pytest.mark.cmd
 @pytest.mark.django_db
 def test_update_tmserver_bad_tm(capfd, settings):
@@ -10,9 +10,11 @@ import pytest
 
 from django.dispatch import receiver
 
-from pootle.core.contextmanagers import keep_data, update_data_after
+from pootle.core.contextmanagers import (
+    bulk_data_update, keep_data, update_data_after)
 from pootle.core.signals import update_data
 from pootle_store.models import Store
+from pootle_translationproject.models import TranslationProject
 
 
 @pytest.fixture
@@ -91,3 +93,60 @@ def test_contextmanager_keep_data_kwargs(store0, no_update_data_):
     assert result[0]["instance"] == store0
     assert result[0]["foo"] == "plums"
     assert result[0]["bar"] == "oranges"
+
+
+@pytest.mark.django_db
+def test_contextmanager_bulk_data_update(store0, store_po, no_update_data_):
+
+    result = []
+
+    @receiver(update_data, sender=Store)
+    def update_data_handler(**kwargs):
+        result.append(kwargs["instance"])
+
+    with bulk_data_update() as updates:
+        update_data.send(Store, instance=store0)
+        update_data.send(Store, instance=store_po)
+        update_data.send(Store, instance=store0, foo="bar")
+        # nested contexts are flushed by the outer context
+        with bulk_data_update() as nested:
+            update_data.send(Store, instance=store_po)
+        assert nested is updates
+        assert result == []
+        # suppressed signals are not collected
+        with keep_data():
+            update_data.send(Store, instance=store0)
+    assert result == [store0, store_po]
+    assert updates.received == 4
+    assert updates.executed == 2
+    assert updates.coalesced == 2
+
+    # works as normal again now
+    update_data.send(Store, instance=store0)
+    assert result == [store0, store_po, store0]
+
+
+@pytest.mark.django_db
+def test_contextmanager_bulk_data_update_cascade(tp0, no_update_data_):
+
+    result = []
+
+    @receiver(update_data, sender=Store)
+    def update_store_data_handler(**kwargs):
+        store = kwargs["instance"]
+        result.append(store)
+        tp = store.translation_project
+        update_data.send(tp.__class__, instance=tp)
+
+    @receiver(update_data, sender=TranslationProject)
+    def update_tp_data_handler(**kwargs):
+        result.append(kwargs["instance"])
+
+    stores = list(tp0.stores.all())
+    with bulk_data_update() as updates:
+        for store in stores:
+            update_data.send(Store, instance=store)
+    # each store is updated and then the tp is updated once
+    assert result == stores + [tp0]
+    assert updates.received == len(stores) * 2
+    assert updates.executed == len(stores) + 1
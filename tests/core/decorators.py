@@ -195,3 +195,77 @@ def test_deco_persistent_property():
     foo = Foo()
     assert foo.bar == "Baz"
     assert get_cache().get('special-foo-cache/bar') == "Baz"
+
+
+@pytest.mark.django
+def test_deco_persistent_property_locked(settings):
+
+    class persistent_nowait(persistent_property):
+        wait_timeout = .1
+        wait_interval = .05
+
+    class Foo(object):
+        cache_key = "foo-locked-cache"
+        stale_cache_key = "foo-stale-cache"
+        calculated = 0
+
+        def _bar(self):
+            self.calculated += 1
+            return "Baz%s" % self.calculated
+        bar = persistent_nowait(_bar, name="bar")
+
+    cache = get_cache()
+    cache.delete_many(
+        ["foo-locked-cache/bar", "foo-locked-cache/bar.lock",
+         "foo-stale-cache/bar"])
+    settings.POOTLE_PERSISTENT_PROPERTY_METRICS = True
+    metrics = persistent_property.get_metrics()
+    foo = Foo()
+    assert foo.bar == "Baz1"
+    # the value is also stored as the stale value, and the lock is released
+    assert cache.get("foo-locked-cache/bar") == "Baz1"
+    assert cache.get("foo-stale-cache/bar") == "Baz1"
+    assert cache.get("foo-locked-cache/bar.lock") is None
+    assert persistent_property.get_metrics()["miss"] == metrics["miss"] + 1
+
+    # the revision changes while another process is calculating the value
+    foo.cache_key = "foo-locked-cache-2"
+    cache.set("foo-locked-cache-2/bar.lock", 1)
+    assert foo.bar == "Baz1"
+    assert foo.calculated == 1
+    assert persistent_property.get_metrics()["stale"] == metrics["stale"] + 1
+
+    # without a stale value it waits for the other process and then
+    # calculates the value itself
+    cache.delete("foo-stale-cache/bar")
+    assert foo.bar == "Baz2"
+    assert cache.get("foo-locked-cache-2/bar") == "Baz2"
+    # the lock belongs to the other process
+    assert cache.get("foo-locked-cache-2/bar.lock") == 1
+    cache.delete_many(
+        ["foo-locked-cache/bar", "foo-locked-cache-2/bar",
+         "foo-locked-cache-2/bar.lock", "foo-stale-cache/bar"])
+
+
+@pytest.mark.django
+def test_deco_persistent_property_metrics(settings):
+
+    class Foo(object):
+        cache_key = "foo-metrics-cache"
+
+        @persistent_property
+        def bar(self):
+            return "Baz"
+
+    cache = get_cache()
+    cache.delete("foo-metrics-cache/bar")
+    foo = Foo()
+    assert foo.bar == "Baz"
+    metrics = persistent_property.get_metrics()
+    # hits are not counted by default
+    assert foo.bar == "Baz"
+    assert persistent_property.get_metrics() == metrics
+    settings.POOTLE_PERSISTENT_PROPERTY_METRICS = True
+    assert foo.bar == "Baz"
+    assert persistent_property.get_metrics()["hit"] == metrics["hit"] + 1
+    cache.delete("foo-metrics-cache/bar")
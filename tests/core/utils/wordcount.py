@@ -10,10 +10,36 @@ from translate.storage.statsdb import wordcount as ttk_wordcount
 
 from pytest_pootle.fixtures.core.utils.wordcount import WORDCOUNT_TESTS
 
-from pootle.core.utils.wordcount import wordcount as ptl_wordcount
+from pootle.core.utils.wordcount import (
+    WordCounter, wordcount as ptl_wordcount, wordcount_many)
 
 
 def test_param_wordcount(wordcount_names):
     this_test = WORDCOUNT_TESTS[wordcount_names]
     assert ttk_wordcount(this_test["string"]) == this_test["ttk"]
     assert ptl_wordcount(this_test["string"]) == this_test["pootle"]
+
+
+def test_wordcount_many():
+    strings = [test["string"] for test in WORDCOUNT_TESTS.values()]
+    assert (
+        wordcount_many(strings)
+        == [test["pootle"] for test in WORDCOUNT_TESTS.values()])
+
+
+def test_wordcounter():
+    counted = []
+
+    def _wordcount(string):
+        counted.append(string)
+        return len(string.split())
+
+    counter = WordCounter(_wordcount, maxsize=2)
+    assert counter(u"a b") == 2
+    assert counter(u"a b") == 2
+    assert counted == [u"a b"]
+    assert counter.count_many([u"a", u"a b", u"a"]) == [1, 2, 1]
+    assert counted == [u"a b", u"a"]
+    # the remembered counts are discarded once there are too many
+    assert counter(u"a b c") == 3
+    assert counter.counts == {u"a b c": 3}
@@ -428,3 +428,164 @@ def test_get_qualitycheck_list(tp0):
     result = sorted(result, key=alphabetical_critical_first)
 
     assert result == get_qualitycheck_list(tp0)
+
+
+class _CheckedUnit(object):
+
+    def __init__(self, source, target, language_code="fr"):
+        self.source = source
+        self.target = target
+        self.language_code = language_code
+
+    @property
+    def store(self):
+        return self
+
+    @property
+    def translation_project(self):
+        return self
+
+    @property
+    def language(self):
+        return self
+
+    @property
+    def code(self):
+        return self.language_code
+
+    def hasplural(self):
+        return False
+
+    def getlocations(self):
+        return []
+
+
+CHECK_PLAN_STRINGS = [
+    u'', u'foo bar', u'%s', u'%1$s', u'%d items', u'{0}', u'{{name}}',
+    u'{{#tag}}foo{{/tag}}', u'${foo}', u'$foo$', u'%%foo%%', u'%foo',
+    u'FOO_BAR', u'&amp;', u'& foo', u'&foo', u'_File', u'<b>foo</b>',
+    u'<a href="x">foo</a>', u'"foo"', u' foo ', u'MMM d, yyyy', u'M',
+    u'{n:foo|bar}', u'{n}', u'%{foo}', u'\\u00e9', u'%@', u'\x01',
+    u'<img src="/images/account/bnr_foo.gif" />', u'<no tags>', u'{',
+    u'&#x41;', u'{0,number}', u'@foo', u'F&oo',
+]
+
+
+@pytest.mark.parametrize('source_string', CHECK_PLAN_STRINGS)
+def test_check_plan_results(source_string):
+    from translate.filters import checks
+
+    def _legacy_run_filters(unit):
+        checker.str1 = unit.source
+        checker.str2 = unit.target
+        checker.language_code = unit.language_code
+        return checks.UnitChecker.run_filters(checker, unit, categorised=True)
+
+    for target_string in CHECK_PLAN_STRINGS:
+        for unit in (_CheckedUnit(source_string, target_string),
+                     _CheckedUnit(source_string, source_string + target_string)):
+            assert (
+                checker.run_filters(unit, categorised=True)
+                == _legacy_run_filters(unit))
+
+
+def test_check_plan():
+    from pootle_misc.checks import get_check_plan
+
+    plan = get_check_plan(checker)
+    assert get_check_plan(checker) is plan
+    assert "c_format" in plan.get_checks(u"foo")
+    assert "java_format" not in plan.get_checks(u"foo")
+    assert "java_format" in plan.get_checks(u"foo {0,number}")
+    assert "java_format" in plan.get_skipped(u"foo")
+    assert plan.get_checks(u"foo") is plan.get_checks(u"foo")
+
+
+class _CountingChecker(ENChecker):
+
+    runs = 0
+
+    def run_filters(self, unit, categorised=False):
+        self.runs += 1
+        return super(_CountingChecker, self).run_filters(unit, categorised)
+
+
+def test_check_results(settings):
+    from pootle_misc.checks import CheckResults
+
+    settings.POOTLE_QUALITY_CHECKS_MEMO_SIZE = 2
+    results = CheckResults()
+    counting_checker = _CountingChecker()
+    unit = _CheckedUnit(u"%s foo", u"foo")
+    failures = results.run_filters(counting_checker, unit)
+    assert failures == checker.run_filters(unit, categorised=True)
+    assert "c_format" in failures
+    failures["c_format"]["message"] = u"changed"
+    assert (
+        results.run_filters(counting_checker, _CheckedUnit(u"%s foo", u"foo"))
+        == checker.run_filters(unit, categorised=True))
+    assert counting_checker.runs == 1
+
+    # the results for other targets or checkers are not shared
+    results.run_filters(counting_checker, _CheckedUnit(u"%s foo", u"%s foo"))
+    assert counting_checker.runs == 2
+    settings.POOTLE_QUALITY_CHECKER = "pootle_misc.checks.ENChecker"
+    other_checker = _CountingChecker()
+    results.run_filters(other_checker, unit)
+    assert other_checker.runs == 1
+
+    # only the most recent results are remembered
+    assert len(results.results) == 2
+    settings.POOTLE_QUALITY_CHECKER = ""
+    results.run_filters(counting_checker, unit)
+    assert counting_checker.runs == 3
+
+
+def test_check_results_cache(settings):
+    from pootle.core.cache import get_cache
+    from pootle_misc.checks import CheckResults
+
+    settings.POOTLE_QUALITY_CHECKS_MEMO_CACHE = "lru"
+    get_cache("lru").delete_pattern("pootle_misc.checks.*")
+    counting_checker = _CountingChecker()
+    unit = _CheckedUnit(u"%s foo", u"foo")
+    CheckResults().run_filters(counting_checker, unit)
+    # results are shared with other processes
+    failures = CheckResults().run_filters(counting_checker, unit)
+    assert counting_checker.runs == 1
+    assert failures == checker.run_filters(unit, categorised=True)
+
+
+def test_check_timings():
+    from pootle_misc.checks import (
+        CheckTimings, check_timings, get_check_plan, run_given_filters)
+
+    timings = CheckTimings()
+    # nothing is recorded unless enabled
+    timings.stop("c_format", timings.start())
+    assert timings.timings == {}
+    timings.enabled = True
+    timings.stop("c_format", timings.start())
+    timings.stop("c_format", timings.start())
+    timings.stop("tabs", timings.start())
+    calls, total, longest = timings.timings["c_format"]
+    assert calls == 2
+    assert longest <= total
+    ranked = timings.get_ranked()
+    assert sorted(timing[0] for timing in ranked) == ["c_format", "tabs"]
+    assert ranked[0][2] >= ranked[1][2]
+    timings.clear()
+    assert timings.get_ranked() == []
+
+    checker = ENChecker()
+    unit = _CheckedUnit(u"%s foo", u"%s bar")
+    check_timings.enabled = True
+    try:
+        checker.run_filters(unit, categorised=True)
+        timed = dict(check_timings.timings)
+        run_given_filters(checker, unit, ["c_format"])
+    finally:
+        check_timings.enabled = False
+    assert set(timed) == set(get_check_plan(checker).get_checks(u"%s foo"))
+    assert check_timings.timings["c_format"][0] == timed["c_format"][0] + 1
+    check_timings.clear()
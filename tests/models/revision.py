@@ -60,3 +60,43 @@ def test_revision_incr(store0):
     assert db_unit.revision != previous_revision
     assert Revision.get() != previous_revision
     assert db_unit.revision == Revision.get()
+
+
+@pytest.mark.django_db
+def test_revision_reserve(store0):
+    previous_revision = Revision.get()
+    block = Revision.reserve(5)
+    assert Revision.get() == previous_revision + 5
+    assert block.remaining == 5
+    assert (
+        [block.next() for i in range(5)]
+        == range(previous_revision + 1, previous_revision + 6))
+    assert block.remaining == 0
+    assert block.next() is None
+
+
+@pytest.mark.django_db
+def test_revision_reserved(store0):
+    previous_revision = Revision.get()
+    with Revision.reserved(2) as block:
+        assert Revision.get() == previous_revision + 2
+        db_unit = _update_translation(
+            store0, 0, {'target': u'Fleisch'}, sync=False)
+        assert db_unit.revision == previous_revision + 1
+        with Revision.reserved(3):
+            assert Revision.incr() == previous_revision + 3
+        assert Revision.incr() == previous_revision + 2
+        assert block.remaining == 0
+        # the block is used up, so the counter is incremented
+        assert Revision.incr() == previous_revision + 6
+    assert Revision.incr() == previous_revision + 7
+    assert Revision.get() == previous_revision + 7
+
+
+@pytest.mark.django_db
+def test_revision_reserved_none(store0):
+    previous_revision = Revision.get()
+    with Revision.reserved(0) as block:
+        assert block is None
+        assert Revision.get() == previous_revision
+        assert Revision.incr() == previous_revision + 1
@@ -6,8 +6,10 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import difflib
 import io
 import os
+import random
 
 import six
 
@@ -19,10 +21,12 @@ from pytest_pootle.factories import (
 from pytest_pootle.utils import update_store
 
 from translate.storage.factory import getclass
+from translate.storage.xliff import xlifffile
 
 from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from pootle.core.cache import get_cache
 from pootle.core.delegate import (
     config, format_classes, format_diffs, formats)
 from pootle.core.models import Revision
@@ -40,7 +44,10 @@ from pootle_project.models import Project
 from pootle_statistics.models import SubmissionTypes
 from pootle_store.constants import (
     NEW, OBSOLETE, PARSED, POOTLE_WINS, TRANSLATED)
-from pootle_store.diff import DiffableStore, StoreDiff
+from pootle_store.diff import (
+    DBUnit, DiffableStore, FileUnit, StoreDiff, StreamingDiffableStore,
+    get_opcodes)
+from pootle_store.fields import parsed_stores
 from pootle_store.models import Store
 from pootle_store.util import parse_pootle_revision
 from pootle_translationproject.models import TranslationProject
@@ -126,6 +133,53 @@ def test_sync(project0_nongnu, project0, store0):
     assert store.file.exists()
 
 
+@pytest.mark.django_db
+def test_parsed_stores_shared(store0, tmpdir, settings):
+    settings.POOTLE_PARSED_STORE_CACHE = "exports"
+    content = store0.serialize()
+    paths = []
+    for name in ["store.po", "copy.po"]:
+        path = tmpdir.join(name)
+        path.write(content, mode="wb")
+        paths.append(str(path))
+    parsed = parsed_stores.parse(paths[0])
+    cache_key = parsed_stores.get_cache_key(paths[0], parsed.__class__)
+    assert cache_key == parsed_stores.get_cache_key(
+        paths[1], parsed.__class__)
+    assert get_cache("exports").get(cache_key) is not None
+
+    # the copy has the same content so is not parsed again
+    shared = parsed_stores.parse(paths[1])
+    assert shared is not parsed
+    assert shared.filename == paths[1]
+    assert (
+        [(unit.getid(), unit.target) for unit in shared.units]
+        == [(unit.getid(), unit.target) for unit in parsed.units])
+
+
+def test_parsed_stores_not_shared_xliff(tmpdir, settings):
+    settings.POOTLE_PARSED_STORE_CACHE = "exports"
+    xliff = xlifffile()
+    xliff.addsourceunit("Hello").target = "Bonjour"
+    content = str(xliff)
+    paths = []
+    for name in ["store.xlf", "copy.xlf"]:
+        path = tmpdir.join(name)
+        path.write(content, mode="wb")
+        paths.append(str(path))
+    parsed = parsed_stores.parse(paths[0])
+    assert isinstance(parsed, xlifffile)
+    cache_key = parsed_stores.get_cache_key(paths[0], parsed.__class__)
+    assert get_cache("exports").get(cache_key) is None
+
+    # the copy is parsed from the file and its units are usable
+    copy = parsed_stores.parse(paths[1])
+    assert copy is not parsed
+    assert (
+        [(unit.source, unit.target) for unit in copy.units]
+        == [(u"Hello", u"Bonjour")])
+
+
 @pytest.mark.django_db
 def test_update_from_ts(store0, test_fs):
     store0.parsed = True
@@ -1103,6 +1157,91 @@ def test_store_diff_delete_obsoleted_target_unit(diffable_stores):
     assert not differ.diff()
 
 
+@pytest.mark.parametrize(
+    "source, target",
+    [("", "abc"),
+     ("abc", ""),
+     ("abcdef", "abcdef"),
+     ("abcdef", "abxdeyf"),
+     ("abcdef", "fedcba"),
+     ("abcdefgh", "efghabcd"),
+     ("abcdefgh", "adefbcgh"),
+     ("abcdefgh", "xghabzcdey")])
+def test_store_diff_opcodes(source, target):
+    assert (
+        get_opcodes(source, target)
+        == difflib.SequenceMatcher(None, source, target).get_opcodes())
+
+
+def test_store_diff_opcodes_random():
+    rand = random.Random(23)
+    for i in range(500):
+        source = rand.sample(range(100), rand.randint(0, 50))
+        target = list(source)
+        for j in range(rand.randint(0, 5)):
+            # move a slice of the units
+            start = rand.randint(0, len(target))
+            end = rand.randint(start, len(target))
+            moved = target[start:end]
+            del target[start:end]
+            insert_at = rand.randint(0, len(target))
+            target[insert_at:insert_at] = moved
+        # and remove and add some
+        target = [
+            unitid for unitid in target
+            if rand.random() > 0.1]
+        target += [
+            unitid for unitid in range(100, 110)
+            if rand.random() > 0.5]
+        assert (
+            get_opcodes(source, target)
+            == difflib.SequenceMatcher(None, source, target).get_opcodes())
+
+
+@pytest.mark.django_db
+def test_store_diff_fingerprint(store_diff_tests):
+    diff = store_diff_tests[0]
+    target_units = diff.diffable.target_units
+    source_units = diff.diffable.source_units
+    assert diff.diffable.source_unit_class == FileUnit
+    for unitid, source_unit in source_units.items():
+        if unitid not in target_units:
+            continue
+        target_unit = target_units[unitid]
+        assert (
+            (DBUnit.get_fingerprint(target_unit)
+             == FileUnit.get_fingerprint(source_unit))
+            == (DBUnit(target_unit) == FileUnit(source_unit)))
+
+
+@pytest.mark.django_db
+def test_store_diff_streaming(store_diff_tests, settings):
+    diff, store, update_units_, store_revision = store_diff_tests
+    diff_diff = diff.diff()
+    assert not isinstance(diff.diffable, StreamingDiffableStore)
+    settings.POOTLE_STORE_DIFF_STREAMING_UNITS = 1
+    streaming_diff = StoreDiff(store, diff.source_store, store_revision)
+    streaming_diff_diff = streaming_diff.diff()
+    # stores with no units besides a header are not streamed
+    assert (
+        isinstance(streaming_diff.diffable, StreamingDiffableStore)
+        == (len(diff.source_store.units) > 1))
+    assert (
+        streaming_diff.target_units.keys()
+        == diff.target_units.keys())
+    assert (
+        streaming_diff.source_units.keys()
+        == diff.source_units.keys())
+    if diff_diff is None:
+        assert streaming_diff_diff is None
+        return
+    assert (
+        [(proxy.unit, index) for proxy, index in streaming_diff_diff["add"]]
+        == [(proxy.unit, index) for proxy, index in diff_diff["add"]])
+    for k in ["index", "obsolete", "update"]:
+        assert streaming_diff_diff[k] == diff_diff[k]
+
+
 @pytest.mark.django_db
 def test_store_diff_obsoleted_target_unit(diffable_stores):
     target_store, source_store = diffable_stores
@@ -1449,3 +1588,46 @@ def test_store_syncer_new_units(dummy_store_syncer_units, tp0):
 @pytest.mark.django_db
 def test_store_path(store0):
     assert store0.path == to_tp_relative_path(store0.pootle_path)
+
+
+@pytest.mark.django_db
+def test_update_bulk_create_units(tp0, store_po, complex_ttk, member):
+    store_po.update(complex_ttk, user=member)
+
+    # the same units are added to another store one at a time
+    store = StoreDBFactory(
+        parent=tp0.directory,
+        translation_project=tp0,
+        name="test_store_addunit.po")
+    for unit in complex_ttk.units[1:]:
+        store.addunit(unit, user=member)
+
+    fields = (
+        "unitid", "source_hash", "source_wordcount", "source_length",
+        "target_wordcount", "target_length", "state", "submitted_by")
+    bulk_units = list(store_po.unit_set.order_by("index").values(*fields))
+    units = list(store.unit_set.order_by("index").values(*fields))
+    assert bulk_units == units
+    assert (
+        list(store_po.unit_set.order_by("index")
+                              .values_list("revision", flat=True))
+        == [store_po.data.max_unit_revision] * len(units))
+    for bulk_unit, unit in zip(store_po.units, store.units):
+        assert bulk_unit.creation_time
+        assert (
+            sorted(bulk_unit.qualitycheck_set.values_list("name", "category"))
+            == sorted(unit.qualitycheck_set.values_list("name", "category")))
+        assert (
+            list(bulk_unit.submission_set.values_list(
+                "type", "field", "new_value", "submitter"))
+            == list(unit.submission_set.values_list(
+                "type", "field", "new_value", "submitter")))
+
+    # the store data is updated from the new units
+    store_data = store_po.data_tool.updater.get_store_data()
+    for k in ("total_words", "translated_words", "fuzzy_words",
+              "critical_checks", "max_unit_revision"):
+        assert getattr(store_po.data, k) == store_data[k]
+    assert (
+        sorted(store_po.check_data.values_list("category", "name", "count"))
+        == sorted(store.check_data.values_list("category", "name", "count")))
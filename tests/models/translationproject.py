@@ -23,6 +23,7 @@ from pootle.core.delegate import tp_tool
 from pootle_app.models import Directory
 from pootle_language.models import Language
 from pootle_project.models import Project
+from pootle_store.constants import PARSED
 from pootle_store.models import Store
 from pootle_translationproject.models import TranslationProject
 from pootle_translationproject.utils import TPTool
@@ -345,3 +346,49 @@ def test_tp_tool_gets(project0, tp0):
 
     with pytest.raises(tp0.DoesNotExist):
         project0.tp_tool["DOES_NOT_EXIST"]
+
+
+@pytest.mark.django_db
+def test_tp_sync_unchanged_stores(project0_nongnu, tp0, store0, monkeypatch):
+    store0.state = PARSED
+    store0.save()
+    store0.sync()
+    store0.refresh_from_db()
+    assert store0.file
+    assert store0.last_sync_revision == store0.data.max_unit_revision
+
+    synced = []
+
+    def _sync(store, **kwargs):
+        synced.append(store.pk)
+
+    monkeypatch.setattr(Store, "sync", _sync)
+
+    # the store has not changed since it was synced
+    tp0.sync()
+    assert store0.pk not in synced
+    tp0.sync(only_newer=False)
+    assert store0.pk in synced
+
+    del synced[:]
+    unit = store0.units.first()
+    unit.target = "%s CHANGED" % unit.target
+    unit.save()
+    tp0.sync()
+    assert store0.pk in synced
+
+
+@pytest.mark.django_db
+def test_tp_sync_missing_file(project0_nongnu, tp0, store0):
+    store0.state = PARSED
+    store0.save()
+    store0.sync()
+    store0.refresh_from_db()
+    assert store0.last_sync_revision == store0.data.max_unit_revision
+
+    # the store has not changed since it was synced, but its file is
+    # recreated
+    os.remove(store0.file.path)
+    assert not store0.file.exists()
+    tp0.sync()
+    assert store0.file.exists()
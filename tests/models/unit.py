@@ -403,3 +403,188 @@ def test_unit_syncer_locations(unit_syncer):
     newunit = syncer.convert(unit_class)
     assert newunit.getlocations() == ["FOO"]
     _test_unit_syncer(unit, newunit)
+
+
+def _get_store_data(store):
+    return dict(
+        total_words=store.data.total_words,
+        translated_words=store.data.translated_words,
+        fuzzy_words=store.data.fuzzy_words,
+        critical_checks=store.data.critical_checks)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("mode", ["commit", "rq"])
+def test_unit_side_effects_deferred(store0, member, settings, mode):
+    from django.db import transaction
+
+    from pootle_store.side_effects import unit_side_effects
+
+    settings.POOTLE_UNIT_SIDE_EFFECTS = {
+        k: mode for k in settings.POOTLE_UNIT_SIDE_EFFECTS}
+    units = store0.units.filter(state=UNTRANSLATED)[:2]
+    original_data = _get_store_data(store0)
+    submissions = store0.submission_set.count()
+    with transaction.atomic():
+        for unit in units:
+            unit.target = "%s%s" % (unit.source, "%d")
+            unit.save(user=member)
+        po_unit = pounit("New unit %s")
+        po_unit.target = "New target"
+        new_unit = store0.addunit(po_unit, user=member)
+
+    # the effects are run once the transaction is committed
+    assert _get_store_data(store0) == original_data
+    assert store0.submission_set.count() == submissions
+    assert not new_unit.qualitycheck_set.exists()
+    batch = list(unit_side_effects.batches.values())[-1]
+    assert len(batch.items["update_data"][store0.pk]) == 3
+    batch.flush()
+    store0.data.refresh_from_db()
+    deferred_data = _get_store_data(store0)
+    assert deferred_data != original_data
+    assert store0.submission_set.filter(
+        unit=new_unit, submitter=member).exists()
+    assert units[0].qualitycheck_set.exists()
+    store0.data_tool.update()
+    store0.data.refresh_from_db()
+    assert _get_store_data(store0) == deferred_data
+
+
+@pytest.mark.django_db
+def test_unit_side_effects_rollback(store0, settings):
+    from django.db import transaction
+
+    from pootle_store.side_effects import unit_side_effects
+
+    settings.POOTLE_UNIT_SIDE_EFFECTS = dict(
+        settings.POOTLE_UNIT_SIDE_EFFECTS,
+        update_data="commit")
+    batches = list(unit_side_effects.batches.values())
+    unit = store0.units.filter(state=UNTRANSLATED).first()
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            unit.target = "Rolled back"
+            unit.save()
+            raise RuntimeError
+    # effects recorded in the rolled back transaction are dropped
+    assert list(unit_side_effects.batches.values()) == batches
+    unit = store0.units.filter(state=UNTRANSLATED).first()
+    with transaction.atomic():
+        unit.target = "Committed"
+        unit.save()
+    batch = list(unit_side_effects.batches.values())[-1]
+    assert batch not in batches
+    assert len(batch.items["update_data"][store0.pk]) == 1
+
+
+@pytest.mark.django_db
+def test_unit_side_effects_savepoint_rollback(store0, member, settings):
+    from django.db import transaction
+
+    from pootle_store.side_effects import unit_side_effects
+
+    settings.POOTLE_UNIT_SIDE_EFFECTS = dict(
+        settings.POOTLE_UNIT_SIDE_EFFECTS,
+        update_data="commit")
+    units = list(store0.units.filter(state=UNTRANSLATED)[:2])
+    original_data = _get_store_data(store0)
+    with transaction.atomic():
+        units[0].target = "Committed"
+        units[0].save(user=member)
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                units[1].target = "Rolled back"
+                units[1].save(user=member)
+                raise RuntimeError
+    batch = list(unit_side_effects.batches.values())[-1]
+    # only the effects of the unit saved outside the savepoint are run
+    assert len(batch.items["update_data"][store0.pk]) == 1
+    batch.flush()
+    assert batch not in unit_side_effects.batches.values()
+    store0.data.refresh_from_db()
+    assert (
+        store0.data.translated_words
+        == (original_data["translated_words"]
+            + units[0].source_wordcount))
+
+
+@pytest.mark.django_db
+def test_unit_side_effects_tmserver(store0, member, settings, tm_server):
+    from django.db import transaction
+
+    from pootle_store.side_effects import unit_side_effects
+
+    settings.POOTLE_UNIT_SIDE_EFFECTS = dict(
+        settings.POOTLE_UNIT_SIDE_EFFECTS,
+        tmserver="commit")
+    units = store0.units.filter(state=UNTRANSLATED)[:2]
+    with transaction.atomic():
+        for unit in units:
+            unit.target = "%s%s" % (unit.source, "%d")
+            unit.save(user=member)
+    list(unit_side_effects.batches.values())[-1].flush()
+
+    # the units of the store are indexed in one request
+    assert len(tm_server.bulk_requests) == 1
+    docs = tm_server.indices["translations"]
+    language = store0.translation_project.language.code
+    for unit in units:
+        unit.refresh_from_db()
+        doc = docs[(language, str(unit.pk))]
+        assert doc["target"] == unit.target
+        assert doc["revision"] == unit.revision
+
+
+def test_unit_count_source_words():
+    from pootle_store.models import count_source_words, wordcount_f
+
+    wordcount_f.counts.clear()
+    assert count_source_words([u"Foo bar", u"Foo bars baz"]) == 5
+    # source wordcounts are only remembered by `source_strings`
+    assert not wordcount_f.counts
+
+
+@pytest.mark.django_db
+def test_unit_source_strings(store0):
+    from hashlib import md5
+
+    from pootle.core.utils.multistring import PLURAL_PLACEHOLDER
+    from pootle_store.models import count_words
+    from pootle_store.source import SourceStrings
+
+    counted = []
+
+    def _count_words(strings):
+        counted.append(strings)
+        return count_words(strings)
+
+    source_strings = SourceStrings(_count_words)
+    source_strings.cache.delete_pattern("pootle_store.source.*")
+    unit = store0.units.first()
+    values = source_strings.get(unit.source_f)
+    assert values == dict(
+        source_hash=md5(unit.source_f.encode("utf-8")).hexdigest(),
+        source_length=len(unit.source_f),
+        source_wordcount=count_words(unit.source_f.strings))
+    assert source_strings.get(unit.source_f) is values
+    assert len(counted) == 1
+
+    # plurals with the same singular source are counted separately
+    unit.source = [unit.source, PLURAL_PLACEHOLDER]
+    plural_values = source_strings.get(unit.source_f)
+    assert plural_values["source_hash"] == values["source_hash"]
+    assert len(counted) == 2
+    assert source_strings.get(unit.source_f) is plural_values
+    assert len(counted) == 2
+
+    # values are shared with other processes through the cache
+    units = list(store0.units[1:3])
+    source_strings.prefetch(u.source_f for u in units)
+    assert len(counted) == 4
+    other_process = SourceStrings(_count_words)
+    other_process.prefetch(u.source_f for u in units)
+    assert len(counted) == 4
+    for u in units:
+        assert other_process.get(u.source_f) == source_strings.get(u.source_f)
+    assert len(counted) == 4
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.db.models import Sum
+
+from pootle.core.contextmanagers import bulk_data_update
+from pootle_app.models import Directory
+from pootle_data.directory_data import (
+    DirectoryDataTool, DirectoryDataUpdater, stale_directories)
+from pootle_data.models import DirectoryData, StoreChecksData, StoreData
+from pootle_data.receivers import get_store_directories
+from pootle_store.constants import FUZZY, OBSOLETE, TRANSLATED
+from pootle_store.models import Store, Unit
+
+from .data_updater_store import _calc_word_counts
+
+
+def _test_directory_data(directory):
+    units = Unit.objects.filter(
+        state__gt=OBSOLETE,
+        store__pootle_path__startswith=directory.pootle_path)
+    data_tool = DirectoryDataTool(directory)
+    data = data_tool.context_data
+    data.refresh_from_db()
+    for k, v in _calc_word_counts(units.all()).items():
+        assert getattr(data, k) == v
+    store_data = StoreData.objects.filter(
+        store__pootle_path__startswith=directory.pootle_path)
+    assert (
+        data.critical_checks
+        == store_data.aggregate(
+            critical=Sum("critical_checks"))["critical"])
+    checks = dict(
+        StoreChecksData.objects.filter(
+            store__pootle_path__startswith=directory.pootle_path).values_list(
+                "name").annotate(Sum("count")))
+    assert (
+        dict(data_tool.context_check_data.values_list("name", "count"))
+        == checks)
+
+
+@pytest.mark.django_db
+def test_data_directory_updater(subdir0):
+    data_tool = DirectoryDataTool(subdir0)
+    updater = DirectoryDataUpdater(data_tool)
+    assert updater.tool.context == subdir0
+    assert isinstance(subdir0.data_tool.updater, DirectoryDataUpdater)
+    _test_directory_data(subdir0)
+    _test_directory_data(subdir0.translation_project.directory)
+
+
+@pytest.mark.django_db
+def test_data_directory_store_directories(subdir0):
+    store = subdir0.child_stores.first()
+    tp = store.translation_project
+    assert (
+        sorted(get_store_directories(store).values_list(
+            "pootle_path", flat=True))
+        == [subdir0.pootle_path])
+    tp_store = tp.stores.filter(parent=tp.directory).first()
+    assert not get_store_directories(tp_store).exists()
+
+
+@pytest.mark.django_db
+def test_data_directory_unit_save(subdir0):
+    tp_dir = subdir0.translation_project.directory
+    unit = Unit.objects.filter(
+        state=TRANSLATED,
+        store__parent=subdir0).first()
+    unit.state = FUZZY
+    unit.save(state_updated=True)
+    _test_directory_data(subdir0)
+    _test_directory_data(tp_dir)
+    # the unit is neither fuzzy nor translated for both directories
+    unit.target = ""
+    unit.save(target_updated=True)
+    _test_directory_data(subdir0)
+    _test_directory_data(tp_dir)
+
+
+@pytest.mark.django_db
+def test_data_directory_bulk_update(subdir0):
+    tp_dir = subdir0.translation_project.directory
+    units = Unit.objects.filter(
+        state=TRANSLATED,
+        store__pootle_path__startswith=subdir0.pootle_path)
+    with bulk_data_update():
+        for unit in units[:3]:
+            unit.state = FUZZY
+            unit.save(state_updated=True)
+    _test_directory_data(subdir0)
+    _test_directory_data(tp_dir)
+
+
+@pytest.mark.django_db
+def test_data_directory_data_created(subdir0):
+    subdir0.data.delete()
+    subdir0.check_data.all().delete()
+    subdir0 = Directory.objects.get(pk=subdir0.pk)
+    stats = subdir0.data_tool.get_stats(include_children=False)
+    _test_directory_data(subdir0)
+    assert stats["total"] == subdir0.data.total_words
+
+
+@pytest.mark.django_db
+def test_data_directory_tp_root(subdir0):
+    tp = subdir0.translation_project
+    data_tool = DirectoryDataTool(tp.directory)
+    assert data_tool.context_data == tp.data
+    assert (
+        list(data_tool.context_check_data.all())
+        == list(tp.check_data.all()))
+
+
+@pytest.mark.django_db
+def test_data_directory_stale_rollup(subdir0):
+    store = subdir0.child_stores.first()
+    StoreData.objects.filter(store=store).update(total_words=0)
+    DirectoryData.objects.filter(directory=subdir0).update(total_words=0)
+    # a store update without a delta marks its directories as stale
+    Store.objects.get(pk=store.pk).data_tool.update()
+    data = DirectoryData.objects.get(directory=subdir0)
+    assert data.stale
+    assert data.total_words == 0
+    subdir0 = Directory.objects.get(pk=subdir0.pk)
+    _test_directory_data(subdir0)
+    assert not DirectoryData.objects.get(directory=subdir0).stale
+
+
+@pytest.mark.django_db
+def test_data_directory_stale_mark_kept(subdir0):
+    stale_directories.rollup([subdir0])
+    DirectoryData.objects.filter(directory=subdir0).update(total_words=0)
+    subdir0 = Directory.objects.get(pk=subdir0.pk)
+    data_tool = DirectoryDataTool(subdir0)
+    updater = DirectoryDataUpdater(data_tool)
+    assert not updater.data.stale
+    # a mark set after the data was read is kept when it is saved
+    stale_directories.mark([subdir0])
+    updater.update()
+    data = DirectoryData.objects.get(directory=subdir0)
+    assert data.total_words
+    assert data.stale
+    stale_directories.rollup([subdir0])
+    assert not DirectoryData.objects.get(directory=subdir0).stale
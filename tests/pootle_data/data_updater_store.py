@@ -16,13 +16,16 @@ from translate.filters.decorators import Category
 
 from django.db.models import Max
 
+from pootle.core.cache import get_cache
+from pootle.core.checks.checker import QualityCheckUpdater
 from pootle.core.delegate import review
 from pootle_data.store_data import StoreDataTool, StoreDataUpdater
+from pootle_data.utils import get_checks_delta, get_word_delta
 from pootle_store.constants import FUZZY, OBSOLETE, TRANSLATED, UNTRANSLATED
 from pootle_store.models import Suggestion
 from pootle_store.util import SuggestionStates
 from pootle_statistics.models import SubmissionTypes
-from pootle_store.models import QualityCheck
+from pootle_store.models import QualityCheck, Unit
 
 
 def _calc_word_counts(units):
@@ -236,7 +239,7 @@ def test_data_store_util_suggestion_count(store0, member):
 
 
 @pytest.mark.django_db
-def test_data_store_critical_checks(store0):
+def test_data_store_critical_checks(store0, member):
     qc_qs = QualityCheck.objects
     qc_qs = (
         qc_qs.filter(unit__store=store0)
@@ -262,10 +265,8 @@ def test_data_store_critical_checks(store0):
     # lets make another unit false positive
     other_qc = unit.qualitycheck_set.exclude(
         name="xmltags").filter(category=Category.CRITICAL).first()
-    other_qc.false_positive = True
-    other_qc.save()
-    # trigger refresh
-    unit.save()
+    # the change to the checks is applied to the data
+    unit.toggle_qualitycheck(other_qc.id, True, member)
     assert (
         store0.data.critical_checks
         == check_count + unit_critical - 1)
@@ -387,3 +388,236 @@ def test_data_store_updater_defaults(tp0):
             assert (
                 aggregate_data[k]
                 == store.data_tool.updater.aggregate_defaults[k])
+
+
+def test_data_store_word_delta():
+    # new translated unit
+    assert (
+        get_word_delta(state=TRANSLATED, wordcount=3)
+        == dict(total_words=3, translated_words=3, fuzzy_words=0))
+    # translated -> fuzzy
+    assert (
+        get_word_delta(
+            old_state=TRANSLATED, old_wordcount=3,
+            state=FUZZY, wordcount=3)
+        == dict(total_words=0, translated_words=-3, fuzzy_words=3))
+    # source changed and unit made untranslated
+    assert (
+        get_word_delta(
+            old_state=FUZZY, old_wordcount=3,
+            state=UNTRANSLATED, wordcount=5)
+        == dict(total_words=2, translated_words=0, fuzzy_words=-3))
+    # obsoleted
+    assert (
+        get_word_delta(
+            old_state=TRANSLATED, old_wordcount=3,
+            state=OBSOLETE, wordcount=3)
+        == dict(total_words=-3, translated_words=-3, fuzzy_words=0))
+    # units without words dont count
+    assert (
+        get_word_delta(
+            old_state=UNTRANSLATED, old_wordcount=0,
+            state=TRANSLATED, wordcount=0)
+        == dict(total_words=0, translated_words=0, fuzzy_words=0))
+
+
+@pytest.mark.django_db
+def test_data_store_updater_delta(store0, settings):
+    settings.POOTLE_DATA_RECONCILE_INTERVAL = 0
+    WORDCOUNT_KEYS = ["total_words", "fuzzy_words", "translated_words"]
+    tp = store0.translation_project
+    original_stats = {k: getattr(store0.data, k) for k in WORDCOUNT_KEYS}
+    original_tp_stats = {k: getattr(tp.data, k) for k in WORDCOUNT_KEYS}
+
+    # the delta is applied directly, regardless of the units
+    store0.data_tool.update(
+        unit_delta=dict(
+            old_state=UNTRANSLATED, old_wordcount=7,
+            state=TRANSLATED, wordcount=7))
+    assert (
+        store0.data.translated_words
+        == original_stats["translated_words"] + 7)
+    assert store0.data.total_words == original_stats["total_words"]
+    tp.data.refresh_from_db()
+    assert (
+        tp.data.translated_words
+        == original_tp_stats["translated_words"] + 7)
+
+    # a full update corrects the data
+    store0.data_tool.update()
+    tp.data.refresh_from_db()
+    for k in WORDCOUNT_KEYS:
+        assert getattr(store0.data, k) == original_stats[k]
+        assert getattr(tp.data, k) == original_tp_stats[k]
+
+
+@pytest.mark.django_db
+def test_data_store_updater_delta_unit_save(store0, settings):
+    settings.POOTLE_DATA_RECONCILE_INTERVAL = 0
+    WORDCOUNT_KEYS = ["total_words", "fuzzy_words", "translated_words"]
+    tp = store0.translation_project
+    unit = store0.units.filter(state=TRANSLATED).first()
+    unit.target = ""
+    unit.save(target_updated=True)
+    unit.state = FUZZY
+    unit.target = "Fuzzy translation"
+    unit.save(target_updated=True, state_updated=True)
+    expected = _calc_word_counts(store0.units)
+    tp_expected = _calc_word_counts(
+        Unit.objects.filter(
+            state__gt=OBSOLETE,
+            store__translation_project=tp))
+    tp.data.refresh_from_db()
+    for k in WORDCOUNT_KEYS:
+        assert getattr(store0.data, k) == expected[k]
+        assert getattr(tp.data, k) == tp_expected[k]
+
+
+@pytest.mark.django_db
+def test_data_store_updater_delta_disabled(store0, settings):
+    settings.POOTLE_DATA_DELTA_UPDATES = False
+    original_words = store0.data.translated_words
+    store0.data_tool.update(
+        unit_delta=dict(
+            old_state=UNTRANSLATED, old_wordcount=7,
+            state=TRANSLATED, wordcount=7))
+    # the data was recalculated in full
+    assert store0.data.translated_words == original_words
+
+
+@pytest.mark.django_db
+def test_data_store_updater_delta_reconcile(store0, settings):
+    settings.POOTLE_DATA_RECONCILE_INTERVAL = 2
+    cache = get_cache("redis")
+    updater = store0.data_tool.updater
+    cache.delete(updater.reconcile_key)
+
+    # reading use_delta does not count towards the reconcile interval
+    assert updater.use_delta
+    assert updater.use_delta
+    assert cache.get(updater.reconcile_key) is None
+
+    original_words = store0.data.translated_words
+    store0.data_tool.update(
+        unit_delta=dict(
+            old_state=UNTRANSLATED, old_wordcount=7,
+            state=TRANSLATED, wordcount=7))
+    assert store0.data.translated_words == original_words + 7
+    assert cache.get(updater.reconcile_key) == 1
+
+    # every second delta update triggers a full update
+    store0.data_tool.update(
+        unit_delta=dict(
+            old_state=UNTRANSLATED, old_wordcount=7,
+            state=TRANSLATED, wordcount=7))
+    assert store0.data.translated_words == original_words
+
+
+def _test_store_check_data(store):
+    qc_qs = QualityCheck.objects.filter(
+        unit__store=store,
+        unit__state__gt=OBSOLETE)
+    checks = _calculate_checks(qc_qs)
+    check_data = store.check_data.values_list("category", "name", "count")
+    assert len(check_data) == len(checks)
+    for (category, name), count in checks.items():
+        assert (category, name, count) in check_data
+    store.data.refresh_from_db()
+    assert (
+        store.data.critical_checks
+        == sum(count
+               for (category, name), count
+               in checks.items()
+               if category == Category.CRITICAL))
+
+
+def test_data_store_checks_delta():
+    assert (
+        get_checks_delta(
+            {(Category.CRITICAL, "xmltags"): 2,
+             (Category.CRITICAL, "printf"): -1,
+             (Category.NO_CATEGORY, "endpunc"): 3})
+        == dict(
+            checks={(Category.CRITICAL, "xmltags"): 2,
+                    (Category.CRITICAL, "printf"): -1,
+                    (Category.NO_CATEGORY, "endpunc"): 3},
+            critical_checks=1))
+
+
+@pytest.mark.django_db
+def test_data_store_updater_delta_checks(store0, member, settings):
+    settings.POOTLE_DATA_RECONCILE_INTERVAL = 0
+    unit = store0.units.filter(state=TRANSLATED).first()
+    unit.target = "<foo></bar>;"
+    unit.save(target_updated=True)
+    unit_delta = unit.get_unit_delta()
+    assert unit_delta["checks"] == {}
+    _test_store_check_data(store0)
+
+    # mute and unmute a check
+    check = unit.qualitycheck_set.filter(category=Category.CRITICAL).first()
+    unit.toggle_qualitycheck(check.id, True, member)
+    _test_store_check_data(store0)
+    unit.toggle_qualitycheck(check.id, False, member)
+    _test_store_check_data(store0)
+
+    # checks are removed when the unit is obsoleted
+    unit.makeobsolete()
+    unit.save()
+    _test_store_check_data(store0)
+
+    # and added back when it is resurrected
+    unit.resurrect()
+    unit.save()
+    _test_store_check_data(store0)
+
+    # removing the translation removes the checks
+    unit.target = ""
+    unit.save(target_updated=True)
+    _test_store_check_data(store0)
+
+
+@pytest.mark.django_db
+def test_data_store_updater_delta_merge_checks(store0, settings):
+    settings.POOTLE_DATA_RECONCILE_INTERVAL = 0
+    xmltags = (Category.CRITICAL, "xmltags")
+    printf = (Category.CRITICAL, "printf")
+
+    def _get_check_counts():
+        return {
+            (category, name): count
+            for category, name, count
+            in store0.check_data.values_list("category", "name", "count")}
+
+    original_checks = _get_check_counts()
+    critical_checks = store0.data.critical_checks
+
+    # the changes to the checks of the units are added to the check delta
+    store0.data_tool.update(
+        unit_delta=dict(
+            old_state=TRANSLATED, old_wordcount=7,
+            state=TRANSLATED, wordcount=7,
+            checks={xmltags: 1}),
+        check_delta={xmltags: 1, printf: 1})
+    checks = _get_check_counts()
+    assert checks[xmltags] == original_checks.get(xmltags, 0) + 2
+    assert checks[printf] == original_checks.get(printf, 0) + 1
+    assert store0.data.critical_checks == critical_checks + 3
+
+
+@pytest.mark.django_db
+def test_data_store_updater_checker_delta(store0, settings):
+    settings.POOTLE_DATA_RECONCILE_INTERVAL = 0
+    checks = QualityCheck.objects.filter(
+        unit__store=store0,
+        unit__state__gt=OBSOLETE)
+    muted = checks.filter(category=Category.CRITICAL)[:2].values_list(
+        "pk", flat=True)
+    checks.filter(pk__in=list(muted)).update(false_positive=True)
+    store0.data_tool.update()
+    _test_store_check_data(store0)
+    QualityCheckUpdater(
+        translation_project=store0.translation_project,
+        keep_false_positives=False).update()
+    assert not checks.filter(false_positive=True).exists()
+    _test_store_check_data(store0)
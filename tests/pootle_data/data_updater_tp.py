@@ -219,7 +219,7 @@ def test_data_tp_util_suggestion_count(tp0, member):
 
 
 @pytest.mark.django_db
-def test_data_tp_qc_stats(tp0):
+def test_data_tp_qc_stats(tp0, member):
     units = Unit.objects.filter(
         state__gt=OBSOLETE,
         store__translation_project=tp0)
@@ -251,10 +251,8 @@ def test_data_tp_qc_stats(tp0):
     # lets make another unit false positive
     other_qc = unit.qualitycheck_set.exclude(
         name="xmltags").filter(category=Category.CRITICAL).first()
-    other_qc.false_positive = True
-    other_qc.save()
-    # trigger refresh
-    unit.save()
+    # the change to the checks is applied to the data
+    unit.toggle_qualitycheck(other_qc.id, True, member)
     store_data = tp0.data_tool.updater.get_store_data()
     tp0.data.refresh_from_db()
     assert (
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from pootle.core.search import SearchBroker
+from pootle.core.search.backends import NgramTMBackend
+from pootle.core.search.backends.elasticsearch import get_similarity
+from pootle.core.search.backends.ngram import get_grams
+from pootle_store.constants import TRANSLATED
+
+
+@pytest.fixture
+def ngram_tm(settings, tmpdir):
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.NgramTMBackend',
+            'PATH': str(tmpdir),
+            'INDEX_NAME': 'translations',
+        }
+    }
+    return NgramTMBackend('local')
+
+
+def test_ngram_tm_grams():
+    assert get_grams(u"Foo Bar") == set(
+        [u"foo", u"oo ", u"o b", u" ba", u"bar"])
+    assert get_grams(u"OK") == set([u"ok"])
+    assert get_grams(u"") == set()
+
+
+@pytest.mark.django_db
+def test_ngram_tm_search(ngram_tm, store0):
+    language = store0.translation_project.language.code
+    units = list(store0.units.filter(state=TRANSLATED))
+    assert not ngram_tm.index_exists()
+    ngram_tm.bulk_update(
+        language,
+        [unit.get_tmserver_data() for unit in units])
+    assert ngram_tm.index_exists()
+    assert (
+        ngram_tm.get_last_revision(language)
+        == max(unit.revision for unit in units))
+
+    unit = units[0]
+    results = ngram_tm.search(unit)
+    assert results
+    scores = [result['score'] for result in results]
+    assert scores == sorted(scores, reverse=True)
+    for result in results:
+        # the unit itself is not a match
+        assert result['unit_id'] != str(unit.id)
+        assert get_similarity(unit.source, result['source']) >= 0.7
+
+    # the index is read from disk by a new backend
+    assert NgramTMBackend('local').search(unit) == results
+
+    # updating a unit replaces it in the index
+    match = store0.units.get(pk=results[0]['unit_id'])
+    match.target = "Updated target"
+    match.save()
+    ngram_tm.update(language, match.get_tmserver_data())
+    assert (
+        NgramTMBackend('local').search(unit)[0]['target']
+        == "Updated target")
+
+
+@pytest.mark.django_db
+def test_ngram_tm_search_missing(ngram_tm, store0):
+    # no index for the language
+    assert ngram_tm.search(store0.units.first()) == []
+    assert ngram_tm.get_last_revision("language0") is None
+
+
+@pytest.mark.django_db
+def test_ngram_tm_broker(ngram_tm, store0):
+    unit = store0.units.filter(state=TRANSLATED).first()
+    broker = SearchBroker()
+    broker.update(
+        store0.translation_project.language.code,
+        unit.get_tmserver_data())
+    assert ngram_tm.get_last_revision(
+        store0.translation_project.language.code) == unit.revision
+    ngram_tm.delete_index()
+    assert not ngram_tm.index_exists()
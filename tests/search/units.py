@@ -8,18 +8,21 @@
 
 import pytest
 
+from pootle.core.cache import get_cache
 from pootle.core.delegate import search_backend
 from pootle.core.plugin import getter
 from pootle_project.models import Project
 from pootle_statistics.models import SubmissionTypes
 from pootle_store.getters import get_search_backend
 from pootle_store.constants import FUZZY, TRANSLATED, UNTRANSLATED
-from pootle_store.models import Unit
+from pootle_store.models import Store, Unit, UnitSearchToken
 from pootle_store.util import SuggestionStates
 from pootle_store.unit.filters import (
     FilterNotFound, UnitChecksFilter, UnitContributionFilter, UnitSearchFilter,
     UnitStateFilter, UnitTextSearch)
 from pootle_store.unit.search import DBSearchBackend
+from pootle_store.unit.search_index import (
+    get_search_tokens, get_tokens, search_index)
 
 
 def _expected_text_search_words(text, exact):
@@ -323,3 +326,172 @@ def test_unit_search_backend_custom():
     search_backend.connect(get_search_backend, sender=Unit)
 
     assert search_backend.get(Unit) is CustomSearchBackend
+
+
+@pytest.mark.django_db
+def test_get_units_text_search_index(units_text_searches):
+    search = units_text_searches
+    for store in Store.objects.all():
+        search_index.rebuild(store)
+
+    for qs in [Unit.objects.all(), Unit.objects.live()]:
+        narrowed = search_index.filter(qs, search["text"], search["exact"])
+        # the index only narrows down the units that are searched
+        assert (
+            list(UnitTextSearch(narrowed).search(
+                search["text"], search["sfields"],
+                search["exact"]).order_by("pk"))
+            == list(UnitTextSearch(qs).search(
+                search["text"], search["sfields"],
+                search["exact"]).order_by("pk")))
+        for item in narrowed:
+            assert item in qs
+
+
+@pytest.mark.django_db
+def test_unit_search_index_tokens(store0):
+    assert get_tokens(u"Pootlé") == set([u"poo", u"oot", u"otl", u"tle"])
+    assert get_tokens(u"po") == set()
+    assert get_tokens(None) == set()
+    assert (
+        get_search_tokens(u"Pootlé")
+        == set([u"poo", u"tle"]))
+    assert (
+        get_search_tokens(u"Pootle server")
+        == set([u"poo", u"tle", u" se", u"rve", u"ver"]))
+    assert get_search_tokens(u"po") == set()
+
+    search_index.rebuild(store0)
+    unit = store0.units.first()
+    tokens = UnitSearchToken.objects.filter(unit=unit)
+    assert (
+        set(tokens.values_list("token", flat=True))
+        == search_index.get_unit_tokens(unit))
+    assert (
+        set(tokens.values_list("language", flat=True))
+        == set([store0.translation_project.language_id]))
+
+    # words that are too short are not narrowed down
+    units = Unit.objects.filter(store=store0)
+    assert search_index.filter(units, u"a b") is units
+
+
+@pytest.mark.django_db
+def test_unit_search_index_update(store0, member, settings):
+    settings.POOTLE_SEARCH_INDEX = True
+    settings.POOTLE_UNIT_SIDE_EFFECTS = dict(
+        settings.POOTLE_UNIT_SIDE_EFFECTS,
+        search_index="sync")
+    unit = store0.units.first()
+    unit.target = u"Zyxwvut"
+    unit.save(user=member)
+    units = Unit.objects.filter(store=store0)
+    assert list(search_index.filter(units, u"XWV")) == [unit]
+    assert not search_index.filter(units, u"zyxwvuts").exists()
+
+    kwargs = dict(
+        category=None, checks=None, soptions=[], search=u"yxw",
+        sfields=["target"], user=member)
+    kwargs["modified-since"] = None
+    kwargs["month"] = None
+    backend = DBSearchBackend(member, **kwargs)
+    assert list(backend.filter_qs(units)) == [unit]
+
+
+@pytest.mark.django_db
+def test_unit_search_index_update_unchanged(store0, member, settings):
+    settings.POOTLE_SEARCH_INDEX = True
+    settings.POOTLE_UNIT_SIDE_EFFECTS = dict(
+        settings.POOTLE_UNIT_SIDE_EFFECTS,
+        search_index="sync")
+    unit = store0.units.filter(state=TRANSLATED).first()
+    UnitSearchToken.objects.filter(unit=unit).delete()
+
+    # the tokens are not replaced if the searched text is unchanged
+    unit.markfuzzy()
+    unit.save(user=member)
+    assert not UnitSearchToken.objects.filter(unit=unit).exists()
+
+    unit.translator_comment = u"Zyxwvut"
+    unit.save(user=member)
+    assert (
+        set(UnitSearchToken.objects.filter(unit=unit)
+                                   .values_list("token", flat=True))
+        == search_index.get_unit_tokens(unit))
+
+
+@pytest.mark.django_db
+def test_unit_search_index_update_store(store_po, complex_ttk, member,
+                                        settings):
+    settings.POOTLE_SEARCH_INDEX = True
+    settings.POOTLE_UNIT_SIDE_EFFECTS = dict(
+        settings.POOTLE_UNIT_SIDE_EFFECTS,
+        search_index="sync")
+    store_po.update(complex_ttk, user=member)
+    units = store_po.unit_set.all()
+    assert units.count()
+    for unit in units:
+        assert (
+            set(UnitSearchToken.objects.filter(unit=unit)
+                                       .values_list("token", flat=True))
+            == search_index.get_unit_tokens(unit))
+
+
+def _search_kwargs(**kwargs):
+    search_kwargs = {
+        "category": None, "checks": [], "filter": "all",
+        "modified-since": None, "month": None, "search": "",
+        "sfields": [], "soptions": [], "user": None, "sort_by": None,
+        "sort_on": "units", "count": 5}
+    search_kwargs.update(kwargs)
+    return search_kwargs
+
+
+@pytest.mark.django_db
+def test_unit_search_backend_result_uids(admin):
+    backend = DBSearchBackend(admin, **_search_kwargs())
+    total, start, end, units = backend.search()
+    uids = list(backend.results.values_list("pk", flat=True))
+    assert list(backend.result_uids) == uids
+    assert total == len(uids)
+    assert (start, end) == (0, 10)
+    assert list(units.values_list("pk", flat=True)) == uids[:10]
+
+    # the following chunks are served from the cached uids
+    cached_uids = backend.result_uids[:10] + backend.result_uids[:9:-1]
+    cache = get_cache("lru")
+    cache.set(backend.results_cache_key, cached_uids)
+    backend = DBSearchBackend(
+        admin,
+        **_search_kwargs(offset=10, previous_uids=uids[:10]))
+    assert backend.result_uids == cached_uids
+    total, start, end, units = backend.search()
+    assert total == len(uids)
+    assert (start, end) == (10, 20)
+    assert (
+        set(units.values_list("pk", flat=True))
+        == set(cached_uids[10:20]))
+
+    # a new search gets the uids from the db
+    backend = DBSearchBackend(admin, **_search_kwargs())
+    assert list(backend.result_uids) == uids
+    assert cache.get(backend.results_cache_key) == backend.result_uids
+
+
+@pytest.mark.django_db
+def test_unit_search_backend_result_uids_revision(admin):
+    backend = DBSearchBackend(admin, **_search_kwargs())
+    total, start, end, units = backend.search()
+    uids = list(backend.result_uids)
+    unit = Unit.objects.get(pk=uids[0])
+    unit.makeobsolete()
+    unit.save()
+
+    # the revision has changed so the cached uids are not used
+    backend = DBSearchBackend(
+        admin,
+        **_search_kwargs(offset=10, previous_uids=uids[:10]))
+    assert list(backend.result_uids) == uids[1:]
+    total, start, end, units = backend.search()
+    assert total == len(uids) - 1
+    assert (start, end) == (9, 19)